@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Compares the JSON codecs available for query results (see REDASH_JSON_CODEC)
+on a generated result, with and without converting the date and number
+columns beforehand.
+
+Usage: bin/benchmark_json_codecs.py [rows] [repeat]
+"""
+from __future__ import print_function
+import datetime
+import decimal
+import sys
+import timeit
+
+from redash.query_runner import TYPE_DATETIME, TYPE_FLOAT, TYPE_INTEGER, TYPE_STRING
+from redash.utils import JSONEncoder, json_codec
+
+COLUMNS = [
+    {'name': 'id', 'type': TYPE_INTEGER},
+    {'name': 'name', 'type': TYPE_STRING},
+    {'name': 'amount', 'type': TYPE_FLOAT},
+    {'name': 'created_at', 'type': TYPE_DATETIME},
+]
+
+
+def generate_rows(count):
+    now = datetime.datetime.now()
+    return [(i, u'name {}'.format(i), decimal.Decimal(i) / 100, now - datetime.timedelta(seconds=i))
+            for i in range(count)]
+
+
+def to_result(rows):
+    names = [column['name'] for column in COLUMNS]
+    return {'columns': COLUMNS, 'rows': [dict(zip(names, row)) for row in rows]}
+
+
+def benchmark(rows_count, repeat):
+    rows = generate_rows(rows_count)
+
+    print("{:<12} {:>10} {:>14} {:>10}".format("codec", "dumps", "convert+dumps", "loads"))
+    for name in json_codec.BACKENDS:
+        dumps, loads = json_codec.get_backend(name)
+        encoded = dumps(to_result(rows), JSONEncoder)
+
+        timings = [
+            min(timeit.repeat(lambda: dumps(to_result(rows), JSONEncoder), number=1, repeat=repeat)),
+            min(timeit.repeat(lambda: dumps(to_result(json_codec.convert_rows(COLUMNS, rows)), JSONEncoder),
+                              number=1, repeat=repeat)),
+            min(timeit.repeat(lambda: loads(encoded), number=1, repeat=repeat)),
+        ]
+        print("{:<12} {:>9.3f}s {:>13.3f}s {:>9.3f}s".format(name, *timings))
+
+
+if __name__ == '__main__':
+    rows_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    benchmark(rows_count, repeat)
@@ -0,0 +1,27 @@
+"""add keyset pagination indexes
+
+Revision ID: 3c7a2f8e41d6
+Revises: 2ba47e9812b1
+Create Date: 2026-10-19 10:12:31.482913
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3c7a2f8e41d6'
+down_revision = '2ba47e9812b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('queries_created_at_id', 'queries', ['created_at', 'id'])
+    op.create_index('dashboards_created_at_id', 'dashboards', ['created_at', 'id'])
+    op.create_index('events_org_id_created_at_id', 'events', ['org_id', 'created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('events_org_id_created_at_id', 'events')
+    op.drop_index('dashboards_created_at_id', 'dashboards')
+    op.drop_index('queries_created_at_id', 'queries')
@@ -0,0 +1,26 @@
+"""add query results data hash
+
+Revision ID: 5b7d1e8f3a20
+Revises: c6e9b3a1f0d4
+Create Date: 2026-10-19 16:42:08.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7d1e8f3a20'
+down_revision = 'c6e9b3a1f0d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing results are left without a hash: the next result of each query
+    # is stored, and results are reused from then on.
+    op.add_column('query_results', sa.Column('data_hash', sa.String(length=32), nullable=True))
+
+
+def downgrade():
+    op.drop_column('query_results', 'data_hash')
@@ -0,0 +1,40 @@
+"""add event daily counts
+
+Revision ID: 5f1a9c3d2b7e
+Revises: 3c7a2f8e41d6
+Create Date: 2026-10-19 11:02:47.915304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f1a9c3d2b7e'
+down_revision = '3c7a2f8e41d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('event_daily_counts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('org_id', sa.Integer(), nullable=True),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('object_type', sa.String(length=255), nullable=True),
+        sa.Column('object_id', sa.String(length=255), nullable=True),
+        sa.Column('action', sa.String(length=255), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['org_id'], ['organizations.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('event_daily_counts_org_id_day', 'event_daily_counts', ['org_id', 'day'])
+    op.create_index('event_daily_counts_day_object', 'event_daily_counts', ['day', 'object_type', 'object_id'])
+    op.create_index('events_created_at', 'events', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('events_created_at', 'events')
+    op.drop_table('event_daily_counts')
@@ -0,0 +1,75 @@
+"""add tag counts
+
+Revision ID: 8d2e4b6f1c93
+Revises: 5f1a9c3d2b7e
+Create Date: 2026-10-19 11:48:05.226731
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from redash.models import TAG_COUNTS_FUNCTIONS, TAG_COUNTS_TRIGGERS
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2e4b6f1c93'
+down_revision = '5f1a9c3d2b7e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tag_counts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('object_type', sa.String(length=255), nullable=True),
+        sa.Column('org_id', sa.Integer(), nullable=True),
+        sa.Column('data_source_id', sa.Integer(), nullable=True),
+        sa.Column('is_draft', sa.Boolean(), nullable=True),
+        sa.Column('tag', sa.Unicode(length=255), nullable=True),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['org_id'], ['organizations.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('tag_counts_object_type_data_source_id', 'tag_counts', ['object_type', 'data_source_id'])
+    op.create_index('tag_counts_object_type_org_id', 'tag_counts', ['object_type', 'org_id'])
+
+    op.execute(TAG_COUNTS_FUNCTIONS)
+    op.execute(TAG_COUNTS_TRIGGERS)
+
+    op.execute("""
+        INSERT INTO tag_counts (object_type, org_id, data_source_id, is_draft, tag, count)
+        SELECT 'queries', org_id, data_source_id, is_draft, tag, count(*)
+        FROM queries, unnest(tags) AS tag
+        WHERE NOT is_archived
+        GROUP BY org_id, data_source_id, is_draft, tag
+    """)
+    op.execute("""
+        INSERT INTO tag_counts (object_type, org_id, data_source_id, is_draft, tag, count)
+        SELECT 'dashboards', org_id, data_source_id, false, tag, count(*)
+        FROM (SELECT DISTINCT dashboards.id, dashboards.org_id, dashboards.tags, queries.data_source_id
+              FROM dashboards
+              JOIN widgets ON widgets.dashboard_id = dashboards.id
+              LEFT JOIN visualizations ON visualizations.id = widgets.visualization_id
+              LEFT JOIN queries ON queries.id = visualizations.query_id
+              WHERE NOT dashboards.is_archived AND NOT dashboards.is_draft
+                    AND (widgets.visualization_id IS NULL OR queries.data_source_id IS NOT NULL)) AS d,
+             unnest(d.tags) AS tag
+        GROUP BY org_id, data_source_id, tag
+    """)
+
+
+def downgrade():
+    for table in ('visualizations', 'widgets', 'dashboards'):
+        op.execute("DROP TRIGGER IF EXISTS {0}_tag_counts_after ON {0}".format(table))
+        op.execute("DROP TRIGGER IF EXISTS {0}_tag_counts_before ON {0}".format(table))
+    op.execute("DROP TRIGGER IF EXISTS queries_dashboard_tag_counts_after ON queries")
+    op.execute("DROP TRIGGER IF EXISTS queries_dashboard_tag_counts_before ON queries")
+    op.execute("DROP TRIGGER IF EXISTS queries_tag_counts ON queries")
+    op.execute("DROP FUNCTION IF EXISTS queries_update_dashboard_tag_counts()")
+    op.execute("DROP FUNCTION IF EXISTS visualizations_update_tag_counts()")
+    op.execute("DROP FUNCTION IF EXISTS widgets_update_tag_counts()")
+    op.execute("DROP FUNCTION IF EXISTS dashboards_update_tag_counts()")
+    op.execute("DROP FUNCTION IF EXISTS queries_update_tag_counts()")
+    op.execute("DROP FUNCTION IF EXISTS dashboard_tag_counts_add(integer[], integer)")
+    op.execute("DROP FUNCTION IF EXISTS tag_counts_add(text, integer, integer, boolean, text[], integer)")
+    op.drop_table('tag_counts')
@@ -0,0 +1,27 @@
+"""add query results data key
+
+Revision ID: 8e2a4c9d1b67
+Revises: 5b7d1e8f3a20
+Create Date: 2026-10-19 17:20:31.540917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e2a4c9d1b67'
+down_revision = '5b7d1e8f3a20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('query_results', sa.Column('data_key', sa.String(length=255), nullable=True))
+    # empty for results kept in the result storage
+    op.alter_column('query_results', 'data', nullable=True)
+
+
+def downgrade():
+    op.alter_column('query_results', 'data', nullable=False)
+    op.drop_column('query_results', 'data_key')
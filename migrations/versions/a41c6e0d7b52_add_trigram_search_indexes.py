@@ -0,0 +1,38 @@
+"""add trigram search indexes
+
+Revision ID: a41c6e0d7b52
+Revises: 8d2e4b6f1c93
+Create Date: 2026-10-19 12:20:41.583164
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41c6e0d7b52'
+down_revision = '8d2e4b6f1c93'
+branch_labels = None
+depends_on = None
+
+
+TRIGRAM_INDEXES = (
+    ('queries_name_trgm', 'queries', 'name'),
+    ('queries_description_trgm', 'queries', 'description'),
+    ('queries_query_trgm', 'queries', 'query'),
+    ('dashboards_name_trgm', 'dashboards', 'name'),
+    ('users_name_trgm', 'users', 'name'),
+    ('users_email_trgm', 'users', 'email'),
+)
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    for name, table, column in TRIGRAM_INDEXES:
+        op.create_index(name, table, [column], unique=False, postgresql_using='gin',
+                        postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade():
+    for name, table, _ in TRIGRAM_INDEXES:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,32 @@
+"""add last accessed at
+
+Revision ID: c6e9b3a1f0d4
+Revises: a41c6e0d7b52
+Create Date: 2026-10-19 12:58:13.402751
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e9b3a1f0d4'
+down_revision = 'a41c6e0d7b52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing queries and dashboards count as accessed now, so idle ones are
+    # only suspended after the configured number of days.
+    op.add_column('queries', sa.Column('last_accessed_at', sa.DateTime(True),
+                                       nullable=False, server_default=sa.func.now()))
+    op.add_column('queries', sa.Column('schedule_suspended_at', sa.DateTime(True), nullable=True))
+    op.add_column('dashboards', sa.Column('last_accessed_at', sa.DateTime(True),
+                                          nullable=False, server_default=sa.func.now()))
+
+
+def downgrade():
+    op.drop_column('dashboards', 'last_accessed_at')
+    op.drop_column('queries', 'schedule_suspended_at')
+    op.drop_column('queries', 'last_accessed_at')
@@ -0,0 +1,24 @@
+"""add queries last watermark
+
+Revision ID: d4f7a2b9e513
+Revises: 8e2a4c9d1b67
+Create Date: 2026-10-19 18:05:47.926311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f7a2b9e513'
+down_revision = '8e2a4c9d1b67'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('queries', sa.Column('last_watermark', sa.String(length=255), nullable=True))
+
+
+def downgrade():
+    op.drop_column('queries', 'last_watermark')
@@ -98,6 +98,7 @@ def create_app(load_admin=True):
     from redash.models import db
     from redash.authentication import setup_authentication
     from redash.metrics.request import provision_app
+    from redash.utils.cache import reset_request_caches
 
     app = Flask(__name__,
                 template_folder=settings.STATIC_ASSETS_PATH,
@@ -133,6 +134,7 @@ def create_app(load_admin=True):
         return response
 
     app.after_request(set_response_headers)
+    app.before_request(reset_request_caches)
     provision_app(app)
     db.init_app(app)
     migrate.init_app(app, db)
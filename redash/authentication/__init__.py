@@ -9,7 +9,7 @@ from flask import redirect, request, jsonify, url_for
 
 from redash import models, settings
 from redash.authentication.org_resolving import current_org
-from redash.tasks import record_event
+from redash.tasks import enqueue_event
 
 login_manager = LoginManager()
 logger = logging.getLogger('authentication')
@@ -40,8 +40,8 @@ def sign(key, path, expires):
 def load_user(user_id):
     org = current_org._get_current_object()
     try:
-        user = models.User.get_by_id_and_org(user_id, org)
-        if user.is_disabled:
+        user = models.User.get_cached('id', user_id, lambda: models.User.get_by_id_and_org(user_id, org))
+        if user.org != org or user.is_disabled:
             return None
         return user
     except models.NoResultFound:
@@ -82,11 +82,18 @@ def get_user_from_api_key(api_key, query_id):
     # TODO: once we switch all api key storage into the ApiKey model, this code will be much simplified
     org = current_org._get_current_object()
     try:
-        user = models.User.get_by_api_key_and_org(api_key, org)
+        org_user = models.User.get_cached('api_key', api_key,
+                                          lambda: models.User.get_by_api_key_and_org(api_key, org))
+        if org_user.org != org:
+            raise models.NoResultFound()
+        user = org_user
     except models.NoResultFound:
         try:
-            api_key = models.ApiKey.get_by_api_key(api_key)
-            user = models.ApiUser(api_key, api_key.org, [])
+            api_key_object = models.ApiKey.get_cached('api_key', api_key,
+                                                      lambda: models.ApiKey.get_by_api_key(api_key))
+            if not api_key_object.active:
+                raise models.NoResultFound()
+            user = models.ApiUser(api_key_object, api_key_object.org, [])
         except models.NoResultFound:
             if query_id:
                 query = models.Query.get_by_id_and_org(query_id, org)
@@ -127,7 +134,7 @@ def log_user_logged_in(app, user):
         'ip': request.remote_addr
     }
 
-    record_event.delay(event)
+    enqueue_event(event)
 
 
 @login_manager.unauthorized_handler
@@ -11,7 +11,7 @@ def _get_current_org():
         return g.org
 
     slug = request.view_args.get('org_slug', g.get('org_slug', 'default'))
-    g.org = Organization.get_by_slug(slug)
+    g.org = Organization.get_cached('slug', slug, lambda: Organization.get_by_slug(slug))
     logging.debug("Current organization: %s (slug: %s)", g.org, slug)
     return g.org
 
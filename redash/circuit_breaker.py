@@ -0,0 +1,78 @@
+"""
+Circuit breaker pausing data sources that can't be connected to.
+
+After CIRCUIT_BREAKER_THRESHOLD consecutive executions of a data source's
+queries fail to connect, its circuit opens: the data source is paused (so
+scheduled queries are skipped) and the probe_circuit_breakers task tests its
+connection, backing off exponentially, until it succeeds. That closes the
+circuit and resumes the data source.
+"""
+import json
+import logging
+import time
+
+from redash import redis_connection, settings, statsd_client
+
+PAUSE_REASON = 'paused after repeated connection failures'
+# Hash of the data source ids of open circuits to their state.
+OPEN_KEY = 'circuit_breaker:open'
+# Failures older than this don't count as consecutive anymore.
+FAILURES_EXPIRE = 3600
+
+logger = logging.getLogger(__name__)
+
+
+def _failures_key(data_source_id):
+    return 'circuit_breaker:{}:failures'.format(data_source_id)
+
+
+def _set_gauge(data_source_id, is_open):
+    statsd_client.gauge('circuit_breaker.{}.open'.format(data_source_id), 1 if is_open else 0)
+
+
+def record_success(data_source):
+    if settings.CIRCUIT_BREAKER_THRESHOLD:
+        redis_connection.delete(_failures_key(data_source.id))
+
+
+def record_failure(data_source):
+    if not settings.CIRCUIT_BREAKER_THRESHOLD:
+        return
+
+    key = _failures_key(data_source.id)
+    pipe = redis_connection.pipeline()
+    pipe.incr(key)
+    pipe.expire(key, FAILURES_EXPIRE)
+    failures = pipe.execute()[0]
+
+    if failures >= settings.CIRCUIT_BREAKER_THRESHOLD:
+        state = {'opened_at': time.time(), 'attempts': 0,
+                 'next_probe_at': time.time() + settings.CIRCUIT_BREAKER_PROBE_INTERVAL}
+        if redis_connection.hsetnx(OPEN_KEY, data_source.id, json.dumps(state)):
+            logger.warning("Opening the circuit of data source %s after %d connection failures.",
+                           data_source.id, failures)
+            data_source.pause(PAUSE_REASON)
+            _set_gauge(data_source.id, True)
+
+
+def open_circuits():
+    """
+    Returns a dict of the data source ids of the open circuits to their state.
+    """
+    return {int(data_source_id): json.loads(state)
+            for data_source_id, state in redis_connection.hgetall(OPEN_KEY).iteritems()}
+
+
+def probe_failed(data_source_id, state):
+    state['attempts'] += 1
+    backoff = settings.CIRCUIT_BREAKER_PROBE_INTERVAL * 2 ** state['attempts']
+    state['next_probe_at'] = time.time() + min(backoff, settings.CIRCUIT_BREAKER_MAX_PROBE_INTERVAL)
+    redis_connection.hset(OPEN_KEY, data_source_id, json.dumps(state))
+
+
+def close(data_source_id):
+    pipe = redis_connection.pipeline()
+    pipe.hdel(OPEN_KEY, data_source_id)
+    pipe.delete(_failures_key(data_source_id))
+    pipe.execute()
+    _set_gauge(data_source_id, False)
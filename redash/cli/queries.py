@@ -0,0 +1,18 @@
+from __future__ import print_function
+from click import option
+from flask.cli import AppGroup
+
+from redash import recent_queries
+
+manager = AppGroup(help="Queries management commands.")
+
+
+@manager.command()
+@option('--batch-size', default=1000, help="Number of events to process at a time (default: 1000).")
+def backfill_recent(batch_size):
+    """
+    Fills the users' recent queries from the events recorded before they were
+    tracked. Can be interrupted and run again to continue where it stopped.
+    """
+    processed = recent_queries.backfill(batch_size)
+    print("Processed {} events.".format(processed))
@@ -8,6 +8,7 @@ from redash.authentication import current_org
 from redash.handlers import routes
 from redash.handlers.base import json_response, record_event
 from redash.permissions import require_super_admin
+from redash.serializers import serialize_query
 from redash.tasks.queries import QueryTaskTracker
 
 
@@ -38,6 +39,27 @@ def outdated_queries():
              updated_at=manager_status['last_refresh_at']))
 
 
+@routes.route('/api/admin/queries/suspended', methods=['GET'])
+@require_super_admin
+@login_required
+def suspended_queries():
+    suspended_queries = (models.Query.query
+                         .filter(models.Query.schedule_suspended_at != None)
+                         .order_by(models.Query.schedule_suspended_at.desc()))
+
+    record_event(current_org, current_user, {
+        'action': 'view',
+        'object_type': 'api_call',
+        'object_id': 'admin/suspended_queries',
+        'timestamp': int(time.time()),
+    })
+
+    return json_response(
+        dict(queries=[dict(serialize_query(q, with_stats=True, with_last_modified_by=False),
+                           last_accessed_at=q.last_accessed_at)
+                      for q in suspended_queries]))
+
+
 @routes.route('/api/admin/queries/tasks', methods=['GET'])
 @require_super_admin
 @login_required
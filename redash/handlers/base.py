@@ -1,5 +1,8 @@
+import base64
+import json
 import time
 
+from dateutil import parser as date_parser
 from inspect import isclass
 from flask import Blueprint, current_app, request
 
@@ -8,11 +11,13 @@ from flask_restful import Resource, abort
 from redash import settings
 from redash.authentication import current_org
 from redash.models import ApiUser, db
-from redash.tasks import record_event as record_event_task
+from redash.tasks import enqueue_event
 from redash.utils import json_dumps
 from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy import cast, select, String
+from sqlalchemy import cast, select, tuple_, DateTime, String
 from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
 from sqlalchemy_utils import sort_query
 
 routes = Blueprint('redash', __name__, template_folder=settings.fix_assets_path('templates'))
@@ -68,7 +73,7 @@ def record_event(org, user, options):
     if 'timestamp' not in options:
         options['timestamp'] = int(time.time())
 
-    record_event_task.delay(options)
+    enqueue_event(options)
 
 
 def require_fields(req, fields):
@@ -87,13 +92,58 @@ def get_object_or_404(fn, *args, **kwargs):
     return rv
 
 
-def paginate(query_set, page, page_size, serializer, **kwargs):
-    count = query_set.count()
+COUNT_EXACT = 'exact'
+COUNT_ESTIMATED = 'estimated'
+
+
+class Explain(Executable, ClauseElement):
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, 'postgresql')
+def compile_explain(element, compiler, **kwargs):
+    return 'EXPLAIN (FORMAT JSON) {}'.format(compiler.process(element.statement, **kwargs))
+
+
+def estimated_count(query_set):
+    """
+    Returns the query planner's estimate of the number of rows in query_set. Unlike
+    an exact COUNT, this doesn't need to go over all the matching rows.
+    """
+    plan = db.session.execute(Explain(query_set.order_by(None).statement)).scalar()
+    if isinstance(plan, basestring):
+        plan = json.loads(plan)
+
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_results(query_set, count_mode):
+    if count_mode == COUNT_EXACT:
+        return query_set.count()
+
+    if count_mode == COUNT_ESTIMATED:
+        return estimated_count(query_set)
+
+    abort(400, message='Count must be one of: {}, {}.'.format(COUNT_EXACT, COUNT_ESTIMATED))
+
+
+def serialize_results(results, serializer, **kwargs):
+    # support for old function based serializers
+    if isclass(serializer):
+        return serializer(results, **kwargs).serialize()
+
+    return [serializer(result) for result in results]
+
+
+def paginate(query_set, page, page_size, serializer, count_mode=COUNT_EXACT, **kwargs):
+    count = count_results(query_set, count_mode)
 
     if page < 1:
         abort(400, message='Page must be positive integer.')
 
-    if (page - 1) * page_size + 1 > count > 0:
+    # estimates aren't accurate enough to reject pages
+    if count_mode == COUNT_EXACT and (page - 1) * page_size + 1 > count > 0:
         abort(400, message='Page is out of range.')
 
     if page_size > 250 or page_size < 1:
@@ -101,20 +151,86 @@ def paginate(query_set, page, page_size, serializer, **kwargs):
 
     results = query_set.paginate(page, page_size)
 
-    # support for old function based serializers
-    if isclass(serializer):
-        items = serializer(results.items, **kwargs).serialize()
-    else:
-        items = [serializer(result) for result in results.items]
-
     return {
         'count': count,
         'page': page,
         'page_size': page_size,
-        'results': items,
+        'results': serialize_results(results.items, serializer, **kwargs),
+    }
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json_dumps(values))
+
+
+def decode_cursor(cursor, columns):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(str(cursor)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+
+        return [date_parser.parse(value) if isinstance(column.type, DateTime) else value
+                for column, value in zip(columns, values)]
+    except (TypeError, ValueError):
+        abort(400, message='Invalid cursor.')
+
+
+def keyset_paginate(query_set, cursor, page_size, serializer, order_by, count_mode=COUNT_ESTIMATED, **kwargs):
+    """
+    Paginates query_set by seeking past the last row of the previous page (as
+    encoded in the cursor) instead of using OFFSET, so deep pages are as fast
+    as the first one.
+
+    The results are ordered by the order_by columns, descending. The last
+    column has to be unique (usually the primary key). An empty cursor returns
+    the first page, and next_cursor is None on the last page.
+    """
+    if page_size > 250 or page_size < 1:
+        abort(400, message='Page size is out of range (1-250).')
+
+    count = count_results(query_set, count_mode)
+
+    if cursor:
+        query_set = query_set.filter(tuple_(*order_by) < tuple_(*decode_cursor(cursor, order_by)))
+
+    results = (query_set
+               .order_by(None)
+               .order_by(*[column.desc() for column in order_by])
+               .limit(page_size + 1)
+               .all())
+
+    next_cursor = None
+    if len(results) > page_size:
+        results = results[:page_size]
+        next_cursor = encode_cursor([getattr(results[-1], column.key) for column in order_by])
+
+    return {
+        'count': count,
+        'page_size': page_size,
+        'next_cursor': next_cursor,
+        'results': serialize_results(results, serializer, **kwargs),
     }
 
 
+def paginate_request(query_set, serializer, order_by, **kwargs):
+    """
+    Paginates query_set according to the request arguments: cursor based
+    pagination when a cursor argument is given (empty for the first page), page
+    based otherwise. The count argument selects between exact and estimated
+    counts; cursor based pagination uses estimates unless asked otherwise.
+    """
+    page_size = request.args.get('page_size', 25, type=int)
+    cursor = request.args.get('cursor')
+
+    if cursor is not None:
+        count_mode = request.args.get('count', COUNT_ESTIMATED)
+        return keyset_paginate(query_set, cursor, page_size, serializer, order_by, count_mode, **kwargs)
+
+    page = request.args.get('page', 1, type=int)
+    count_mode = request.args.get('count', COUNT_EXACT)
+    return paginate(query_set, page, page_size, serializer, count_mode, **kwargs)
+
+
 def org_scoped_rule(rule):
     if settings.MULTI_ORG:
         return "/<org_slug:org_slug>{}".format(rule)
@@ -4,8 +4,8 @@ from flask import request, url_for
 from funcy import distinct, project, take
 
 from flask_restful import abort
-from redash import models, serializers, settings
-from redash.handlers.base import BaseResource, get_object_or_404, paginate, filter_by_tags
+from redash import last_access, models, serializers, settings
+from redash.handlers.base import BaseResource, get_object_or_404, paginate_request, filter_by_tags
 from redash.serializers import serialize_dashboard
 from redash.permissions import (can_modify, require_admin_or_owner,
                                 require_object_modify_permission,
@@ -19,6 +19,11 @@ class DashboardListResource(BaseResource):
     def get(self):
         """
         Lists all accessible dashboards.
+
+        :qparam number page_size: Number of dashboards to return per page
+        :qparam number page: Page number to retrieve
+        :qparam string cursor: Cursor for cursor based pagination (``next_cursor`` of the previous page, empty for the first page)
+        :qparam string count: ``exact`` or ``estimated`` result count
         """
         search_term = request.args.get('q')
 
@@ -29,9 +34,7 @@ class DashboardListResource(BaseResource):
 
         results = filter_by_tags(results, models.Dashboard.tags)
 
-        page = request.args.get('page', 1, type=int)
-        page_size = request.args.get('page_size', 25, type=int)
-        response = paginate(results, page, page_size, serialize_dashboard)
+        response = paginate_request(results, serialize_dashboard, (models.Dashboard.created_at, models.Dashboard.id))
 
         return response
 
@@ -102,6 +105,8 @@ class DashboardResource(BaseResource):
 
         response['can_edit'] = can_modify(dashboard, self.current_user)
 
+        last_access.record('dashboard', dashboard.id)
+
         self.record_event({
             'action': 'view',
             'object_id': dashboard.id,
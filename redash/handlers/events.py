@@ -2,7 +2,8 @@ from flask import request
 from geoip import geolite2
 from user_agents import parse as parse_ua
 
-from redash.handlers.base import BaseResource, paginate
+from redash.handlers.base import BaseResource, paginate_request
+from redash.models import Event
 from redash.permissions import require_admin
 
 
@@ -62,6 +63,4 @@ class EventsResource(BaseResource):
 
     @require_admin
     def get(self):
-        page = request.args.get('page', 1, type=int)
-        page_size = request.args.get('page_size', 25, type=int)
-        return paginate(self.current_org.events, page, page_size, serialize_event)
+        return paginate_request(self.current_org.events, serialize_event, (Event.created_at, Event.id))
@@ -5,10 +5,10 @@ from flask_restful import abort
 from sqlalchemy.orm.exc import StaleDataError
 from funcy import rpartial
 
-from redash import models
+from redash import models, recent_queries
 from redash.authentication.org_resolving import current_org
 from redash.handlers.base import (BaseResource, filter_by_tags, get_object_or_404,
-                                  org_scoped_rule, paginate, routes, order_results as _order_results)
+                                  org_scoped_rule, paginate_request, routes, order_results as _order_results)
 from redash.handlers.query_results import run_query
 from redash.permissions import (can_modify, not_view_only, require_access,
                                 require_admin_or_owner,
@@ -36,6 +36,9 @@ order_map = {
 
 order_results = rpartial(_order_results, '-created_at', order_map)
 
+# Ordering used by cursor based pagination
+keyset_order = (models.Query.created_at, models.Query.id)
+
 
 @routes.route(org_scoped_rule('/api/queries/format'), methods=['POST'])
 @login_required
@@ -88,12 +91,23 @@ class QueryRecentResource(BaseResource):
     @require_permission('view_query')
     def get(self):
         """
-        Retrieve up to 10 queries recently modified by the user.
+        Retrieve up to 10 queries the user recently worked with (edited, executed or
+        viewed), or recently modified by the user if there's no such activity yet.
 
         Responds with a list of :ref:`query <query-response-label>` objects.
         """
+        query_ids = recent_queries.get(self.current_user.id, limit=10)
+
+        if query_ids:
+            queries = models.Query.all_queries(self.current_user.group_ids, self.current_user.id).filter(
+                models.Query.id.in_(query_ids))
+            results = sorted(queries, key=lambda query: query_ids.index(query.id))
+        else:
+            # activity that isn't tracked in Redis yet (before the backfill) is in the daily event counts
+            results = models.Query.recent(self.current_user.group_ids, self.current_user.id, limit=10).all()
+            if not results:
+                results = models.Query.by_user(self.current_user).order_by(models.Query.updated_at.desc()).limit(10)
 
-        results = models.Query.by_user(self.current_user).order_by(models.Query.updated_at.desc()).limit(10)
         return QuerySerializer(results, with_last_modified_by=False, with_user=False).serialize()
 
 
@@ -169,6 +183,8 @@ class QueryListResource(BaseResource):
 
         :qparam number page_size: Number of queries to return per page
         :qparam number page: Page number to retrieve
+        :qparam string cursor: Cursor for cursor based pagination (``next_cursor`` of the previous page, empty for the first page); results are then ordered by creation time
+        :qparam string count: ``exact`` or ``estimated`` result count
         :qparam number order: Name of column to order by
         :qparam number q: Full text search term
 
@@ -193,17 +209,17 @@ class QueryListResource(BaseResource):
 
         results = filter_by_tags(results, models.Query.tags)
 
-        # order results according to passed order parameter
-        ordered_results = order_results(results)
-
-        page = request.args.get('page', 1, type=int)
-        page_size = request.args.get('page_size', 25, type=int)
+        # order results according to passed order parameter, search results
+        # are ranked by relevance unless asked otherwise
+        if search_term and not request.args.get('order'):
+            ordered_results = results
+        else:
+            ordered_results = order_results(results)
 
-        response = paginate(
+        response = paginate_request(
             ordered_results,
-            page=page,
-            page_size=page_size,
             serializer=QuerySerializer,
+            order_by=keyset_order,
             with_stats=True,
             with_last_modified_by=False
         )
@@ -219,6 +235,8 @@ class MyQueriesResource(BaseResource):
 
         :qparam number page_size: Number of queries to return per page
         :qparam number page: Page number to retrieve
+        :qparam string cursor: Cursor for cursor based pagination (``next_cursor`` of the previous page, empty for the first page); results are then ordered by creation time
+        :qparam string count: ``exact`` or ``estimated`` result count
         :qparam number order: Name of column to order by
         :qparam number search: Full text search term
 
@@ -232,16 +250,17 @@ class MyQueriesResource(BaseResource):
 
         results = filter_by_tags(results, models.Query.tags)
 
-        # order results according to passed order parameter
-        ordered_results = order_results(results)
+        # order results according to passed order parameter, search results
+        # are ranked by relevance unless asked otherwise
+        if search_term and not request.args.get('order'):
+            ordered_results = results
+        else:
+            ordered_results = order_results(results)
 
-        page = request.args.get('page', 1, type=int)
-        page_size = request.args.get('page_size', 25, type=int)
-        return paginate(
+        return paginate_request(
             ordered_results,
-            page,
-            page_size,
             QuerySerializer,
+            keyset_order,
             with_stats=True,
             with_last_modified_by=False,
         )
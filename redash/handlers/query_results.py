@@ -1,13 +1,12 @@
 import logging
-import json
 import time
 
 import pystache
 from flask import make_response, request
 from flask_login import current_user
 from flask_restful import abort
-from redash import models, settings, utils
-from redash.tasks import QueryTask, record_event
+from redash import last_access, models, settings, utils
+from redash.tasks import QueryTask, enqueue_event
 from redash.permissions import require_permission, not_view_only, has_access, require_access, view_only
 from redash.handlers.base import BaseResource, get_object_or_404
 from redash.utils import collect_query_parameters, collect_parameters_from_request, gen_query_hash
@@ -18,6 +17,17 @@ def error_response(message):
     return {'job': {'status': 4, 'error': message}}, 400
 
 
+def requested_row_format():
+    """
+    Clients that handle rows as lists of values ask for them with
+    ?row_format=positional, others get rows as dicts.
+    """
+    if request.args.get('row_format') == utils.POSITIONAL_ROWS:
+        return utils.POSITIONAL_ROWS
+
+    return None
+
+
 #
 # Run a parameterized query synchronously and return the result
 # DISCLAIMER: Temporary solution to support parameters in queries. Should be
@@ -142,7 +152,7 @@ class QueryResultSetResource(BaseResource):
         # Synthesize a result set from the last N results.
         total = len(query.query_results)
         offset = max(total - query.schedule_resultset_size, 0)
-        results = [qr.to_dict() for qr in query.query_results[offset:]]
+        results = [qr.to_dict(requested_row_format()) for qr in query.query_results[offset:]]
         if not results:
             aggregate_result = {}
         else:
@@ -150,11 +160,13 @@ class QueryResultSetResource(BaseResource):
             aggregate_result = results[0].copy()
             aggregate_result['data'] = {'columns': results[0]['data']['columns'],
                                         'rows': []}
+            if 'row_format' in results[0]['data']:
+                aggregate_result['data']['row_format'] = results[0]['data']['row_format']
             # .. then add each subsequent result set into it.
             for r in results:
                 aggregate_result['data']['rows'].extend(r['data']['rows'])
 
-        data = json.dumps({'query_result': aggregate_result}, cls=utils.JSONEncoder)
+        data = utils.json_dumps({'query_result': aggregate_result})
         headers = {'Content-Type': "application/json"}
         return make_response(data, 200, headers)
 
@@ -190,6 +202,7 @@ class QueryResultResource(BaseResource):
         :param number query_id: The ID of the query whose results should be fetched
         :param number query_result_id: the ID of the query result to fetch
         :param string filetype: Format to return. One of 'json', 'xlsx', or 'csv'. Defaults to 'json'.
+        :qparam string row_format: ``positional`` to get the rows as arrays of values, in the order of the columns
 
         :<json number id: Query result ID
         :<json string query: Query that produced this result
@@ -226,6 +239,9 @@ class QueryResultResource(BaseResource):
                 if query.query_hash != query_result.query_hash:
                     abort(404, message='No cached result found for this query.')
 
+            if query is not None:
+                last_access.record('query', query.id)
+
         if query_result:
             require_access(query_result.data_source.groups, self.current_user, view_only)
 
@@ -248,7 +264,7 @@ class QueryResultResource(BaseResource):
                     event['object_type'] = 'query_result'
                     event['object_id'] = query_result_id
 
-                record_event.delay(event)
+                enqueue_event(event)
 
             if filetype == 'json':
                 response = self.make_json_response(query_result)
@@ -269,7 +285,7 @@ class QueryResultResource(BaseResource):
             abort(404, message='No cached result found for this query.')
 
     def make_json_response(self, query_result):
-        data = json.dumps({'query_result': query_result.to_dict()}, cls=utils.JSONEncoder)
+        data = utils.json_dumps({'query_result': query_result.to_dict(requested_row_format())})
         headers = {'Content-Type': "application/json"}
         return make_response(data, 200, headers)
 
@@ -64,7 +64,9 @@ class UserListResource(BaseResource):
         if search_term:
             users = models.User.search(users, search_term)
 
-        users = order_results(users)
+        # search results are ranked by relevance unless asked otherwise
+        if not search_term or request.args.get('order'):
+            users = order_results(users)
 
         self.record_event({
             'action': 'view',
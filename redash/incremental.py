@@ -0,0 +1,242 @@
+"""
+Incremental refresh of scheduled queries over append-only data.
+
+Queries refreshed incrementally have an "incremental" option, like:
+
+    {"column": "created_at", "max_rows": 100000, "window": 2592000}
+
+After each refresh, the highest value of `column` in the result (a number or
+a timestamp) is kept as the query's watermark. The next scheduled refresh
+renders the query with it as the ``last_watermark`` parameter, a SQL literal
+(timestamps are quoted), so it only returns the new rows:
+
+    SELECT * FROM events
+    {{#last_watermark}}WHERE created_at > {{last_watermark}}{{/last_watermark}}
+
+and they're appended to the rows of the previous result. The merged result
+keeps up to `max_rows` rows (the latest ones), and only rows within `window`
+seconds of the watermark, when set. Without a watermark (on the first refresh,
+or after the query text changed) the section is left out, and the result is
+replaced.
+
+New rows that can't be appended (when the query has no previous result of its
+current text, or the columns changed) are dropped, and the query is refreshed
+without a watermark instead, so no rows get lost.
+"""
+import datetime
+import logging
+import math
+import re
+
+import pystache
+from dateutil import parser as date_parser, tz
+
+from redash import utils
+
+logger = logging.getLogger(__name__)
+
+
+# ISO 8601 timestamps, like the ones of query results (see utils.JSONEncoder), are
+# parsed without dateutil, which takes much longer.
+_ISO_TIMESTAMP = re.compile(r'^(\d{4})-(\d{2})-(\d{2})'
+                            r'(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6})\d*)?)?)?'
+                            r'(?:(Z)|([+-])(\d{2}):?(\d{2}))?$')
+
+
+class SQLLiteral(unicode):
+    """
+    A parameter value that is rendered into query text as it is.
+    """
+
+
+def _escape(value):
+    if isinstance(value, SQLLiteral):
+        return value
+
+    return pystache.defaults.TAG_ESCAPE(value)
+
+
+_renderer = pystache.Renderer(escape=_escape)
+
+
+def render(query_text, params):
+    """
+    Renders query text like pystache.render, except for SQLLiteral parameters,
+    which aren't escaped.
+    """
+    return _renderer.render(query_text, params)
+
+
+def get_options(query):
+    """
+    Returns the incremental refresh options of `query`, or None if it isn't
+    refreshed incrementally.
+    """
+    options = (query.options or {}).get('incremental')
+    if not options or not options.get('column'):
+        return None
+
+    return options
+
+
+def _parse_timestamp(value):
+    match = _ISO_TIMESTAMP.match(value)
+    if match is None:
+        return date_parser.parse(value)
+
+    year, month, day, hour, minute, second, fraction, utc, sign, offset_hours, offset_minutes = match.groups()
+    timestamp = datetime.datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0),
+                                  int(second or 0), int((fraction or '0').ljust(6, '0')))
+    if utc:
+        timestamp = timestamp.replace(tzinfo=tz.tzutc())
+    elif sign:
+        offset = (int(offset_hours) * 60 + int(offset_minutes)) * (1 if sign == '+' else -1)
+        timestamp = timestamp.replace(tzinfo=tz.tzoffset(None, offset * 60))
+
+    return timestamp
+
+
+def _parse_string(value):
+    for number_type in (int, float):
+        try:
+            return number_type(value)
+        except ValueError:
+            pass
+
+    try:
+        return _parse_timestamp(value)
+    except (ValueError, OverflowError, TypeError):
+        raise ValueError("Watermarks are numbers or timestamps, not {!r}.".format(value))
+
+
+def parse_watermark(value):
+    """
+    Returns the number or datetime of a watermark value (as found in query
+    results, or kept as the query's watermark). Raises ValueError if it's
+    neither.
+    """
+    if isinstance(value, basestring):
+        value = _parse_string(value)
+        if isinstance(value, datetime.datetime):
+            return value
+
+    if (not isinstance(value, (int, long, float)) or isinstance(value, bool) or
+            math.isinf(value) or math.isnan(value)):
+        raise ValueError("Watermarks are numbers or timestamps, not {!r}.".format(value))
+
+    return value
+
+
+def _sort_key(value):
+    """
+    Returns the parsed watermark `value`, with timestamps in UTC so they compare
+    whatever their format, or None if it isn't a watermark.
+    """
+    try:
+        value = parse_watermark(value)
+    except ValueError:
+        return None
+
+    if isinstance(value, datetime.datetime) and value.tzinfo is not None:
+        value = value.astimezone(tz.tzutc()).replace(tzinfo=None)
+
+    return value
+
+
+def to_sql_literal(watermark):
+    """
+    Returns `watermark` as a SQL literal to render into query text, or None if
+    it isn't a number or a timestamp.
+    """
+    try:
+        value = parse_watermark(watermark)
+    except ValueError:
+        return None
+
+    if isinstance(value, datetime.datetime):
+        # only digits and separators, so there are no quotes to escape
+        return SQLLiteral(u"'{}'".format(value.isoformat(' ')))
+
+    # repr keeps the precision of floats, but adds an L to longs
+    return SQLLiteral(repr(value) if isinstance(value, float) else unicode(value))
+
+
+def _column_keys(data, column):
+    return [_sort_key(row.get(column)) for row in utils.iter_row_dicts(data)]
+
+
+def get_watermark(data, column):
+    """
+    Returns the highest value of `column` in query result `data`, comparing
+    them as numbers or timestamps, or None if there are no such values.
+    """
+    watermark, highest = None, None
+    for row in utils.iter_row_dicts(data):
+        value = row.get(column)
+        key = _sort_key(value)
+        if key is not None and (highest is None or key > highest):
+            watermark, highest = value, key
+
+    return watermark
+
+
+def _cutoff(watermark, window):
+    if isinstance(watermark, datetime.datetime):
+        return watermark - datetime.timedelta(seconds=window)
+
+    return watermark - window
+
+
+def merge(previous, data, column, max_rows=None, window=None):
+    """
+    Returns query result `data` with the rows of `previous` before its own,
+    in its row format, or None if their columns differ.
+    """
+    if [c['name'] for c in previous['columns']] != [c['name'] for c in data['columns']]:
+        return None
+
+    merged = dict(data)
+    merged['rows'] = utils.convert_rows(previous, data.get('row_format'))['rows'] + data['rows']
+
+    keys = _column_keys(merged, column)
+    if window and any(key is not None for key in keys):
+        cutoff = _cutoff(max(key for key in keys if key is not None), window)
+        merged['rows'] = [row for row, key in zip(merged['rows'], keys)
+                          if key is not None and key >= cutoff]
+
+    if max_rows:
+        merged['rows'] = merged['rows'][-max_rows:]
+
+    return merged
+
+
+def refresh_result(query, data, last_watermark):
+    """
+    Returns the data to store as the result of an incremental refresh of
+    `query`, which returned `data` with `last_watermark`, and updates the
+    query's watermark. Returns None, and resets the watermark, when the rows
+    can't be merged with the previous result: the query has to be refreshed in
+    full then.
+    """
+    options = get_options(query)
+    data = utils.json_loads(data)
+
+    if last_watermark is not None:
+        previous = query.latest_query_data
+        # only merges with results of the current query text, from before this watermark
+        if previous is None or previous.query_hash != query.query_hash:
+            logger.warning("Query %s has no result to add new rows to, it has to be fully refreshed.", query.id)
+            query.last_watermark = None
+            return None
+
+        merged = merge(utils.json_loads(previous.data), data, options['column'],
+                       options.get('max_rows'), options.get('window'))
+        if merged is None:
+            logger.warning("Columns of query %s changed, it has to be fully refreshed.", query.id)
+            query.last_watermark = None
+            return None
+        data = merged
+
+    watermark = get_watermark(data, options['column'])
+    query.last_watermark = unicode(watermark) if watermark is not None else None
+    return utils.json_dumps(data)
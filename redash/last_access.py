@@ -0,0 +1,42 @@
+"""
+Last access times of queries and dashboards.
+
+Views only record them in Redis hashes (one HSET per view), the
+sync_last_access task writes them to the database in batches.
+"""
+import datetime
+import time
+
+import pytz
+
+from redash import redis_connection
+
+KEYS = {
+    'query': 'last_access:queries',
+    'dashboard': 'last_access:dashboards',
+}
+
+
+def record(object_type, object_id):
+    redis_connection.hset(KEYS[object_type], object_id, int(time.time()))
+
+
+def pop():
+    """
+    Returns and clears the recorded access times, as a dict of object types to
+    dicts of ids to access times.
+    """
+    pipe = redis_connection.pipeline()
+    for key in KEYS.values():
+        pipe.hgetall(key)
+        pipe.delete(key)
+    results = pipe.execute()
+
+    accessed = {}
+    for object_type, values in zip(KEYS.keys(), results[::2]):
+        accessed[object_type] = {
+            int(object_id): datetime.datetime.fromtimestamp(int(timestamp), pytz.utc)
+            for object_id, timestamp in values.iteritems()
+        }
+
+    return accessed
@@ -7,7 +7,7 @@ from redash import statsd_client
 from sqlalchemy.engine import Engine
 from sqlalchemy.event import listens_for
 from sqlalchemy.orm.util import _ORMJoin
-from sqlalchemy.sql.selectable import Alias
+from sqlalchemy.sql.selectable import Alias, CompoundSelect
 
 metrics_logger = logging.getLogger("metrics")
 
@@ -16,7 +16,10 @@ def _table_name_from_select_element(elt):
     t = elt.froms[0]
 
     if isinstance(t, Alias):
-        t = t.original.froms[0]
+        t = t.original
+        if isinstance(t, CompoundSelect):
+            t = t.selects[0]
+        t = t.froms[0]
 
     while isinstance(t, _ORMJoin):
         t = t.left
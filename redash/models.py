@@ -1,6 +1,6 @@
 import six
+import calendar
 import cStringIO
-import csv
 import datetime
 import functools
 import hashlib
@@ -10,33 +10,36 @@ import logging
 import time
 
 import xlsxwriter
+from dateutil import parser as date_parser
 from flask import current_app as app, url_for
 from flask_login import AnonymousUserMixin, UserMixin
-from flask_sqlalchemy import SQLAlchemy, BaseQuery
+from flask_sqlalchemy import SQLAlchemy, BaseQuery, SignallingSession
 from passlib.apps import custom_app_context as pwd_context
-from redash import settings, redis_connection, utils
+from redash import settings, redis_connection, recent_queries, result_storage, utils
 from redash.destinations import (get_configuration_schema_for_destination_type,
                                  get_destination)
 from redash.metrics import database  # noqa: F401
 from redash.permissions import has_access, view_only
 from redash.query_runner import (get_configuration_schema_for_query_runner_type,
-                                 get_query_runner)
-from redash.utils import generate_token, json_dumps
+                                 get_query_runner, get_data_source_query_runner)
+from redash.utils import generate_token, json_dumps, json_loads
+from redash.utils.cache import TieredCache, request_cache
 from redash.utils.configuration import ConfigurationContainer
 from redash.settings.organization import settings as org_settings
-from sqlalchemy import distinct, or_, and_, UniqueConstraint
+from sqlalchemy import distinct, or_, and_, literal, DDL, UniqueConstraint
 from sqlalchemy.dialects import postgresql
-from sqlalchemy.event import listens_for
+from sqlalchemy.event import listen, listens_for
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.ext.mutable import Mutable
 from sqlalchemy.inspection import inspect
-from sqlalchemy.orm import backref, contains_eager, joinedload, object_session
+from sqlalchemy.orm import backref, contains_eager, joinedload, load_only, make_transient_to_detached, object_session
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.orm.exc import NoResultFound  # noqa: F401
 from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm.attributes import flag_modified
 from functools import reduce
 from sqlalchemy import func
-from sqlalchemy_searchable import SearchQueryMixin, make_searchable, vectorizer
+from sqlalchemy_searchable import SearchQueryMixin, make_searchable, vectorizer, search as full_text_search
 from sqlalchemy_utils import generic_relationship, EmailType
 from sqlalchemy_utils.types import TSVectorType
 
@@ -72,6 +75,42 @@ class SearchBaseQuery(BaseQuery, SearchQueryMixin):
 Column = functools.partial(db.Column, nullable=False)
 
 
+def after_commit(callback):
+    """
+    Calls `callback` once the current transaction of db.session is committed.
+    It's dropped if the transaction is rolled back instead.
+    """
+    db.session().info.setdefault('after_commit', []).append(callback)
+
+
+def after_rollback(callback):
+    """
+    Calls `callback` if the current transaction of db.session ends without being
+    committed (rolled back or closed).
+    """
+    db.session().info.setdefault('after_rollback', []).append(callback)
+
+
+@listens_for(SignallingSession, 'after_commit')
+def run_after_commit_callbacks(session):
+    if session.transaction.nested:
+        return
+
+    session.info.pop('after_rollback', None)
+    for callback in session.info.pop('after_commit', []):
+        callback()
+
+
+@listens_for(SignallingSession, 'after_transaction_end')
+def run_after_rollback_callbacks(session, transaction):
+    if transaction.parent is not None:
+        return
+
+    session.info.pop('after_commit', None)
+    for callback in session.info.pop('after_rollback', []):
+        callback()
+
+
 class ScheduledQueriesExecutions(object):
     KEY_NAME = 'sq:executed_at'
 
@@ -238,6 +277,207 @@ class ChangeTrackingMixin(object):
             return change
 
 
+auth_cache = TieredCache('auth', settings.AUTH_CACHE_LOCAL_TTL, settings.AUTH_CACHE_TTL)
+
+
+class CachedLookupMixin(object):
+    """
+    Caches the rows authentication looks up on every request (when AUTH_CACHE_ENABLED
+    is set). The cached column values are attached to the session without a query.
+    """
+    # Columns get_cached() can look rows up by, besides the id.
+    cached_lookup_columns = ()
+    # Columns that aren't cached, they are loaded from the database when accessed.
+    uncached_columns = ()
+
+    @classmethod
+    def _row_cache_key(cls, id):
+        return u'{}:id:{}'.format(cls.__tablename__, id)
+
+    @classmethod
+    def _lookup_cache_key(cls, column, value):
+        return u'{}:{}:{}'.format(cls.__tablename__, column, value)
+
+    @classmethod
+    def get_cached(cls, column, value, loader):
+        """
+        Returns the instance whose `column` equals `value`. On cache misses it's
+        loaded with `loader()`, which might raise NoResultFound. Lookups that didn't
+        find a row are cached as well, until a row with that value is inserted.
+        """
+        if not settings.AUTH_CACHE_ENABLED:
+            return loader()
+
+        if column == 'id':
+            id = value
+        else:
+            id = auth_cache.get(cls._lookup_cache_key(column, value))
+            if id is False:
+                raise NoResultFound()
+
+        if id is not None:
+            row = auth_cache.get(cls._row_cache_key(id))
+            # The lookup might be outdated, if the row's value has changed since.
+            if row is not None and unicode(row[column]) == unicode(value):
+                return cls._from_cached_row(row)
+
+        try:
+            obj = loader()
+        except NoResultFound:
+            if column != 'id':
+                auth_cache.set(cls._lookup_cache_key(column, value), False)
+            raise
+
+        if obj is not None:
+            if column != 'id':
+                auth_cache.set(cls._lookup_cache_key(column, value), obj.id)
+            auth_cache.set(cls._row_cache_key(obj.id), obj._cached_row())
+
+        return obj
+
+    def _cached_row(self):
+        return {attr.key: getattr(self, attr.key) for attr in inspect(self.__class__).column_attrs
+                if attr.key not in self.uncached_columns}
+
+    @classmethod
+    def _from_cached_row(cls, row):
+        mapper = inspect(cls)
+        obj = mapper.class_manager.new_instance()
+        for attr in mapper.column_attrs:
+            if attr.key not in row:
+                continue
+
+            value = row[attr.key]
+            if value is not None and isinstance(attr.columns[0].type, db.DateTime):
+                value = date_parser.parse(value)
+            set_committed_value(obj, attr.key, value)
+
+        make_transient_to_detached(obj)
+        obj = db.session.merge(obj, load=False)
+
+        # Let mutable columns (like User.group_ids) track changes on the merged instance.
+        state = inspect(obj)
+        state.manager.dispatch.load(state, None)
+
+        return obj
+
+    def invalidate_cache(self):
+        # Only looks at loaded values, as this runs during flush. Outdated lookups of
+        # values that aren't loaded are detected by get_cached().
+        values = inspect(self).dict
+        keys = [self._row_cache_key(self.id)]
+        keys.extend(self._lookup_cache_key(column, values[column])
+                    for column in self.cached_lookup_columns if column in values)
+        auth_cache.delete(*keys)
+        # Other requests might cache the old row again until the change is
+        # committed, and this transaction might cache changes it rolls back.
+        after_commit(lambda: auth_cache.delete(*keys))
+        after_rollback(lambda: auth_cache.delete(*keys))
+
+
+@listens_for(CachedLookupMixin, 'after_insert', propagate=True)
+@listens_for(CachedLookupMixin, 'after_update', propagate=True)
+@listens_for(CachedLookupMixin, 'after_delete', propagate=True)
+def invalidate_cached_lookups(mapper, connection, target):
+    if settings.AUTH_CACHE_ENABLED:
+        target.invalidate_cache()
+
+
+# The trigram indexes used by search need the pg_trgm extension.
+listen(db.metadata, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+
+
+class TrigramSearchMixin(object):
+    """
+    Substring search over `search_columns`, backed by pg_trgm indexes. Results
+    are ranked by the similarity of the columns to the search term, weighted by
+    the given weights.
+    """
+    # (column attribute, weight) pairs.
+    search_columns = ()
+    # Whether a numeric term matches the id as well.
+    search_by_id = False
+
+    @classmethod
+    def _search_term_id(cls, term):
+        if cls.search_by_id and term.isdigit():
+            return int(term)
+
+        return None
+
+    @classmethod
+    def search_filter(cls, term):
+        pattern = u'%{}%'.format(term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+        conditions = [getattr(cls, column).ilike(pattern, escape='\\') for column, _ in cls.search_columns]
+
+        term_id = cls._search_term_id(term)
+        if term_id is not None:
+            conditions.append(cls.id == term_id)
+
+        return or_(*conditions)
+
+    @classmethod
+    def search_matches(cls, query, term):
+        """
+        Returns queries narrowing `query` down to the rows matching `term`. Their
+        results are UNIONed, which unlike an OR lets each of them use its indexes.
+        """
+        return [query.filter(cls.search_filter(term))]
+
+    @classmethod
+    def search_rank(cls, term):
+        rank = sum(weight * func.similarity(func.coalesce(getattr(cls, column), u''), term)
+                   for column, weight in cls.search_columns)
+
+        term_id = cls._search_term_id(term)
+        if term_id is not None:
+            rank += db.case([(cls.id == term_id, 1)], else_=0)
+
+        return rank
+
+    @classmethod
+    def search_ids(cls, term, query, cache_key=None):
+        """
+        Returns the ids (selected by `query`) of the rows matching `term`, best
+        match first. When a `cache_key` is given, which has to identify the user
+        and the base query, the results are cached for SEARCH_CACHE_TTL seconds.
+        """
+        if cache_key is not None and settings.SEARCH_CACHE_TTL:
+            digest = hashlib.md5(json_dumps([term, cache_key])).hexdigest()
+            redis_key = 'search:{}:{}'.format(cls.__tablename__, digest)
+            cached = redis_connection.get(redis_key)
+            if cached is not None:
+                return json.loads(cached)
+
+        rank = cls.search_rank(term).label('rank')
+        matches = [match.add_columns(rank).statement for match in cls.search_matches(query, term)]
+        matches = (db.union(*matches) if len(matches) > 1 else matches[0]).alias()
+
+        ids = [row[0] for row in db.session.query(matches.c.id)
+               .order_by(matches.c.rank.desc(), matches.c.id.desc())
+               .limit(settings.SEARCH_RESULTS_LIMIT)]
+
+        if cache_key is not None and settings.SEARCH_CACHE_TTL:
+            redis_connection.setex(redis_key, settings.SEARCH_CACHE_TTL, json_dumps(ids))
+
+        return ids
+
+    @classmethod
+    def filter_by_search_ids(cls, query, ids, ordered=True):
+        """
+        Narrows `query` down to the given search results, in their order unless
+        `ordered` is false (e.g. for queries using DISTINCT).
+        """
+        if not ids:
+            return query.filter(db.false())
+
+        query = query.filter(cls.id.in_(ids))
+        if ordered:
+            query = query.order_by(None).order_by(func.array_position(postgresql.array(ids), cls.id))
+
+        return query
+
+
 class BelongsToOrgMixin(object):
     @classmethod
     def get_by_id_and_org(cls, object_id, org):
@@ -293,9 +533,10 @@ class ApiUser(UserMixin, PermissionsCheckMixin):
         return False
 
 
-class Organization(TimestampMixin, db.Model):
+class Organization(TimestampMixin, CachedLookupMixin, db.Model):
     SETTING_GOOGLE_APPS_DOMAINS = 'google_apps_domains'
     SETTING_IS_PUBLIC = "is_public"
+    cached_lookup_columns = ('slug',)
 
     id = Column(db.Integer, primary_key=True)
     name = Column(db.String(255))
@@ -414,7 +655,8 @@ class Group(db.Model, BelongsToOrgMixin):
         return unicode(self.id)
 
 
-class User(TimestampMixin, db.Model, BelongsToOrgMixin, UserMixin, PermissionsCheckMixin):
+class User(TimestampMixin, CachedLookupMixin, TrigramSearchMixin, db.Model, BelongsToOrgMixin, UserMixin,
+           PermissionsCheckMixin):
     id = Column(db.Integer, primary_key=True)
     org_id = Column(db.Integer, db.ForeignKey('organizations.id'))
     org = db.relationship(Organization, backref=db.backref("users", lazy="dynamic"))
@@ -431,7 +673,15 @@ class User(TimestampMixin, db.Model, BelongsToOrgMixin, UserMixin, PermissionsCh
     disabled_at = Column(db.DateTime(True), default=None, nullable=True)
 
     __tablename__ = 'users'
-    __table_args__ = (db.Index('users_org_id_email', 'org_id', 'email', unique=True),)
+    __table_args__ = (db.Index('users_org_id_email', 'org_id', 'email', unique=True),
+                      db.Index('users_name_trgm', 'name', postgresql_using='gin',
+                               postgresql_ops={'name': 'gin_trgm_ops'}),
+                      db.Index('users_email_trgm', 'email', postgresql_using='gin',
+                               postgresql_ops={'email': 'gin_trgm_ops'}))
+
+    cached_lookup_columns = ('api_key',)
+    uncached_columns = ('password_hash',)
+    search_columns = (('name', 2), ('email', 1))
 
     @property
     def is_disabled(self):
@@ -448,7 +698,7 @@ class User(TimestampMixin, db.Model, BelongsToOrgMixin, UserMixin, PermissionsCh
             kwargs['email'] = kwargs['email'].lower()
         super(User, self).__init__(*args, **kwargs)
 
-    def to_dict(self, with_api_key=False):
+    def to_dict(self, with_api_key=False, with_last_active_at=True):
         profile_image_url = self.profile_image_url
         if self.is_disabled:
             assets = app.extensions['webpack']['assets'] or {}
@@ -475,10 +725,26 @@ class User(TimestampMixin, db.Model, BelongsToOrgMixin, UserMixin, PermissionsCh
         if with_api_key:
             d['api_key'] = self.api_key
 
-        d['last_active_at'] = Event.query.filter(Event.user_id == self.id).with_entities(Event.created_at).order_by(Event.created_at.desc()).first()
+        if with_last_active_at:
+            d['last_active_at'] = Event.query.filter(Event.user_id == self.id).with_entities(Event.created_at).order_by(Event.created_at.desc()).first()
 
         return d
 
+    @classmethod
+    def last_active_at_map(cls, user_ids):
+        """
+        Loads the last activity of several users with a single query. Values have
+        the same shape as the last_active_at field of to_dict.
+        """
+        if not user_ids:
+            return {}
+
+        last_active_at = (db.session.query(Event.user_id, func.max(Event.created_at))
+                          .filter(Event.user_id.in_(user_ids))
+                          .group_by(Event.user_id))
+
+        return {user_id: (created_at,) for user_id, created_at in last_active_at}
+
     def is_api_user(self):
         return False
 
@@ -492,9 +758,17 @@ class User(TimestampMixin, db.Model, BelongsToOrgMixin, UserMixin, PermissionsCh
 
     @property
     def permissions(self):
-        # TODO: this should be cached.
-        return list(itertools.chain(*[g.permissions for g in
-                                      Group.query.filter(Group.id.in_(self.group_ids))]))
+        cache = request_cache('group_permissions')
+        key = tuple(sorted(self.group_ids or []))
+
+        if cache is None or key not in cache:
+            permissions = list(itertools.chain(*[g.permissions for g in
+                                                 Group.query.filter(Group.id.in_(self.group_ids))]))
+            if cache is None:
+                return permissions
+            cache[key] = permissions
+
+        return list(cache[key])
 
     @classmethod
     def get_by_email_and_org(cls, email, org):
@@ -510,10 +784,7 @@ class User(TimestampMixin, db.Model, BelongsToOrgMixin, UserMixin, PermissionsCh
 
     @classmethod
     def search(cls, base_query, term):
-        term = u'%{}%'.format(term)
-        search_filter = or_(cls.name.ilike(term), cls.email.like(term))
-
-        return base_query.filter(search_filter)
+        return base_query.filter(cls.search_filter(term)).order_by(None).order_by(cls.search_rank(term).desc())
 
     @classmethod
     def all_disabled(cls, org):
@@ -631,8 +902,10 @@ class DataSource(BelongsToOrgMixin, db.Model):
 
     def delete(self):
         Query.query.filter(Query.data_source == self).update(dict(data_source_id=None, latest_query_data_id=None))
-        QueryResult.query.filter(QueryResult.data_source == self).delete()
+        QueryResult.delete_results(QueryResult.query.filter(QueryResult.data_source == self),
+                                   synchronize_session='evaluate')
         res = db.session.delete(self)
+        self.invalidate_groups_cache(self.id)
         db.session.commit()
         return res
 
@@ -673,6 +946,7 @@ class DataSource(BelongsToOrgMixin, db.Model):
     def add_group(self, group, view_only=False):
         dsg = DataSourceGroup(group=group, data_source=self, view_only=view_only)
         db.session.add(dsg)
+        self.invalidate_groups_cache(self.id)
         return dsg
 
         setattr(self, 'data_source_groups', dsg)
@@ -681,6 +955,7 @@ class DataSource(BelongsToOrgMixin, db.Model):
         db.session.query(DataSourceGroup).filter(
             DataSourceGroup.group == group,
             DataSourceGroup.data_source == self).delete()
+        self.invalidate_groups_cache(self.id)
         db.session.commit()
 
     def update_group_permission(self, group, view_only):
@@ -689,11 +964,15 @@ class DataSource(BelongsToOrgMixin, db.Model):
             DataSourceGroup.data_source == self).one()
         dsg.view_only = view_only
         db.session.add(dsg)
+        self.invalidate_groups_cache(self.id)
         return dsg
 
     @property
     def query_runner(self):
-        return get_query_runner(self.type, self.options)
+        if self.id is None:
+            return get_query_runner(self.type, self.options)
+
+        return get_data_source_query_runner(self.id, self.type, self.options)
 
     @classmethod
     def get_by_name(cls, name):
@@ -702,9 +981,84 @@ class DataSource(BelongsToOrgMixin, db.Model):
     # XXX examine call sites to see if a regular SQLA collection would work better
     @property
     def groups(self):
-        groups = db.session.query(DataSourceGroup).filter(
-            DataSourceGroup.data_source == self)
-        return dict(map(lambda g: (g.group_id, g.view_only), groups))
+        if self.id is None:
+            # A new data source gets its id (and its groups become queryable) on flush.
+            db.session.flush()
+
+        return self.groups_map([self.id])[self.id]
+
+    @staticmethod
+    def _groups_cache_key(data_source_id):
+        return 'data_source:groups:{}'.format(data_source_id)
+
+    @classmethod
+    def groups_map(cls, data_source_ids):
+        """
+        Same as the groups property, for several data sources at once. Returns a
+        {data_source_id: {group_id: view_only}} map.
+
+        The groups are memoized for the duration of the request, and optionally
+        cached in Redis across requests (see DATA_SOURCE_GROUPS_CACHE_ENABLED).
+        Data sources missing from both caches are loaded with a single query.
+        """
+        cache = request_cache('data_source_groups')
+        if cache is None:
+            cache = {}
+
+        groups = {}
+        missing = set()
+        for data_source_id in data_source_ids:
+            if data_source_id is None:
+                groups[data_source_id] = {}
+            elif data_source_id in cache:
+                groups[data_source_id] = cache[data_source_id]
+            else:
+                missing.add(data_source_id)
+
+        if missing and settings.DATA_SOURCE_GROUPS_CACHE_ENABLED:
+            missing = list(missing)
+            cached = redis_connection.mget([cls._groups_cache_key(data_source_id) for data_source_id in missing])
+            for data_source_id, value in zip(missing, cached):
+                if value is not None:
+                    groups[data_source_id] = {int(group_id): is_view_only
+                                              for group_id, is_view_only in json.loads(value).iteritems()}
+            missing = set(missing) - set(groups.keys())
+
+        if missing:
+            loaded = {data_source_id: {} for data_source_id in missing}
+            data_source_groups = db.session.query(DataSourceGroup.data_source_id,
+                                                  DataSourceGroup.group_id,
+                                                  DataSourceGroup.view_only).filter(
+                DataSourceGroup.data_source_id.in_(missing))
+
+            for data_source_id, group_id, is_view_only in data_source_groups:
+                loaded[data_source_id][group_id] = is_view_only
+
+            if settings.DATA_SOURCE_GROUPS_CACHE_ENABLED:
+                pipe = redis_connection.pipeline()
+                for data_source_id, data_source_groups in loaded.iteritems():
+                    pipe.setex(cls._groups_cache_key(data_source_id), settings.DATA_SOURCE_GROUPS_CACHE_TTL,
+                               json.dumps(data_source_groups))
+                pipe.execute()
+
+            groups.update(loaded)
+
+        cache.update(groups)
+        return groups
+
+    @classmethod
+    def invalidate_groups_cache(cls, data_source_id):
+        cache = request_cache('data_source_groups')
+        if cache is not None:
+            cache.pop(data_source_id, None)
+
+        if settings.DATA_SOURCE_GROUPS_CACHE_ENABLED:
+            key = cls._groups_cache_key(data_source_id)
+            redis_connection.delete(key)
+            # Other requests might cache the groups again until the change is
+            # committed, and this transaction might cache changes it rolls back.
+            after_commit(lambda: redis_connection.delete(key))
+            after_rollback(lambda: redis_connection.delete(key))
 
 
 class DataSourceGroup(db.Model):
@@ -719,6 +1073,12 @@ class DataSourceGroup(db.Model):
     __tablename__ = "data_source_groups"
 
 
+@listens_for(DataSourceGroup, 'after_delete')
+def invalidate_data_source_groups(mapper, connection, target):
+    # Covers rows removed by cascade (e.g. when a group is deleted).
+    DataSource.invalidate_groups_cache(target.data_source_id)
+
+
 class QueryResult(db.Model, BelongsToOrgMixin):
     id = Column(db.Integer, primary_key=True)
     org_id = Column(db.Integer, db.ForeignKey('organizations.id'))
@@ -727,18 +1087,39 @@ class QueryResult(db.Model, BelongsToOrgMixin):
     data_source = db.relationship(DataSource, backref=backref('query_results'))
     query_hash = Column(db.String(32), index=True)
     query_text = Column('query', db.Text)
-    data = Column(db.Text)
+    _data = Column('data', db.Text, nullable=True)
+    # Key of the data in the result storage (see redash.result_storage), when
+    # it's kept there instead of in the data column.
+    data_key = Column(db.String(255), nullable=True)
+    # MD5 of data, to reuse the latest result when a query returns the same data again.
+    data_hash = Column(db.String(32), nullable=True)
     runtime = Column(postgresql.DOUBLE_PRECISION)
     retrieved_at = Column(db.DateTime(True))
 
     __tablename__ = 'query_results'
 
-    def to_dict(self):
+    @property
+    def data(self):
+        if self.data_key is not None:
+            return result_storage.load(self.data_key)
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        # moved to the result storage when flushed (see store_query_result_data)
+        self._data = data
+        self.data_key = None
+
+    def to_dict(self, row_format=None):
+        """
+        The data's rows are dicts by column name, unless `row_format` is
+        utils.POSITIONAL_ROWS.
+        """
         return {
             'id': self.id,
             'query_hash': self.query_hash,
             'query': self.query_text,
-            'data': json.loads(self.data),
+            'data': utils.convert_rows(json_loads(self.data), row_format),
             'data_source_id': self.data_source_id,
             'runtime': self.runtime,
             'retrieved_at': self.retrieved_at
@@ -756,6 +1137,19 @@ class QueryResult(db.Model, BelongsToOrgMixin):
 
         return unused_results
 
+    @classmethod
+    def delete_results(cls, results, synchronize_session=False):
+        """
+        Deletes `results` (a query of query results), and their data from the
+        result storage. Returns the number of deleted results.
+        """
+        keys = [key for key, in results.filter(cls.data_key != None).with_entities(cls.data_key)]
+        count = results.delete(synchronize_session=synchronize_session)
+        if keys:
+            # the results are still there if the transaction is rolled back
+            after_commit(lambda: result_storage.delete(keys))
+        return count
+
     @classmethod
     def get_latest(cls, data_source, query, max_age=0):
         query_hash = utils.gen_query_hash(query)
@@ -776,17 +1170,40 @@ class QueryResult(db.Model, BelongsToOrgMixin):
 
         return q.first()
 
+    @staticmethod
+    def gen_data_hash(data):
+        if not isinstance(data, str):
+            data = unicode(data).encode('utf-8')
+        return hashlib.md5(data).hexdigest()
+
     @classmethod
     def store_result(cls, org, data_source, query_hash, query, data, run_time, retrieved_at):
-        query_result = cls(org_id=org,
-                           query_hash=query_hash,
-                           query_text=query,
-                           runtime=run_time,
-                           data_source=data_source,
-                           retrieved_at=retrieved_at,
-                           data=data)
+        """
+        Stores the result, unless the latest result of the query has the same
+        data: then it's only marked as retrieved again, with the new runtime.
+        """
+        data_hash = cls.gen_data_hash(data)
+        query_result = db.session.query(QueryResult).filter(
+            cls.query_hash == query_hash,
+            cls.data_source == data_source).order_by(
+                cls.retrieved_at.desc()).options(load_only('data_hash')).first()
+
+        reused = query_result is not None and query_result.data_hash == data_hash
+        if reused:
+            query_result.runtime = run_time
+            query_result.retrieved_at = retrieved_at
+            logging.info("Query (%s) data unchanged; id=%s", query_hash, query_result.id)
+        else:
+            query_result = cls(org_id=org,
+                               query_hash=query_hash,
+                               query_text=query,
+                               runtime=run_time,
+                               data_source=data_source,
+                               retrieved_at=retrieved_at,
+                               data=data,
+                               data_hash=data_hash)
+            logging.info("Inserted query (%s) data; id=%s", query_hash, query_result.id)
         db.session.add(query_result)
-        logging.info("Inserted query (%s) data; id=%s", query_hash, query_result.id)
         # TODO: Investigate how big an impact this select-before-update makes.
         queries = db.session.query(Query).filter(
             Query.query_hash == query_hash,
@@ -795,6 +1212,8 @@ class QueryResult(db.Model, BelongsToOrgMixin):
             q.latest_query_data = query_result
             db.session.add(q)
             if q.schedule_resultset_size > 0:
+                if reused and QueryResultSet.query.filter_by(query_id=q.id, result_id=query_result.id).count():
+                    continue
                 q.query_results.append(query_result)
         query_ids = [q.id for q in queries]
         logging.info("Updated %s queries with result (%s).", len(query_ids), query_hash)
@@ -812,10 +1231,9 @@ class QueryResult(db.Model, BelongsToOrgMixin):
         s = cStringIO.StringIO()
 
         query_data = json.loads(self.data)
-        writer = csv.DictWriter(s, extrasaction="ignore", fieldnames=[col['name'] for col in query_data['columns']])
-        writer.writer = utils.UnicodeWriter(s)
-        writer.writeheader()
-        for row in query_data['rows']:
+        writer = utils.UnicodeWriter(s)
+        writer.writerow([col['name'] for col in query_data['columns']])
+        for row in utils.iter_row_values(query_data):
             writer.writerow(row)
 
         return s.getvalue()
@@ -827,14 +1245,11 @@ class QueryResult(db.Model, BelongsToOrgMixin):
         book = xlsxwriter.Workbook(s, {'constant_memory': True})
         sheet = book.add_worksheet("result")
 
-        column_names = []
         for (c, col) in enumerate(query_data['columns']):
             sheet.write(0, c, col['name'])
-            column_names.append(col['name'])
 
-        for (r, row) in enumerate(query_data['rows']):
-            for (c, name) in enumerate(column_names):
-                v = row.get(name)
+        for (r, row) in enumerate(utils.iter_row_values(query_data)):
+            for (c, v) in enumerate(row):
                 if isinstance(v, list):
                     v = str(v).encode('utf-8')
                 sheet.write(r + 1, c, v)
@@ -844,10 +1259,42 @@ class QueryResult(db.Model, BelongsToOrgMixin):
         return s.getvalue()
 
 
-def should_schedule_next(previous_iteration, now, schedule, failures):
+@listens_for(QueryResult, 'before_insert')
+@listens_for(QueryResult, 'before_update')
+def store_query_result_data(mapper, connection, target):
+    # Large data is only written to the result storage once it's flushed, rather
+    # than whenever it's assigned.
+    if not inspect(target).attrs['_data'].history.added:
+        return
+
+    key = result_storage.store(target._data)
+    if key is not None:
+        target._data = None
+        target.data_key = key
+        # the data of results that are rolled back isn't needed
+        after_rollback(lambda: result_storage.delete([key]))
+
+
+def schedule_offset(query_id):
+    """
+    Returns the fixed offset (in seconds, below SCHEDULE_JITTER) of the
+    scheduled runs of the query.
+    """
+    if not settings.SCHEDULE_JITTER:
+        return 0
+
+    return int(hashlib.md5(str(query_id)).hexdigest()[:8], 16) % settings.SCHEDULE_JITTER
+
+
+def should_schedule_next(previous_iteration, now, schedule, failures, offset=0):
     if schedule.isdigit():
         ttl = int(schedule)
         next_iteration = previous_iteration + datetime.timedelta(seconds=ttl)
+        if offset:
+            # Align the runs to the offset (modulo the interval) rather than to
+            # the previous run, which would carry over any queueing delay.
+            phase = (calendar.timegm(previous_iteration.utctimetuple()) - offset) % ttl
+            next_iteration -= datetime.timedelta(seconds=phase)
     else:
         hour, minute = schedule.split(':')
         hour, minute = int(hour), int(minute)
@@ -861,12 +1308,13 @@ def should_schedule_next(previous_iteration, now, schedule, failures):
             previous_iteration = normalized_previous_iteration - datetime.timedelta(days=1)
 
         next_iteration = (previous_iteration + datetime.timedelta(days=1)).replace(hour=hour, minute=minute)
+        next_iteration += datetime.timedelta(seconds=offset % (24 * 3600))
     if failures:
         next_iteration += datetime.timedelta(minutes=2**failures)
     return now > next_iteration
 
 
-class Query(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model):
+class Query(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, TrigramSearchMixin, db.Model):
     id = Column(db.Integer, primary_key=True)
     version = Column(db.Integer, default=0)
     org_id = Column(db.Integer, db.ForeignKey('organizations.id'))
@@ -892,6 +1340,11 @@ class Query(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model):
     schedule_failures = Column(db.Integer, default=0)
     schedule_until = Column(db.DateTime(True), nullable=True)
     schedule_resultset_size = Column(db.Integer, nullable=True)
+    # set while the schedule is suspended because nobody viewed the query
+    schedule_suspended_at = Column(db.DateTime(True), nullable=True)
+    last_accessed_at = Column(db.DateTime(True), default=db.func.now(), server_default=db.func.now())
+    # highest value of the watermark column of queries refreshed incrementally (see redash.incremental)
+    last_watermark = Column(db.String(255), nullable=True)
     visualizations = db.relationship("Visualization", cascade="all, delete-orphan")
     options = Column(MutableDict.as_mutable(PseudoJSON), default={})
     search_vector = Column(TSVectorType('id', 'name', 'description', 'query',
@@ -904,6 +1357,15 @@ class Query(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model):
 
     query_class = SearchBaseQuery
     __tablename__ = 'queries'
+    __table_args__ = (db.Index('queries_created_at_id', 'created_at', 'id'),
+                      db.Index('queries_name_trgm', 'name', postgresql_using='gin',
+                               postgresql_ops={'name': 'gin_trgm_ops'}),
+                      db.Index('queries_description_trgm', 'description', postgresql_using='gin',
+                               postgresql_ops={'description': 'gin_trgm_ops'}),
+                      db.Index('queries_query_trgm', 'query', postgresql_using='gin',
+                               postgresql_ops={'query': 'gin_trgm_ops'}))
+    search_columns = (('name', 4), ('description', 2), ('query_text', 1))
+    search_by_id = True
     __mapper_args__ = {
         "version_id_col": version,
         'version_id_generator': False
@@ -989,20 +1451,19 @@ class Query(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model):
 
     @classmethod
     def all_tags(cls, user, include_drafts=False):
-        where = cls.is_archived == False
+        where = TagCount.object_type == cls.__tablename__
 
         if not include_drafts:
-            where &= cls.is_draft == False
+            where &= TagCount.is_draft == False
 
         where &= DataSourceGroup.group_id.in_(user.group_ids)
 
-        tag_column = func.unnest(cls.tags).label('tag')
-        usage_count = func.count(1).label('usage_count')
+        usage_count = func.sum(TagCount.count).label('usage_count')
 
-        return db.session.query(tag_column, usage_count).join(
+        return db.session.query(TagCount.tag, usage_count).join(
             DataSourceGroup,
-            cls.data_source_id == DataSourceGroup.data_source_id
-        ).filter(where).distinct().group_by(tag_column).order_by(usage_count.desc())  # .limit(limit)
+            TagCount.data_source_id == DataSourceGroup.data_source_id
+        ).filter(where).group_by(TagCount.tag).having(usage_count > 0).order_by(usage_count.desc())
 
     @classmethod
     def by_user(cls, user):
@@ -1011,8 +1472,9 @@ class Query(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model):
     @classmethod
     def outdated_queries(cls):
         queries = (db.session.query(Query)
-                   .options(joinedload(Query.latest_query_data).load_only('retrieved_at'))
+                   .options(joinedload(Query.latest_query_data).load_only('retrieved_at', 'runtime'))
                    .filter(Query.schedule != None,
+                           Query.schedule_suspended_at == None,
                            (Query.schedule_until == None) |
                            (Query.schedule_until > db.func.now()))
                    .order_by(Query.id))
@@ -1029,17 +1491,67 @@ class Query(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model):
 
             retrieved_at = scheduled_queries_executions.get(query.id) or retrieved_at
 
-            if should_schedule_next(retrieved_at, now, query.schedule, query.schedule_failures):
+            if should_schedule_next(retrieved_at, now, query.schedule, query.schedule_failures,
+                                    schedule_offset(query.id)):
                 key = "{}:{}".format(query.query_hash, query.data_source_id)
                 outdated_queries[key] = query
 
         return outdated_queries.values()
 
+    @classmethod
+    def record_access(cls, accessed_at):
+        """
+        Updates the last access times of queries, given as a dict of query ids
+        to access times, and resumes their schedules if suspended.
+        """
+        if not accessed_at:
+            return
+
+        table = cls.__table__
+        db.session.execute(
+            table.update()
+            .where(table.c.id == db.bindparam('_id'))
+            .values(last_accessed_at=func.greatest(table.c.last_accessed_at, db.bindparam('_accessed_at')),
+                    schedule_suspended_at=None,
+                    # accesses aren't modifications
+                    updated_at=table.c.updated_at),
+            [{'_id': query_id, '_accessed_at': at} for query_id, at in accessed_at.iteritems()])
+
+    @classmethod
+    def suspend_idle(cls, org, idle_days):
+        """
+        Suspends the schedules of the organization's queries that weren't
+        accessed in the last `idle_days` days. Returns how many were suspended.
+
+        Queries with alerts are left alone, as they're used without being viewed.
+        """
+        return (cls.query
+                .filter(cls.org == org,
+                        cls.schedule != None,
+                        cls.schedule_suspended_at == None,
+                        cls.last_accessed_at < db.func.now() - datetime.timedelta(days=idle_days),
+                        ~Alert.query.filter(Alert.query_id == cls.id).exists())
+                .update({cls.schedule_suspended_at: db.func.now()}, synchronize_session=False))
+
+    @classmethod
+    def search_matches(cls, query, term):
+        # keep supporting the full text search syntax (e.g. "or", "-" and parenthesis)
+        full_text_matches = full_text_search(query, term, vector=cls.search_vector)
+        return super(Query, cls).search_matches(query, term) + [full_text_matches]
+
     @classmethod
     def search(cls, term, group_ids, user_id=None, include_drafts=False, limit=None):
+        matches = db.session.query(cls.id).filter(
+            cls.is_archived == False,
+            cls.data_source_id.in_(db.session.query(DataSourceGroup.data_source_id)
+                                   .filter(DataSourceGroup.group_id.in_(group_ids))))
+
+        if not include_drafts:
+            matches = matches.filter(or_(cls.is_draft == False, cls.user_id == user_id))
+
+        ids = cls.search_ids(term, matches, cache_key=[user_id, sorted(group_ids), include_drafts])
         all_queries = cls.all_queries(group_ids, user_id=user_id, drafts=include_drafts)
-        # sort the result using the weight as defined in the search vector column
-        return all_queries.search(term, sort=True).limit(limit)
+        return cls.filter_by_search_ids(all_queries, ids).limit(limit)
 
     @classmethod
     def delete_stale_resultsets(cls):
@@ -1061,7 +1573,7 @@ class Query(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model):
                     n_to_delete = resultset_count - first_query.schedule_resultset_size
                     r_ids = [r.result_id for r in resultsets][:n_to_delete]
                     QueryResultSet.query.filter(QueryResultSet.result_id.in_(r_ids)).delete(synchronize_session=False)
-                    delete_count += QueryResult.query.filter(QueryResult.id.in_(r_ids)).delete(synchronize_session=False)
+                    delete_count += QueryResult.delete_results(QueryResult.query.filter(QueryResult.id.in_(r_ids)))
             # By this point there are no stale result sets left.
             # Delete unneeded bridge rows for the remaining queries.
             for q in queries[1:]:
@@ -1074,27 +1586,29 @@ class Query(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model):
 
     @classmethod
     def search_by_user(cls, term, user, limit=None):
-        return cls.by_user(user).search(term, sort=True).limit(limit)
+        matches = db.session.query(cls.id).filter(cls.user_id == user.id, cls.is_archived == False)
+        ids = cls.search_ids(term, matches, cache_key=['by_user', user.id, sorted(user.group_ids)])
+        return cls.filter_by_search_ids(cls.by_user(user), ids).limit(limit)
 
     @classmethod
     def recent(cls, group_ids, user_id=None, limit=20):
         query = (cls.query
-                 .filter(Event.created_at > (db.func.current_date() - 7))
-                 .join(Event, Query.id == Event.object_id.cast(db.Integer))
+                 .filter(EventDailyCount.day >= (db.func.current_date() - 7))
+                 .join(EventDailyCount, Query.id == EventDailyCount.object_id.cast(db.Integer))
                  .join(DataSourceGroup, Query.data_source_id == DataSourceGroup.data_source_id)
                  .filter(
-                     Event.action.in_(['edit', 'execute', 'edit_name',
-                                       'edit_description', 'view_source']),
-                     Event.object_id != None,
-                     Event.object_type == 'query',
+                     EventDailyCount.action.in_(['edit', 'execute', 'edit_name',
+                                                 'edit_description', 'view_source']),
+                     EventDailyCount.object_id != None,
+                     EventDailyCount.object_type == 'query',
                      DataSourceGroup.group_id.in_(group_ids),
                      or_(Query.is_draft == False, Query.user_id == user_id),
                      Query.is_archived == False)
-                 .group_by(Event.object_id, Query.id)
-                 .order_by(db.desc(db.func.count(0))))
+                 .group_by(EventDailyCount.object_id, Query.id)
+                 .order_by(db.desc(db.func.sum(EventDailyCount.count))))
 
         if user_id:
-            query = query.filter(Event.user_id == user_id)
+            query = query.filter(EventDailyCount.user_id == user_id)
 
         query = query.limit(limit)
 
@@ -1172,6 +1686,8 @@ def integer_vectorizer(column):
 def gen_query_hash(target, val, oldval, initiator):
     target.query_hash = utils.gen_query_hash(val)
     target.schedule_failures = 0
+    if val != oldval:
+        target.last_watermark = None
 
 
 @listens_for(Query.user_id, 'set')
@@ -1354,7 +1870,7 @@ class Alert(TimestampMixin, db.Model):
     def evaluate(self):
         data = json.loads(self.query_rel.latest_query_data.data)
         if data['rows']:
-            value = data['rows'][0][self.options['column']]
+            value = next(utils.iter_row_dicts(data))[self.options['column']]
             op = self.options['op']
 
             if op == 'greater than' and value > self.options['value']:
@@ -1387,7 +1903,7 @@ def generate_slug(ctx):
     return slug
 
 
-class Dashboard(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model):
+class Dashboard(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, TrigramSearchMixin, db.Model):
     id = Column(db.Integer, primary_key=True)
     version = Column(db.Integer)
     org_id = Column(db.Integer, db.ForeignKey("organizations.id"))
@@ -1403,12 +1919,48 @@ class Dashboard(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model
     is_draft = Column(db.Boolean, default=True, index=True)
     widgets = db.relationship('Widget', backref='dashboard', lazy='dynamic')
     tags = Column('tags', MutableList.as_mutable(postgresql.ARRAY(db.Unicode)), nullable=True)
+    last_accessed_at = Column(db.DateTime(True), default=db.func.now(), server_default=db.func.now())
 
     __tablename__ = 'dashboards'
+    __table_args__ = (db.Index('dashboards_created_at_id', 'created_at', 'id'),
+                      db.Index('dashboards_name_trgm', 'name', postgresql_using='gin',
+                               postgresql_ops={'name': 'gin_trgm_ops'}))
+    search_columns = (('name', 1),)
     __mapper_args__ = {
         "version_id_col": version
         }
 
+    @classmethod
+    def record_access(cls, accessed_at):
+        """
+        Updates the last access times of dashboards, given as a dict of
+        dashboard ids to access times, and of the queries on them.
+        """
+        if not accessed_at:
+            return
+
+        params = [{'_id': dashboard_id, '_accessed_at': at} for dashboard_id, at in accessed_at.iteritems()]
+        dashboards = cls.__table__
+        db.session.execute(
+            dashboards.update()
+            .where(dashboards.c.id == db.bindparam('_id'))
+            .values(last_accessed_at=func.greatest(dashboards.c.last_accessed_at, db.bindparam('_accessed_at')),
+                    # accesses aren't modifications
+                    updated_at=dashboards.c.updated_at),
+            params)
+
+        queries = Query.__table__
+        dashboard_queries = (db.select([Visualization.query_id])
+                             .select_from(Widget.__table__.join(Visualization.__table__))
+                             .where(Widget.dashboard_id == db.bindparam('_id')))
+        db.session.execute(
+            queries.update()
+            .where(queries.c.id.in_(dashboard_queries))
+            .values(last_accessed_at=func.greatest(queries.c.last_accessed_at, db.bindparam('_accessed_at')),
+                    schedule_suspended_at=None,
+                    updated_at=queries.c.updated_at),
+            params)
+
     @classmethod
     def all(cls, org, group_ids, user_id, include_drafts=False):
         query = (
@@ -1431,32 +1983,48 @@ class Dashboard(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model
         return query
 
     @classmethod
-    def search(cls, org, groups_ids, user_id, search_term, include_drafts):
-        # TODO: switch to FTS
-        return cls.all(org, groups_ids, user_id, include_drafts).filter(cls.name.ilike(u'%{}%'.format(search_term)))
+    def search(cls, org, groups_ids, user_id, search_term, include_drafts=False):
+        matches = db.session.query(cls.id).filter(cls.org == org, cls.is_archived == False)
+        ids = cls.search_ids(search_term, matches, cache_key=[org.id, user_id, sorted(groups_ids), include_drafts])
+        # Dashboard.all() uses DISTINCT, which doesn't allow ordering by the search rank.
+        return cls.filter_by_search_ids(cls.all(org, groups_ids, user_id, include_drafts), ids, ordered=False)
 
     @classmethod
     def all_tags(cls, org, user):
-        tag_column = func.unnest(cls.tags).label('tag')
-        usage_count = func.count(1).label('usage_count')
-
-        query = (
-            db.session.query(tag_column, usage_count)
-            .outerjoin(Widget)
+        data_source_ids = db.session.query(DataSourceGroup.data_source_id).filter(
+            DataSourceGroup.group_id.in_(user.group_ids))
+
+        # Published dashboards count once per data source of the user's they show, and
+        # once more if they have text widgets (which anyone can see).
+        published = (
+            db.session.query(TagCount.tag.label('tag'), TagCount.count.label('count'))
+            .filter(TagCount.object_type == cls.__tablename__,
+                    TagCount.org_id == org.id,
+                    TagCount.is_draft == False,
+                    or_(TagCount.data_source_id == None, TagCount.data_source_id.in_(data_source_ids))))
+
+        # The owner also sees their drafts and the dashboards that show none of the
+        # above, which are counted on the fly.
+        visible_widgets = (
+            db.session.query(Widget.id)
             .outerjoin(Visualization)
-            .outerjoin(Query)
-            .outerjoin(DataSourceGroup, Query.data_source_id == DataSourceGroup.data_source_id)
-            .filter(
-                Dashboard.is_archived == False,
-                (DataSourceGroup.group_id.in_(user.group_ids) |
-                 (Dashboard.user_id == user.id) |
-                 ((Widget.dashboard != None) & (Widget.visualization == None))),
-                Dashboard.org == org)
-            .group_by(tag_column))
-
-        query = query.filter(or_(Dashboard.user_id == user.id, Dashboard.is_draft == False))
-
-        return query.order_by(usage_count.desc())
+            .outerjoin(Query, Visualization.query_id == Query.id)
+            .filter(Widget.dashboard_id == cls.id,
+                    or_(Widget.visualization_id == None, Query.data_source_id.in_(data_source_ids))))
+        own = (
+            db.session.query(func.unnest(cls.tags).label('tag'), literal(1).label('count'))
+            .filter(cls.org == org,
+                    cls.user_id == user.id,
+                    cls.is_archived == False,
+                    or_(cls.is_draft == True, ~visible_widgets.exists())))
+
+        tags = published.union_all(own).subquery()
+        usage_count = func.sum(tags.c.count).label('usage_count')
+
+        return (db.session.query(tags.c.tag, usage_count)
+                .group_by(tags.c.tag)
+                .having(usage_count > 0)
+                .order_by(usage_count.desc()))
 
     @classmethod
     def favorites(cls, user, base_query=None):
@@ -1472,6 +2040,167 @@ class Dashboard(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model
         return u"%s=%s" % (self.id, self.name)
 
 
+TAG_COUNTS_FUNCTIONS = """
+CREATE OR REPLACE FUNCTION tag_counts_add(_object_type text, _org_id integer, _data_source_id integer,
+                                          _is_draft boolean, _tags text[], _delta integer) RETURNS void AS $$
+DECLARE
+    _tag text;
+BEGIN
+    FOR _tag IN SELECT unnest(_tags) LOOP
+        UPDATE tag_counts SET count = count + _delta
+        WHERE object_type = _object_type AND org_id = _org_id AND is_draft = _is_draft AND tag = _tag
+              AND data_source_id IS NOT DISTINCT FROM _data_source_id;
+        IF NOT FOUND THEN
+            INSERT INTO tag_counts (object_type, org_id, data_source_id, is_draft, tag, count)
+            VALUES (_object_type, _org_id, _data_source_id, _is_draft, _tag, _delta);
+        END IF;
+    END LOOP;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION queries_update_tag_counts() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND NOT OLD.is_archived THEN
+        PERFORM tag_counts_add('queries', OLD.org_id, OLD.data_source_id, OLD.is_draft, OLD.tags, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NOT NEW.is_archived THEN
+        PERFORM tag_counts_add('queries', NEW.org_id, NEW.data_source_id, NEW.is_draft, NEW.tags, 1);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+-- Adds _delta to the counts of the tags of published dashboards _dashboard_ids, once per
+-- data source their widgets show (and for the NULL data source if they have text widgets).
+CREATE OR REPLACE FUNCTION dashboard_tag_counts_add(_dashboard_ids integer[], _delta integer) RETURNS void AS $$
+DECLARE
+    _dashboard record;
+BEGIN
+    FOR _dashboard IN
+        SELECT DISTINCT dashboards.id, dashboards.org_id, dashboards.tags, queries.data_source_id
+        FROM dashboards
+        JOIN widgets ON widgets.dashboard_id = dashboards.id
+        LEFT JOIN visualizations ON visualizations.id = widgets.visualization_id
+        LEFT JOIN queries ON queries.id = visualizations.query_id
+        WHERE dashboards.id = ANY(_dashboard_ids) AND NOT dashboards.is_archived AND NOT dashboards.is_draft
+              AND (widgets.visualization_id IS NULL OR queries.data_source_id IS NOT NULL)
+    LOOP
+        PERFORM tag_counts_add('dashboards', _dashboard.org_id, _dashboard.data_source_id, false,
+                               _dashboard.tags, _delta);
+    END LOOP;
+END
+$$ LANGUAGE plpgsql;
+
+-- The dashboard triggers run before and after each change, taking the affected dashboards'
+-- counts out and adding them back once the change is made.
+CREATE OR REPLACE FUNCTION dashboards_update_tag_counts() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM dashboard_tag_counts_add(ARRAY[OLD.id], -1);
+        RETURN OLD;
+    END IF;
+    PERFORM dashboard_tag_counts_add(ARRAY[NEW.id], CASE WHEN TG_WHEN = 'BEFORE' THEN -1 ELSE 1 END);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION widgets_update_tag_counts() RETURNS trigger AS $$
+DECLARE
+    _dashboard_ids integer[] := ARRAY[]::integer[];
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        _dashboard_ids := _dashboard_ids || OLD.dashboard_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        _dashboard_ids := _dashboard_ids || NEW.dashboard_id;
+    END IF;
+    PERFORM dashboard_tag_counts_add(_dashboard_ids, CASE WHEN TG_WHEN = 'BEFORE' THEN -1 ELSE 1 END);
+    IF TG_OP = 'DELETE' THEN
+        RETURN OLD;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION visualizations_update_tag_counts() RETURNS trigger AS $$
+BEGIN
+    PERFORM dashboard_tag_counts_add(ARRAY(SELECT dashboard_id FROM widgets WHERE visualization_id = NEW.id),
+                                     CASE WHEN TG_WHEN = 'BEFORE' THEN -1 ELSE 1 END);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION queries_update_dashboard_tag_counts() RETURNS trigger AS $$
+BEGIN
+    PERFORM dashboard_tag_counts_add(ARRAY(SELECT widgets.dashboard_id
+                                           FROM widgets
+                                           JOIN visualizations ON visualizations.id = widgets.visualization_id
+                                           WHERE visualizations.query_id = NEW.id),
+                                     CASE WHEN TG_WHEN = 'BEFORE' THEN -1 ELSE 1 END);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+TAG_COUNTS_TRIGGERS = """
+CREATE TRIGGER queries_tag_counts
+AFTER INSERT OR DELETE OR UPDATE OF org_id, data_source_id, is_archived, is_draft, tags ON queries
+FOR EACH ROW EXECUTE PROCEDURE queries_update_tag_counts();
+
+CREATE TRIGGER queries_dashboard_tag_counts_before
+BEFORE UPDATE OF data_source_id ON queries
+FOR EACH ROW EXECUTE PROCEDURE queries_update_dashboard_tag_counts();
+CREATE TRIGGER queries_dashboard_tag_counts_after
+AFTER UPDATE OF data_source_id ON queries
+FOR EACH ROW EXECUTE PROCEDURE queries_update_dashboard_tag_counts();
+
+CREATE TRIGGER dashboards_tag_counts_before
+BEFORE DELETE OR UPDATE OF org_id, is_archived, is_draft, tags ON dashboards
+FOR EACH ROW EXECUTE PROCEDURE dashboards_update_tag_counts();
+CREATE TRIGGER dashboards_tag_counts_after
+AFTER UPDATE OF org_id, is_archived, is_draft, tags ON dashboards
+FOR EACH ROW EXECUTE PROCEDURE dashboards_update_tag_counts();
+
+CREATE TRIGGER widgets_tag_counts_before
+BEFORE INSERT OR DELETE OR UPDATE OF dashboard_id, visualization_id ON widgets
+FOR EACH ROW EXECUTE PROCEDURE widgets_update_tag_counts();
+CREATE TRIGGER widgets_tag_counts_after
+AFTER INSERT OR DELETE OR UPDATE OF dashboard_id, visualization_id ON widgets
+FOR EACH ROW EXECUTE PROCEDURE widgets_update_tag_counts();
+
+CREATE TRIGGER visualizations_tag_counts_before
+BEFORE UPDATE OF query_id ON visualizations
+FOR EACH ROW EXECUTE PROCEDURE visualizations_update_tag_counts();
+CREATE TRIGGER visualizations_tag_counts_after
+AFTER UPDATE OF query_id ON visualizations
+FOR EACH ROW EXECUTE PROCEDURE visualizations_update_tag_counts();
+"""
+
+
+class TagCount(db.Model):
+    """
+    Number of non-archived queries and published dashboards using each tag, per
+    data source: the query's, or each one a dashboard's widgets show (NULL for its
+    text widgets). Maintained by triggers (see TAG_COUNTS_FUNCTIONS).
+    """
+    id = Column(db.Integer, primary_key=True)
+    object_type = Column(db.String(255))
+    org_id = Column(db.Integer, db.ForeignKey("organizations.id"))
+    # Not a foreign key, as the (zeroed) counts outlive deleted data sources.
+    data_source_id = Column(db.Integer, nullable=True)
+    is_draft = Column(db.Boolean)
+    tag = Column(db.Unicode(255))
+    count = Column(db.Integer, nullable=False)
+
+    __tablename__ = 'tag_counts'
+    __table_args__ = (db.Index('tag_counts_object_type_data_source_id', 'object_type', 'data_source_id'),
+                      db.Index('tag_counts_object_type_org_id', 'object_type', 'org_id'))
+
+
+listen(db.metadata, 'after_create', DDL(TAG_COUNTS_FUNCTIONS))
+listen(db.metadata, 'after_create', DDL(TAG_COUNTS_TRIGGERS))
+
+
 class Visualization(TimestampMixin, db.Model):
     id = Column(db.Integer, primary_key=True)
     type = Column(db.String(100))
@@ -1520,6 +2249,16 @@ class Widget(TimestampMixin, db.Model):
     def get_by_id_and_org(cls, widget_id, org):
         return db.session.query(cls).join(Dashboard).filter(cls.id == widget_id, Dashboard.org == org).one()
 
+    @classmethod
+    def all_for_dashboard(cls, dashboard):
+        """
+        Loads the dashboard widgets together with their visualizations, queries
+        and query authors in a single query.
+        """
+        return cls.query.filter(cls.dashboard_id == dashboard.id).options(
+            joinedload(Widget.visualization).joinedload(Visualization.query_rel).joinedload(Query.user),
+            joinedload(Widget.visualization).joinedload(Visualization.query_rel).joinedload(Query.last_modified_by))
+
 
 class Event(db.Model):
     id = Column(db.Integer, primary_key=True)
@@ -1534,6 +2273,8 @@ class Event(db.Model):
     created_at = Column(db.DateTime(True), default=db.func.now())
 
     __tablename__ = 'events'
+    __table_args__ = (db.Index('events_org_id_created_at_id', 'org_id', 'created_at', 'id'),
+                      db.Index('events_created_at', 'created_at'))
 
     def __unicode__(self):
         return u"%s,%s,%s,%s" % (self.user_id, self.action, self.object_type, self.object_id)
@@ -1549,8 +2290,8 @@ class Event(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
-    @classmethod
-    def record(cls, event):
+    @staticmethod
+    def _values_from_raw_event(event):
         org_id = event.pop('org_id')
         user_id = event.pop('user_id', None)
         action = event.pop('action')
@@ -1559,15 +2300,103 @@ class Event(db.Model):
 
         created_at = datetime.datetime.utcfromtimestamp(event.pop('timestamp'))
 
-        event = cls(org_id=org_id, user_id=user_id, action=action,
+        return dict(org_id=org_id, user_id=user_id, action=action,
                     object_type=object_type, object_id=object_id,
                     additional_properties=event,
                     created_at=created_at)
+
+    @classmethod
+    def record(cls, event):
+        values = cls._values_from_raw_event(event)
+        event = cls(**values)
+        recent_queries.start_tracking()
         db.session.add(event)
+        after_commit(lambda: recent_queries.record_events([values]))
         return event
 
+    @classmethod
+    def record_batch(cls, events):
+        """
+        Inserts the events with a single multi-row INSERT. Returns the inserted
+        events, in the same format as to_dict().
+        """
+        values = [cls._values_from_raw_event(event) for event in events]
+        if values:
+            recent_queries.start_tracking()
+            db.session.execute(cls.__table__.insert().values(values))
+            after_commit(lambda: recent_queries.record_events(values))
+
+        return [dict(event, created_at=event['created_at'].isoformat()) for event in values]
 
-class ApiKey(TimestampMixin, GFKBase, db.Model):
+    @classmethod
+    def cleanup(cls, max_age, limit):
+        """
+        Deletes up to `limit` events older than `max_age` days, which are already
+        counted in EventDailyCount. Returns the number of deleted events.
+        """
+        rolled_up_until = db.session.query(db.func.max(EventDailyCount.day)).scalar()
+        if rolled_up_until is None:
+            return 0
+
+        # the days the next rollup recounts are kept
+        rolled_up_until -= datetime.timedelta(days=settings.EVENTS_ROLLUP_DAYS)
+        old_events = (db.session.query(cls.id)
+                      .filter(cls.created_at < db.func.current_date() - max_age,
+                              cls.created_at < rolled_up_until)
+                      .limit(limit))
+
+        return cls.query.filter(cls.id.in_(old_events.subquery())).delete(synchronize_session=False)
+
+
+class EventDailyCount(db.Model):
+    """
+    Number of events per day, object, action and user. Usage reports should read
+    these instead of scanning the events table.
+    """
+    id = Column(db.Integer, primary_key=True)
+    org_id = Column(db.Integer, db.ForeignKey("organizations.id"))
+    day = Column(db.Date, nullable=False)
+    object_type = Column(db.String(255))
+    object_id = Column(db.String(255), nullable=True)
+    action = Column(db.String(255))
+    user_id = Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    count = Column(db.Integer, nullable=False)
+
+    __tablename__ = 'event_daily_counts'
+    __table_args__ = (db.Index('event_daily_counts_org_id_day', 'org_id', 'day'),
+                      db.Index('event_daily_counts_day_object', 'day', 'object_type', 'object_id'))
+
+    @classmethod
+    def rollup(cls, days=None):
+        """
+        Counts the events of the last `days` (settings.EVENTS_ROLLUP_DAYS by
+        default) days that were rolled up, so events recorded late are counted
+        too, or of all events on the first run.
+        """
+        if days is None:
+            days = settings.EVENTS_ROLLUP_DAYS
+
+        since = db.session.query(db.func.max(cls.day)).scalar()
+        if since is not None:
+            since -= datetime.timedelta(days=days)
+        else:
+            since = db.session.query(db.func.min(Event.created_at.cast(db.Date))).scalar()
+            if since is None:
+                return
+
+        day = Event.created_at.cast(db.Date)
+        counts = (db.select([Event.org_id, day, Event.object_type, Event.object_id, Event.action,
+                             Event.user_id, db.func.count(Event.id)])
+                  .where(Event.created_at >= since)
+                  .group_by(Event.org_id, day, Event.object_type, Event.object_id, Event.action,
+                            Event.user_id))
+
+        cls.query.filter(cls.day >= since).delete(synchronize_session=False)
+        db.session.execute(cls.__table__.insert().from_select(
+            ['org_id', 'day', 'object_type', 'object_id', 'action', 'user_id', 'count'], counts))
+
+
+class ApiKey(TimestampMixin, CachedLookupMixin, GFKBase, db.Model):
     id = Column(db.Integer, primary_key=True)
     org_id = Column(db.Integer, db.ForeignKey("organizations.id"))
     org = db.relationship(Organization)
@@ -1580,6 +2409,8 @@ class ApiKey(TimestampMixin, GFKBase, db.Model):
     __tablename__ = 'api_keys'
     __table_args__ = (db.Index('api_keys_object_type_object_id', 'object_type', 'object_id'),)
 
+    cached_lookup_columns = ('api_key',)
+
     @classmethod
     def get_by_api_key(cls, api_key):
         return cls.query.filter(cls.api_key == api_key, cls.active == True).one()
@@ -1,10 +1,19 @@
+import hashlib
 import logging
 import json
+import os
 import sys
+import threading
+import time
 
 import requests
+import sqlparse
+from sqlparse.sql import Identifier, IdentifierList, Parenthesis
+from sqlparse.tokens import CTE, Comment, Keyword, Name
 
 from redash import settings
+from redash.utils import JSONEncoder, POSITIONAL_ROWS, json_codec
+from redash.utils.configuration import ConfigurationContainer
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +22,8 @@ __all__ = [
     'BaseHTTPQueryRunner',
     'InterruptException',
     'BaseSQLQueryRunner',
+    'BaseDBAPIQueryRunner',
+    'StreamingResult',
     'TYPE_DATETIME',
     'TYPE_BOOLEAN',
     'TYPE_INTEGER',
@@ -22,6 +33,7 @@ __all__ = [
     'SUPPORTED_COLUMN_TYPES',
     'register',
     'get_query_runner',
+    'get_data_source_query_runner',
     'import_query_runners'
 ]
 
@@ -51,10 +63,153 @@ class NotSupported(Exception):
     pass
 
 
+class ConnectionPool(object):
+    """
+    Idle connections of a data source, kept for reuse by the current process.
+    """
+    def __init__(self, config_hash, max_size, max_idle_time):
+        self.config_hash = config_hash
+        self.max_size = max_size
+        self.max_idle_time = max_idle_time
+        self.idle = []
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            logger.debug("Failed closing pooled connection.", exc_info=1)
+
+    def checkout(self):
+        """
+        Returns the most recently used idle connection and how long it has been
+        idle, or (None, None) if there are none.
+        """
+        now = time.time()
+        expired = []
+        connection = idle_time = None
+
+        with self.lock:
+            while self.idle:
+                candidate, released_at = self.idle.pop()
+                if now - released_at > self.max_idle_time:
+                    expired.append(candidate)
+                else:
+                    connection, idle_time = candidate, now - released_at
+                    break
+
+        for candidate in expired:
+            self._close(candidate)
+
+        return connection, idle_time
+
+    def checkin(self, connection):
+        with self.lock:
+            if len(self.idle) < self.max_size:
+                self.idle.append((connection, time.time()))
+                return
+
+        self._close(connection)
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+
+        for connection, _ in idle:
+            self._close(connection)
+
+
+# Connection pools and query runners of the current process, by data source id.
+_connection_pools = {}
+_query_runners = {}
+_process_pid = None
+
+
+def _reset_after_fork():
+    global _process_pid
+
+    if _process_pid != os.getpid():
+        # connections and clients can't be shared with the parent of a forked process
+        _connection_pools.clear()
+        _query_runners.clear()
+        _process_pid = os.getpid()
+
+
+def _get_connection_pool(data_source_id, config_hash):
+    _reset_after_fork()
+
+    pool = _connection_pools.get(data_source_id)
+    if pool is not None and pool.config_hash != config_hash:
+        # the data source's configuration changed
+        pool.close()
+        pool = None
+
+    if pool is None:
+        pool = ConnectionPool(config_hash, settings.CONNECTION_POOL_MAX_SIZE, settings.CONNECTION_POOL_MAX_IDLE_TIME)
+        _connection_pools[data_source_id] = pool
+
+    return pool
+
+
+class StreamingResult(object):
+    """
+    Builds the JSON of a query result one batch of rows at a time, so large
+    results aren't kept in memory as a list of row dicts. Stops accepting rows
+    once `row_limit` rows were added, and marks the result as truncated. With
+    `positional`, rows are encoded as lists of values instead of dicts.
+    """
+    def __init__(self, columns, row_limit=None, json_encoder=JSONEncoder, positional=False):
+        self.columns = columns
+        self.json_encoder = json_encoder
+        self.positional = positional
+        self.column_names = [column['name'] for column in columns]
+        self.row_limit = row_limit
+        self.row_count = 0
+        self.truncated = False
+        self._chunks = []
+
+    def add_rows(self, rows):
+        """
+        Encodes a batch of row tuples. Returns False when no more rows are wanted.
+        """
+        if self.row_limit:
+            remaining = self.row_limit - self.row_count
+            if len(rows) > remaining:
+                rows = rows[:remaining]
+                self.truncated = True
+
+        if rows:
+            rows = json_codec.convert_rows(self.columns, rows)
+            if not self.positional:
+                rows = [dict(zip(self.column_names, row)) for row in rows]
+            encoded = json_codec.dumps(rows, self.json_encoder)
+            # without the enclosing brackets, to be joined with the other batches
+            self._chunks.append(encoded[1:-1])
+            self.row_count += len(rows)
+
+        return not self.truncated
+
+    def to_json(self):
+        result = ['{"columns": ', json_codec.dumps(self.columns, self.json_encoder),
+                  ', "rows": [', ', '.join(self._chunks), ']']
+
+        if self.positional:
+            result.append(', "row_format": "{}"'.format(POSITIONAL_ROWS))
+
+        if self.truncated:
+            result.extend([', "metadata": ', json.dumps({'truncated': True, 'row_limit': self.row_limit})])
+
+        result.append('}')
+        return ''.join(result)
+
+
 class BaseQueryRunner(object):
     noop_query = None
     default_doc_url = None
     data_source_version_query = None
+    # Set for runners of saved data sources (see DataSource.query_runner).
+    data_source_id = None
 
     def __init__(self, configuration):
         self.syntax = 'sql'
@@ -113,6 +268,85 @@ class BaseQueryRunner(object):
     def run_query(self, query, user):
         raise NotImplementedError()
 
+    def run_query_with_row_count(self, query, user, positional_rows=False):
+        """
+        Runs the query like run_query, and also returns the number of rows of its
+        result (or None when the runner doesn't count them). With `positional_rows`,
+        runners supporting it return rows as lists of values (see
+        redash.utils.POSITIONAL_ROWS).
+        """
+        json_data, error = self.run_query(query, user)
+        return json_data, error, None
+
+    def _connect(self):
+        """
+        Opens a new connection. Runners supporting the "connection_pooling"
+        option implement it, and get their connections with _acquire_connection.
+        """
+        raise NotImplementedError()
+
+    def _is_connection_usable(self, connection, idle_time):
+        """
+        Health check of a pooled connection before it's reused.
+        """
+        return True
+
+    def _reset_connection(self, connection):
+        """
+        Resets the session of a connection going back to the pool, so what a
+        query changed (e.g. roles, settings or temporary tables) doesn't carry
+        over to the next one. The connection is closed if this raises.
+        """
+        pass
+
+    def _get_connection_pool(self):
+        if not self.configuration.get('connection_pooling') or self.data_source_id is None:
+            return None
+
+        config_hash = hashlib.sha1(json.dumps(dict(self.configuration.iteritems()), sort_keys=True)).hexdigest()
+        return _get_connection_pool(self.data_source_id, config_hash)
+
+    def _acquire_connection(self):
+        pool = self._get_connection_pool()
+
+        if pool is not None:
+            connection, idle_time = pool.checkout()
+            while connection is not None:
+                if self._is_connection_usable(connection, idle_time):
+                    return connection
+
+                ConnectionPool._close(connection)
+                connection, idle_time = pool.checkout()
+
+        return self._connect()
+
+    def _release_connection(self, connection, reusable=True):
+        """
+        Returns the connection to the pool, or closes it if pooling is disabled
+        or it's not `reusable` (e.g. after the query was interrupted).
+        """
+        pool = self._get_connection_pool()
+
+        if pool is not None and reusable:
+            try:
+                self._reset_connection(connection)
+            except Exception:
+                logger.debug("Failed resetting pooled connection.", exc_info=1)
+            else:
+                pool.checkin(connection)
+                return
+
+        ConnectionPool._close(connection)
+
+    def is_connection_error(self, e):
+        """
+        Whether an exception raised by run_query means the data source couldn't
+        be reached, rather than that the query failed. Runners recognize the
+        connection errors of their driver, as the DB-API error classes don't
+        tell them apart from query errors.
+        """
+        return False
+
     def fetch_columns(self, columns):
         column_names = []
         duplicates_counter = 1
@@ -141,6 +375,35 @@ class BaseQueryRunner(object):
             raise Exception("Failed running query [%s]." % query)
         return json.loads(results)['rows']
 
+    def get_source_tables(self, query):
+        """
+        Returns the (lower cased) names of the tables the query reads from, or
+        None when they can't be determined.
+        """
+        return None
+
+    def get_table_versions(self):
+        """
+        Returns a dict mapping table names to a value that changes whenever the
+        table's data changes, or None when the data source doesn't support it.
+
+        By default this runs the data source's "freshness_query" option, if set,
+        which has to return the table names in its first column and their
+        versions (e.g. the time of their last load) in the second.
+        """
+        freshness_query = self.configuration.get('freshness_query')
+        if not freshness_query:
+            return None
+
+        results, error = self.run_query(freshness_query, None)
+        if error is not None:
+            raise Exception("Failed running freshness query: %s" % error)
+
+        results = json.loads(results)
+        name_column, version_column = [c['name'] for c in results['columns'][:2]]
+
+        return {unicode(row[name_column]).lower(): unicode(row[version_column]) for row in results['rows']}
+
     @classmethod
     def to_dict(cls):
         return {
@@ -170,6 +433,174 @@ class BaseSQLQueryRunner(BaseQueryRunner):
                 res = self._run_query_internal('select count(*) as cnt from %s' % t)
                 tables_dict[t]['size'] = res[0]['cnt']
 
+    def get_source_tables(self, query):
+        tables = set()
+        cte_names = set()
+
+        for statement in sqlparse.parse(query):
+            _collect_table_names(statement, tables, cte_names)
+
+        return set(t for t in tables if t not in cte_names)
+
+
+class BaseDBAPIQueryRunner(BaseSQLQueryRunner):
+    """
+    Base for runners of DB-API 2.0 drivers. Subclasses implement _connect, and
+    map the type codes of the cursor description to column types with
+    `types_map`. Rows are fetched with fetchmany and encoded batch by batch,
+    up to the optional "row_limit" of the configuration.
+    """
+    types_map = {}
+    json_encoder = JSONEncoder
+
+    def _get_column_type(self, column):
+        return self.types_map.get(column[1], None)
+
+    def _execute(self, cursor, query):
+        cursor.execute(query)
+
+    def _cancel(self, connection, cursor):
+        """
+        Cancels the running query when it's interrupted. The connection is
+        closed afterwards, which is enough for drivers that can't cancel.
+        """
+        pass
+
+    def _get_error_message(self, error):
+        """
+        Returns the message of a driver error, or None to raise the error.
+        Connection errors (see is_connection_error) are always raised.
+        """
+        return None
+
+    def _get_result_without_rows(self, connection, cursor):
+        """
+        Returns the (json_data, error) of statements that didn't return rows.
+        """
+        return None, "No data was returned."
+
+    def _fetch_result(self, cursor, fetch=None, positional_rows=False):
+        """
+        Encodes the rows of an executed query batch by batch. `fetch` returns
+        the next batch (cursor.fetchmany by default).
+        """
+        if cursor.description is None:
+            return None
+
+        fetch = fetch or (lambda: cursor.fetchmany(settings.QUERY_RESULTS_FETCH_SIZE))
+
+        columns = self.fetch_columns([(column[0], self._get_column_type(column)) for column in cursor.description])
+        result = StreamingResult(columns, self.configuration.get('row_limit'), self.json_encoder,
+                                 positional=positional_rows)
+
+        rows = fetch()
+        while rows and result.add_rows(rows):
+            rows = fetch()
+
+        return result
+
+    def run_query(self, query, user):
+        json_data, error, _ = self.run_query_with_row_count(query, user)
+        return json_data, error
+
+    def run_query_with_row_count(self, query, user, positional_rows=False):
+        connection = None
+        cursor = None
+        reusable = False
+        row_count = None
+
+        try:
+            connection = self._acquire_connection()
+            cursor = connection.cursor()
+            logger.debug("%s running query: %s", self.name(), query)
+            self._execute(cursor, query)
+
+            result = self._fetch_result(cursor, positional_rows=positional_rows)
+            if result is not None:
+                json_data, error, row_count = result.to_json(), None, result.row_count
+            else:
+                json_data, error = self._get_result_without_rows(connection, cursor)
+
+            reusable = True
+        except (KeyboardInterrupt, InterruptException):
+            if cursor is not None:
+                self._cancel(connection, cursor)
+            error = "Query cancelled by user."
+            json_data = None
+        except Exception:
+            exc_info = sys.exc_info()
+            error = None if self.is_connection_error(exc_info[1]) else self._get_error_message(exc_info[1])
+            if error is None:
+                raise exc_info[0], exc_info[1], exc_info[2]
+            json_data = None
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Exception:
+                    logger.debug("Failed closing cursor.", exc_info=1)
+            if connection is not None:
+                self._release_connection(connection, reusable)
+
+        return json_data, error, row_count
+
+
+def _collect_table_names(token_list, tables, cte_names):
+    # What the next identifiers are: tables (after FROM/JOIN), CTE definitions
+    # (after WITH) or neither.
+    expecting = None
+
+    for token in token_list.tokens:
+        if token.is_whitespace or token.ttype in Comment:
+            continue
+
+        if token.ttype in CTE:
+            expecting = 'cte'
+            continue
+
+        if token.ttype in Keyword:
+            keyword = token.normalized
+            if expecting == 'table':
+                if keyword not in ('LATERAL', 'ONLY'):
+                    # a table named like a keyword (e.g. "events")
+                    tables.add(token.value.lower())
+                    expecting = None
+                continue
+            expecting = 'table' if keyword == 'FROM' or keyword.endswith('JOIN') else None
+            continue
+
+        if expecting and isinstance(token, (Identifier, IdentifierList)):
+            identifiers = token.get_identifiers() if isinstance(token, IdentifierList) else [token]
+
+            for identifier in identifiers:
+                if not isinstance(identifier, Identifier):
+                    if expecting == 'table' and identifier.ttype in Name:
+                        tables.add(identifier.value.lower())
+                    continue
+
+                if any(isinstance(t, Parenthesis) for t in identifier.tokens):
+                    # a sub query or a CTE definition
+                    if expecting == 'cte':
+                        cte_names.add(identifier.get_real_name().lower())
+                    _collect_table_names(identifier, tables, cte_names)
+                elif expecting == 'table':
+                    name = identifier.get_real_name()
+                    schema = identifier.get_parent_name()
+                    if name:
+                        tables.add((u'{}.{}'.format(schema, name) if schema else name).lower())
+
+            if expecting == 'table':
+                expecting = None
+            continue
+
+        if expecting == 'table' and token.ttype in Name:
+            tables.add(token.value.lower())
+        elif token.is_group:
+            _collect_table_names(token, tables, cte_names)
+
+        if expecting == 'table':
+            expecting = None
+
 
 class BaseHTTPQueryRunner(BaseQueryRunner):
     response_error = "Endpoint returned unexpected status code"
@@ -293,6 +724,32 @@ def get_query_runner(query_runner_type, configuration):
     return query_runner_class(configuration)
 
 
+def get_data_source_query_runner(data_source_id, query_runner_type, configuration):
+    """
+    Returns the query runner of a saved data source. The instance, and the clients
+    it sets up, are reused by the current process until the data source's type or
+    configuration change.
+    """
+    _reset_after_fork()
+
+    config_json = configuration.to_json()
+    key = (query_runner_type, hashlib.md5(config_json).hexdigest())
+
+    cached = _query_runners.get(data_source_id)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    # the runner gets its own copy, so changes to the data source don't leak into it
+    query_runner = get_query_runner(query_runner_type, ConfigurationContainer(json.loads(config_json)))
+    if query_runner is None:
+        return None
+
+    query_runner.data_source_id = data_source_id
+    _query_runners[data_source_id] = (key, query_runner)
+
+    return query_runner
+
+
 def get_configuration_schema_for_query_runner_type(query_runner_type):
     query_runner_class = query_runners.get(query_runner_type, None)
     if query_runner_class is None:
@@ -4,7 +4,7 @@ import os
 
 from redash.query_runner import *
 from redash.settings import parse_boolean
-from redash.utils import JSONEncoder
+from redash.utils import json_dumps
 
 logger = logging.getLogger(__name__)
 ANNOTATE_QUERY = parse_boolean(os.environ.get('ATHENA_ANNOTATE_QUERY', 'true'))
@@ -127,14 +127,38 @@ class Athena(BaseQueryRunner):
 
     def __init__(self, configuration):
         super(Athena, self).__init__(configuration)
+        self._glue_client = None
+        self._connection = None
 
-    def __get_schema_from_glue(self):
-        client = boto3.client(
+    def _get_glue_client(self):
+        if self._glue_client is None:
+            self._glue_client = boto3.client(
                 'glue',
                 aws_access_key_id=self.configuration.get('aws_access_key', None),
                 aws_secret_access_key=self.configuration.get('aws_secret_key', None),
                 region_name=self.configuration['region']
                 )
+
+        return self._glue_client
+
+    def _get_connection(self):
+        # the connection only holds the boto session and client, every query
+        # gets its own cursor
+        if self._connection is None:
+            self._connection = pyathena.connect(
+                s3_staging_dir=self.configuration['s3_staging_dir'],
+                region_name=self.configuration['region'],
+                aws_access_key_id=self.configuration.get('aws_access_key', None),
+                aws_secret_access_key=self.configuration.get('aws_secret_key', None),
+                schema_name=self.configuration.get('schema', 'default'),
+                encryption_option=self.configuration.get('encryption_option', None),
+                kms_key=self.configuration.get('kms_key', None),
+                formatter=SimpleFormatter())
+
+        return self._connection
+
+    def __get_schema_from_glue(self):
+        client = self._get_glue_client()
         schema = {}
         paginator = client.get_paginator('get_tables')
 
@@ -185,15 +209,7 @@ class Athena(BaseQueryRunner):
         return schema.values()
 
     def run_query(self, query, user):
-        cursor = pyathena.connect(
-            s3_staging_dir=self.configuration['s3_staging_dir'],
-            region_name=self.configuration['region'],
-            aws_access_key_id=self.configuration.get('aws_access_key', None),
-            aws_secret_access_key=self.configuration.get('aws_secret_key', None),
-            schema_name=self.configuration.get('schema', 'default'),
-            encryption_option=self.configuration.get('encryption_option', None),
-            kms_key=self.configuration.get('kms_key', None),
-            formatter=SimpleFormatter()).cursor()
+        cursor = self._get_connection().cursor()
 
         try:
             cursor.execute(query)
@@ -218,7 +234,7 @@ class Athena(BaseQueryRunner):
                     'athena_query_id': athena_query_id
                 }
             }
-            json_data = json.dumps(data, cls=JSONEncoder)
+            json_data = json_dumps(data)
             error = None
         except KeyboardInterrupt:
             if cursor.query_id:
@@ -10,7 +10,7 @@ import requests
 
 from redash import settings
 from redash.query_runner import *
-from redash.utils import JSONEncoder
+from redash.utils import json_dumps
 
 logger = logging.getLogger(__name__)
 
@@ -150,8 +150,17 @@ class BigQuery(BaseQueryRunner):
 
     def __init__(self, configuration):
         super(BigQuery, self).__init__(configuration)
+        self._bigquery_service = None
 
     def _get_bigquery_service(self):
+        # reused by the following queries of the data source (the credentials
+        # refresh their access token when it expires)
+        if self._bigquery_service is None:
+            self._bigquery_service = self._build_bigquery_service()
+
+        return self._bigquery_service
+
+    def _build_bigquery_service(self):
         scope = [
             "https://www.googleapis.com/auth/bigquery",
             "https://www.googleapis.com/auth/drive"
@@ -301,7 +310,7 @@ class BigQuery(BaseQueryRunner):
             data = self._get_query_result(jobs, query)
             error = None
 
-            json_data = json.dumps(data, cls=JSONEncoder)
+            json_data = json_dumps(data)
         except apiclient.errors.HttpError as e:
             json_data = None
             if e.resp.status == 400:
@@ -364,7 +373,7 @@ class BigQueryGCE(BigQuery):
     def _get_project_id(self):
         return requests.get('http://metadata/computeMetadata/v1/project/project-id', headers={'Metadata-Flavor': 'Google'}).content
 
-    def _get_bigquery_service(self):
+    def _build_bigquery_service(self):
         credentials = gce.AppAssertionCredentials(scope='https://www.googleapis.com/auth/bigquery')
         http = httplib2.Http()
         http = credentials.authorize(http)
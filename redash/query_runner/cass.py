@@ -3,7 +3,7 @@ import logging
 import uuid
 
 from redash.query_runner import BaseQueryRunner, register
-from redash.utils import JSONEncoder
+from redash.utils import JSONEncoder, json_dumps
 
 logger = logging.getLogger(__name__)
 
@@ -147,7 +147,7 @@ class Cassandra(BaseQueryRunner):
             rows = [dict(zip(column_names, row)) for row in result]
 
             data = {'columns': columns, 'rows': rows}
-            json_data = json.dumps(data, cls=CassandraJSONEncoder)
+            json_data = json_dumps(data, cls=CassandraJSONEncoder)
 
             error = None
         except KeyboardInterrupt:
@@ -1,7 +1,7 @@
 import json
 import logging
 from redash.query_runner import *
-from redash.utils import JSONEncoder
+from redash.utils import json_dumps
 import requests
 import re
 logger = logging.getLogger(__name__)
@@ -116,7 +116,7 @@ class ClickHouse(BaseSQLQueryRunner):
             return json_data, error
         try:
             q = self._clickhouse_query(query)
-            data = json.dumps(q, cls=JSONEncoder)
+            data = json_dumps(q)
             error = None
         except Exception as e:
             data = None
@@ -190,20 +190,24 @@ class GoogleSpreadsheet(BaseQueryRunner):
 
     def __init__(self, configuration):
         super(GoogleSpreadsheet, self).__init__(configuration)
+        self._spreadsheet_service = None
 
     def _get_spreadsheet_service(self):
-        scope = [
-            'https://spreadsheets.google.com/feeds',
-        ]
-
-        key = json.loads(b64decode(self.configuration['jsonKeyFile']))
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(key, scope)
-
-        timeout_session = HTTPSession()
-        timeout_session.requests_session = TimeoutSession()
-        spreadsheetservice = gspread.Client(auth=creds, http_session=timeout_session)
-        spreadsheetservice.login()
-        return spreadsheetservice
+        if self._spreadsheet_service is None:
+            scope = [
+                'https://spreadsheets.google.com/feeds',
+            ]
+
+            key = json.loads(b64decode(self.configuration['jsonKeyFile']))
+            creds = ServiceAccountCredentials.from_json_keyfile_dict(key, scope)
+
+            timeout_session = HTTPSession()
+            timeout_session.requests_session = TimeoutSession()
+            self._spreadsheet_service = gspread.Client(auth=creds, http_session=timeout_session)
+
+        # only refreshes the access token when it's missing or expired
+        self._spreadsheet_service.login()
+        return self._spreadsheet_service
 
     def test_connection(self):
         self._get_spreadsheet_service()
@@ -1,20 +1,19 @@
-import json
 import logging
 import sys
 
 from redash.query_runner import *
-from redash.utils import JSONEncoder
 
 logger = logging.getLogger(__name__)
 
 try:
     from pyhive import hive
+    from thrift.transport.TTransport import TTransportException
     enabled = True
 except ImportError:
     enabled = False
 
-COLUMN_NAME = 0
-COLUMN_TYPE = 1
+# Options of the configuration passed on to hive.connect.
+CONNECTION_OPTIONS = ('host', 'port', 'database', 'username')
 
 types_map = {
     'BIGINT_TYPE': TYPE_INTEGER,
@@ -34,10 +33,11 @@ types_map = {
 }
 
 
-class Hive(BaseSQLQueryRunner):
+class Hive(BaseDBAPIQueryRunner):
     noop_query = "SELECT 1"
     default_doc_url = ("https://cwiki.apache.org/confluence/display/Hive/"
                        "LanguageManual")
+    types_map = types_map
 
     @classmethod
     def configuration_schema(cls):
@@ -66,6 +66,11 @@ class Hive(BaseSQLQueryRunner):
                     "title": "Toggle Table String",
                     "default": "_v",
                     "info": "This string will be used to toggle visibility of tables in the schema browser when editing a query in order to remove non-useful tables from sight."
+                },
+                "row_limit": {
+                    "type": "number",
+                    "title": "Maximum Rows",
+                    "info": "Stop fetching results after this many rows, and mark them as truncated."
                 }
             },
             "required": ["host"]
@@ -106,42 +111,15 @@ class Hive(BaseSQLQueryRunner):
             raise sys.exc_info()[1], None, sys.exc_info()[2]
         return schema.values()
 
-    def run_query(self, query, user):
-
-        connection = None
-        try:
-            connection = hive.connect(**self.configuration.to_dict())
-
-            cursor = connection.cursor()
-
-            cursor.execute(query)
-
-            column_names = []
-            columns = []
-
-            for column in cursor.description:
-                column_name = column[COLUMN_NAME]
-                column_names.append(column_name)
-
-                columns.append({
-                    'name': column_name,
-                    'friendly_name': column_name,
-                    'type': types_map.get(column[COLUMN_TYPE], None)
-                })
-
-            rows = [dict(zip(column_names, row)) for row in cursor]
+    def _connect(self):
+        return hive.connect(**{k: v for k, v in self.configuration.to_dict().iteritems() if k in CONNECTION_OPTIONS})
 
-            data = {'columns': columns, 'rows': rows}
-            json_data = json.dumps(data, cls=JSONEncoder)
-            error = None
-        except KeyboardInterrupt:
-            connection.cancel()
-            error = "Query cancelled by user."
-            json_data = None
-        finally:
-            if connection:
-                connection.close()
+    def is_connection_error(self, e):
+        # failed queries are OperationalErrors, while failed connections to the
+        # server are errors of its transport
+        return isinstance(e, TTransportException)
 
-        return json_data, error
+    def _cancel(self, connection, cursor):
+        cursor.cancel()
 
 register(Hive)
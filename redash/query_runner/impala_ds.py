@@ -1,21 +1,18 @@
-import json
 import logging
-import sys
 
 from redash.query_runner import *
-from redash.utils import JSONEncoder
 
 logger = logging.getLogger(__name__)
 
 try:
     from impala.dbapi import connect
-    from impala.error import DatabaseError, RPCError
+    from impala.error import DatabaseError, DisconnectedError, RPCError
     enabled = True
 except ImportError as e:
     enabled = False
 
-COLUMN_NAME = 0
-COLUMN_TYPE = 1
+# Options of the configuration passed on to impala.dbapi.connect.
+CONNECTION_OPTIONS = ('host', 'port', 'protocol', 'database', 'use_ldap', 'ldap_user', 'ldap_password', 'timeout')
 
 types_map = {
     'BIGINT': TYPE_INTEGER,
@@ -34,10 +31,11 @@ types_map = {
 }
 
 
-class Impala(BaseSQLQueryRunner):
+class Impala(BaseDBAPIQueryRunner):
     noop_query = "show schemas"
     default_doc_url = ("http://www.cloudera.com/documentation/enterprise/"
                        "latest/topics/impala_langref.html")
+    types_map = types_map
 
     @classmethod
     def configuration_schema(cls):
@@ -79,6 +77,11 @@ class Impala(BaseSQLQueryRunner):
                     "title": "Toggle Table String",
                     "default": "_v",
                     "info": "This string will be used to toggle visibility of tables in the schema browser when editing a query in order to remove non-useful tables from sight."
+                },
+                "row_limit": {
+                    "type": "number",
+                    "title": "Maximum Rows",
+                    "info": "Stop fetching results after this many rows, and mark them as truncated."
                 }
             },
             "required": ["host"],
@@ -108,49 +111,24 @@ class Impala(BaseSQLQueryRunner):
 
         return schema_dict.values()
 
-    def run_query(self, query, user):
-
-        connection = None
-        try:
-            connection = connect(**self.configuration.to_dict())
-
-            cursor = connection.cursor()
-
-            cursor.execute(query)
-
-            column_names = []
-            columns = []
-
-            for column in cursor.description:
-                column_name = column[COLUMN_NAME]
-                column_names.append(column_name)
-
-                columns.append({
-                    'name': column_name,
-                    'friendly_name': column_name,
-                    'type': types_map.get(column[COLUMN_TYPE], None)
-                })
-
-            rows = [dict(zip(column_names, row)) for row in cursor]
-
-            data = {'columns': columns, 'rows': rows}
-            json_data = json.dumps(data, cls=JSONEncoder)
-            error = None
-            cursor.close()
-        except DatabaseError as e:
-            json_data = None
-            error = e.message
-        except RPCError as e:
-            json_data = None
-            error = "Metastore Error [%s]" % e.message
-        except KeyboardInterrupt:
-            connection.cancel()
-            error = "Query cancelled by user."
-            json_data = None
-        finally:
-            if connection:
-                connection.close()
-
-        return json_data, error
+    def _connect(self):
+        return connect(**{k: v for k, v in self.configuration.to_dict().iteritems() if k in CONNECTION_OPTIONS})
+
+    def _cancel(self, connection, cursor):
+        cursor.cancel_operation()
+
+    def is_connection_error(self, e):
+        # the transport is thrift's or thriftpy's, depending on the impyla version
+        return (isinstance(e, DisconnectedError) or
+                any(cls.__name__ == 'TTransportException' for cls in type(e).__mro__))
+
+    def _get_error_message(self, error):
+        if isinstance(error, RPCError):
+            return "Metastore Error [%s]" % error.message
+
+        if isinstance(error, DatabaseError):
+            return error.message
+
+        return None
 
 register(Impala)
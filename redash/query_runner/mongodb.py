@@ -6,7 +6,7 @@ import re
 from dateutil.parser import parse
 
 from redash.query_runner import *
-from redash.utils import JSONEncoder, parse_human_time
+from redash.utils import JSONEncoder, json_dumps, parse_human_time
 
 logger = logging.getLogger(__name__)
 
@@ -326,7 +326,7 @@ class MongoDB(BaseQueryRunner):
             "rows": rows
         }
         error = None
-        json_data = json.dumps(data, cls=MongoDBJSONEncoder)
+        json_data = json_dumps(data, cls=MongoDBJSONEncoder)
 
         return json_data, error
 
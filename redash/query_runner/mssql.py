@@ -1,6 +1,5 @@
 import json
 import logging
-import sys
 import uuid
 
 from redash.query_runner import *
@@ -14,6 +13,10 @@ try:
 except ImportError:
     enabled = False
 
+# DB-Lib errors of failed or lost connections (unable to connect, read from or
+# write to the server failed, connection is dead).
+DBLIB_CONNECTION_ERRORS = (20002, 20004, 20006, 20009, 20047)
+
 # from _mssql.pyx ## DB-API type definitions & http://www.freetds.org/tds.html#types ##
 types_map = {
     1: TYPE_STRING,
@@ -33,9 +36,11 @@ class MSSQLJSONEncoder(JSONEncoder):
         return super(MSSQLJSONEncoder, self).default(o)
 
 
-class SqlServer(BaseSQLQueryRunner):
+class SqlServer(BaseDBAPIQueryRunner):
     noop_query = "SELECT 1"
     default_doc_url = "https://msdn.microsoft.com/en-us/library/bb510741.aspx"
+    types_map = types_map
+    json_encoder = MSSQLJSONEncoder
 
     @classmethod
     def configuration_schema(cls):
@@ -80,6 +85,11 @@ class SqlServer(BaseSQLQueryRunner):
                     "title": "Toggle Table String",
                     "default": "_v",
                     "info": "This string will be used to toggle visibility of tables in the schema browser when editing a query in order to remove non-useful tables from sight."
+                },
+                "row_limit": {
+                    "type": "number",
+                    "title": "Maximum Rows",
+                    "info": "Stop fetching results after this many rows, and mark them as truncated."
                 }
             },
             "required": ["db"],
@@ -135,62 +145,50 @@ class SqlServer(BaseSQLQueryRunner):
 
         return schema.values()
 
-    def run_query(self, query, user):
-        connection = None
+    def _connect(self):
+        server = self.configuration.get('server', '')
+        user = self.configuration.get('user', '')
+        password = self.configuration.get('password', '')
+        db = self.configuration['db']
+        port = self.configuration.get('port', 1433)
+        tds_version = self.configuration.get('tds_version', '7.0')
+        charset = self.configuration.get('charset', 'UTF-8')
 
-        try:
-            server = self.configuration.get('server', '')
-            user = self.configuration.get('user', '')
-            password = self.configuration.get('password', '')
-            db = self.configuration['db']
-            port = self.configuration.get('port', 1433)
-            tds_version = self.configuration.get('tds_version', '7.0')
-            charset = self.configuration.get('charset', 'UTF-8')
+        if port != 1433:
+            server = server + ':' + str(port)
 
-            if port != 1433:
-                server = server + ':' + str(port)
+        return pymssql.connect(server=server, user=user, password=password, database=db, tds_version=tds_version, charset=charset)
 
-            connection = pymssql.connect(server=server, user=user, password=password, database=db, tds_version=tds_version, charset=charset)
+    def _execute(self, cursor, query):
+        if isinstance(query, unicode):
+            query = query.encode(self.configuration.get('charset', 'UTF-8'))
 
-            if isinstance(query, unicode):
-                query = query.encode(charset)
+        cursor.execute(query)
 
-            cursor = connection.cursor()
-            logger.debug("SqlServer running query: %s", query)
+    def _cancel(self, connection, cursor):
+        connection.cancel()
 
-            cursor.execute(query)
-            data = cursor.fetchall()
+    def is_connection_error(self, e):
+        if isinstance(e, pymssql.InterfaceError):
+            return True
 
-            if cursor.description is not None:
-                columns = self.fetch_columns([(i[0], types_map.get(i[1], None)) for i in cursor.description])
-                rows = [dict(zip((c['name'] for c in columns), row)) for row in data]
+        # query errors are OperationalErrors too, with the SQL Server error number
+        if isinstance(e, pymssql.OperationalError) and e.args:
+            # the number is at `args[0][0]` for errors while connecting
+            number = e.args[0][0] if isinstance(e.args[0], tuple) else e.args[0]
+            return number in DBLIB_CONNECTION_ERRORS
 
-                data = {'columns': columns, 'rows': rows}
-                json_data = json.dumps(data, cls=MSSQLJSONEncoder)
-                error = None
-            else:
-                error = "No data was returned."
-                json_data = None
-
-            cursor.close()
-        except pymssql.Error as e:
-            try:
-                # Query errors are at `args[1]`
-                error = e.args[1]
-            except IndexError:
-                # Connection errors are `args[0][1]`
-                error = e.args[0][1]
-            json_data = None
-        except KeyboardInterrupt:
-            connection.cancel()
-            error = "Query cancelled by user."
-            json_data = None
-        except Exception as e:
-            raise sys.exc_info()[1], None, sys.exc_info()[2]
-        finally:
-            if connection:
-                connection.close()
-
-        return json_data, error
+        return False
+
+    def _get_error_message(self, error):
+        if not isinstance(error, pymssql.Error):
+            return None
+
+        try:
+            # Query errors are at `args[1]`
+            return error.args[1]
+        except IndexError:
+            # Connection errors are `args[0][1]`
+            return error.args[0][1]
 
 register(SqlServer)
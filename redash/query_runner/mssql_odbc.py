@@ -1,6 +1,5 @@
 import json
 import logging
-import sys
 import uuid
 
 from redash.query_runner import *
@@ -16,8 +15,10 @@ except ImportError:
     enabled = False
 
 
-class SQLServerODBC(BaseSQLQueryRunner):
+class SQLServerODBC(BaseDBAPIQueryRunner):
     noop_query = "SELECT 1"
+    types_map = types_map
+    json_encoder = MSSQLJSONEncoder
 
     @classmethod
     def configuration_schema(cls):
@@ -51,6 +52,11 @@ class SQLServerODBC(BaseSQLQueryRunner):
                     "type": "string",
                     "title": "Driver Identifier",
                     "default": "{ODBC Driver 13 for SQL Server}"
+                },
+                "row_limit": {
+                    "type": "number",
+                    "title": "Maximum Rows",
+                    "info": "Stop fetching results after this many rows, and mark them as truncated."
                 }
             },
             "required": ["db"],
@@ -106,61 +112,43 @@ class SQLServerODBC(BaseSQLQueryRunner):
 
         return schema.values()
 
-    def run_query(self, query, user):
-        connection = None
+    def _connect(self):
+        server = self.configuration.get('server', '')
+        user = self.configuration.get('user', '')
+        password = self.configuration.get('password', '')
+        db = self.configuration['db']
+        port = self.configuration.get('port', 1433)
+        driver = self.configuration.get('driver', '{ODBC Driver 13 for SQL Server}')
+
+        connection_string_fmt = 'DRIVER={};PORT={};SERVER={};DATABASE={};UID={};PWD={}'
+        connection_string = connection_string_fmt.format(driver,
+                                                         port,
+                                                         server,
+                                                         db,
+                                                         user,
+                                                         password)
+        return pyodbc.connect(connection_string)
+
+    def _cancel(self, connection, cursor):
+        cursor.cancel()
+
+    def is_connection_error(self, e):
+        # SQLSTATE class 08 is "connection exception", HYT01 a connection timeout
+        # (HYT00, a query timeout, isn't)
+        if isinstance(e, pyodbc.Error) and e.args:
+            return str(e.args[0]).startswith('08') or e.args[0] == 'HYT01'
+
+        return False
+
+    def _get_error_message(self, error):
+        if not isinstance(error, pyodbc.Error):
+            return None
 
         try:
-            server = self.configuration.get('server', '')
-            user = self.configuration.get('user', '')
-            password = self.configuration.get('password', '')
-            db = self.configuration['db']
-            port = self.configuration.get('port', 1433)
-            charset = self.configuration.get('charset', 'UTF-8')
-            driver = self.configuration.get('driver', '{ODBC Driver 13 for SQL Server}')
-
-            connection_string_fmt = 'DRIVER={};PORT={};SERVER={};DATABASE={};UID={};PWD={}'
-            connection_string = connection_string_fmt.format(driver,
-                                                             port,
-                                                             server,
-                                                             db,
-                                                             user,
-                                                             password)
-            connection = pyodbc.connect(connection_string)
-            cursor = connection.cursor()
-            logger.debug("SQLServerODBC running query: %s", query)
-            cursor.execute(query)
-            data = cursor.fetchall()
-
-            if cursor.description is not None:
-                columns = self.fetch_columns([(i[0], types_map.get(i[1], None)) for i in cursor.description])
-                rows = [dict(zip((c['name'] for c in columns), row)) for row in data]
-
-                data = {'columns': columns, 'rows': rows}
-                json_data = json.dumps(data, cls=MSSQLJSONEncoder)
-                error = None
-            else:
-                error = "No data was returned."
-                json_data = None
-
-            cursor.close()
-        except pyodbc.Error as e:
-            try:
-                # Query errors are at `args[1]`
-                error = e.args[1]
-            except IndexError:
-                # Connection errors are `args[0][1]`
-                error = e.args[0][1]
-            json_data = None
-        except KeyboardInterrupt:
-            connection.cancel()
-            error = "Query cancelled by user."
-            json_data = None
-        except Exception as e:
-            raise sys.exc_info()[1], None, sys.exc_info()[2]
-        finally:
-            if connection:
-                connection.close()
-
-        return json_data, error
+            # Query errors are at `args[1]`
+            return error.args[1]
+        except IndexError:
+            # Connection errors are `args[0][1]`
+            return error.args[0][1]
 
 register(SQLServerODBC)
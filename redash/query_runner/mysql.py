@@ -4,9 +4,12 @@ import os
 
 from redash.query_runner import *
 from redash.settings import parse_boolean
-from redash.utils import JSONEncoder
 
 logger = logging.getLogger(__name__)
+
+# Resets the session state (MySQL 5.7.3+). Not among the commands of PyMySQL.
+COM_RESET_CONNECTION = 0x1f
+
 types_map = {
     0: TYPE_FLOAT,
     1: TYPE_INTEGER,
@@ -27,11 +30,12 @@ types_map = {
 }
 
 
-class Mysql(BaseSQLQueryRunner):
+class Mysql(BaseDBAPIQueryRunner):
     noop_query = "SELECT 1"
     default_doc_url = 'https://dev.mysql.com/doc/refman/5.7/en/'
     data_source_version_query = "select version()"
     data_source_version_post_process = "none"
+    types_map = types_map
 
     @classmethod
     def configuration_schema(cls):
@@ -64,6 +68,16 @@ class Mysql(BaseSQLQueryRunner):
                     "title": "Toggle Table String",
                     "default": "_v",
                     "info": "This string will be used to toggle visibility of tables in the schema browser when editing a query in order to remove non-useful tables from sight."
+                },
+                "connection_pooling": {
+                    "type": "boolean",
+                    "title": "Reuse Connections",
+                    "info": "Keep connections open in each worker between queries instead of connecting for every query."
+                },
+                "row_limit": {
+                    "type": "number",
+                    "title": "Maximum Rows",
+                    "info": "Stop fetching results after this many rows, and mark them as truncated."
                 }
             },
             "order": ['host', 'port', 'user', 'passwd', 'db'],
@@ -141,53 +155,62 @@ class Mysql(BaseSQLQueryRunner):
 
         return schema.values()
 
-    def run_query(self, query, user):
+    def _connect(self):
         import pymysql
 
-        connection = None
+        return pymysql.connect(host=self.configuration.get('host', ''),
+                               user=self.configuration.get('user', ''),
+                               passwd=self.configuration.get('passwd', ''),
+                               db=self.configuration['db'],
+                               port=self.configuration.get('port', 3306),
+                               charset='utf8', use_unicode=True,
+                               ssl=self._get_ssl_parameters(),
+                               connect_timeout=60)
+
+    def _is_connection_usable(self, connection, idle_time):
+        import pymysql
+
+        if not connection.open:
+            return False
+
         try:
-            connection = pymysql.connect(host=self.configuration.get('host', ''),
-                                         user=self.configuration.get('user', ''),
-                                         passwd=self.configuration.get('passwd', ''),
-                                         db=self.configuration['db'],
-                                         port=self.configuration.get('port', 3306),
-                                         charset='utf8', use_unicode=True,
-                                         ssl=self._get_ssl_parameters(),
-                                         connect_timeout=60)
-            cursor = connection.cursor()
-            logger.debug("MySQL running query: %s", query)
-            cursor.execute(query)
-
-            data = cursor.fetchall()
-
-            while cursor.nextset():
-                data = cursor.fetchall()
-
-            # TODO - very similar to pg.py
-            if cursor.description is not None:
-                columns = self.fetch_columns([(i[0], types_map.get(i[1], None)) for i in cursor.description])
-                rows = [dict(zip((c['name'] for c in columns), row)) for row in data]
-
-                data = {'columns': columns, 'rows': rows}
-                json_data = json.dumps(data, cls=JSONEncoder)
-                error = None
-            else:
-                json_data = None
-                error = "No data was returned."
-
-            cursor.close()
-        except pymysql.Error as e:
-            json_data = None
-            error = e.args[1]
-        except KeyboardInterrupt:
-            cursor.close()
-            error = "Query cancelled by user."
-            json_data = None
-        finally:
-            if connection:
-                connection.close()
-
-        return json_data, error
+            # ends the transaction (and its snapshot) left open by the previous query
+            connection.rollback()
+            return True
+        except pymysql.Error:
+            return False
+
+    def _reset_connection(self, connection):
+        connection._execute_command(COM_RESET_CONNECTION, '')
+        connection._read_ok_packet()
+        # the reset keeps the current database and sets the server's default autocommit mode
+        connection.select_db(self.configuration['db'])
+        connection.autocommit(connection.autocommit_mode)
+
+    def _execute(self, cursor, query):
+        cursor.execute(query)
+
+        # the result is the one of the last statement
+        while cursor.nextset():
+            pass
+
+    def is_connection_error(self, e):
+        import pymysql
+
+        if isinstance(e, pymysql.OperationalError):
+            # only client errors (CR_*, e.g. "Can't connect" or "Lost connection"), not
+            # server errors like lock wait or execution time outs
+            return bool(e.args) and 2000 <= e.args[0] < 3000
+
+        return isinstance(e, pymysql.InterfaceError)
+
+    def _get_error_message(self, error):
+        import pymysql
+
+        if isinstance(error, pymysql.Error):
+            return error.args[1]
+
+        return None
 
     def _get_ssl_parameters(self):
         ssl_params = {}
@@ -3,7 +3,7 @@ import logging
 import sys
 
 from redash.query_runner import *
-from redash.utils import JSONEncoder
+from redash.utils import json_dumps
 
 try:
     import cx_Oracle
@@ -31,8 +31,11 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# ORA- errors of unavailable databases and failed or lost connections.
+CONNECTION_ERRORS = (1033, 1034, 1089, 3113, 3114, 3135, 12170, 12514, 12528, 12537, 12541, 12543, 12545)
 
-class Oracle(BaseSQLQueryRunner):
+
+class Oracle(BaseDBAPIQueryRunner):
     noop_query = "SELECT 1 FROM dual"
     default_doc_url = "http://docs.oracle.com/database/121/SQLRF/toc.htm"
 
@@ -78,6 +81,11 @@ class Oracle(BaseSQLQueryRunner):
                     "title": "Toggle Table String",
                     "default": "_v",
                     "info": "This string will be used to toggle visibility of tables in the schema browser when editing a query in order to remove non-useful tables from sight."
+                },
+                "row_limit": {
+                    "type": "number",
+                    "title": "Maximum Rows",
+                    "info": "Stop fetching results after this many rows, and mark them as truncated."
                 }
             },
             "required": ["servicename", "user", "password", "host", "port"],
@@ -147,37 +155,40 @@ class Oracle(BaseSQLQueryRunner):
             if scale <= 0:
                 return cursor.var(cx_Oracle.STRING, 255, outconverter=Oracle._convert_number, arraysize=cursor.arraysize)
 
-    def run_query(self, query, user):
+    def _connect(self):
         connection = cx_Oracle.connect(self.connection_string)
         connection.outputtypehandler = Oracle.output_handler
 
-        cursor = connection.cursor()
+        return connection
 
-        try:
-            cursor.execute(query)
-            rows_count = cursor.rowcount
-            if cursor.description is not None:
-                columns = self.fetch_columns([(i[0], Oracle.get_col_type(i[1], i[5])) for i in cursor.description])
-                rows = [dict(zip((c['name'] for c in columns), row)) for row in cursor]
-                data = {'columns': columns, 'rows': rows}
-                error = None
-                json_data = json.dumps(data, cls=JSONEncoder)
-            else:
-                columns = [{'name': 'Row(s) Affected', 'type': 'TYPE_INTEGER'}]
-                rows = [{'Row(s) Affected': rows_count}]
-                data = {'columns': columns, 'rows': rows}
-                json_data = json.dumps(data, cls=JSONEncoder)
-                connection.commit()   
-        except cx_Oracle.DatabaseError as err:
-            error = u"Query failed. {}.".format(err.message)
-            json_data = None
-        except KeyboardInterrupt:
-            connection.cancel()
-            error = "Query cancelled by user."
-            json_data = None
-        finally:
-            connection.close()
-
-        return json_data, error
+    def _get_column_type(self, column):
+        return Oracle.get_col_type(column[1], column[5])
+
+    def _cancel(self, connection, cursor):
+        connection.cancel()
+
+    def is_connection_error(self, e):
+        if isinstance(e, cx_Oracle.InterfaceError):
+            return True
+
+        if isinstance(e, cx_Oracle.DatabaseError) and e.args:
+            return getattr(e.args[0], 'code', None) in CONNECTION_ERRORS
+
+        return False
+
+    def _get_error_message(self, error):
+        if isinstance(error, cx_Oracle.DatabaseError):
+            return u"Query failed. {}.".format(error.message)
+
+        return None
+
+    def _get_result_without_rows(self, connection, cursor):
+        columns = [{'name': 'Row(s) Affected', 'type': 'TYPE_INTEGER'}]
+        rows = [{'Row(s) Affected': cursor.rowcount}]
+        data = {'columns': columns, 'rows': rows}
+        json_data = json_dumps(data)
+        connection.commit()
+
+        return json_data, None
 
 register(Oracle)
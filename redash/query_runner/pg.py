@@ -4,9 +4,11 @@ import logging
 import select
 
 import psycopg2
+import sqlparse
+from sqlparse.tokens import Keyword, Punctuation
 
+from redash import settings
 from redash.query_runner import *
-from redash.utils import JSONEncoder
 
 logger = logging.getLogger(__name__)
 
@@ -45,11 +47,40 @@ def _wait(conn, timeout=None):
             raise psycopg2.OperationalError("select.error received")
 
 
-class PostgreSQL(BaseSQLQueryRunner):
+def _get_cursor_statement(query):
+    """
+    Returns `query` without its trailing semicolon if it's a single SELECT
+    statement, that can be run through a server side cursor, otherwise None.
+    """
+    statements = [statement for statement in sqlparse.parse(query)
+                  if sqlparse.format(unicode(statement), strip_comments=True).strip()]
+
+    if len(statements) != 1 or statements[0].get_type() != 'SELECT':
+        return None
+
+    tokens = list(statements[0].tokens)
+    if any(token.ttype in Keyword and token.normalized == 'INTO' for token in tokens):
+        # SELECT ... INTO creates a table, and can't be declared as a cursor
+        return None
+
+    while tokens and (tokens[-1].is_whitespace or tokens[-1].ttype in sqlparse.tokens.Comment
+                      or isinstance(tokens[-1], sqlparse.sql.Comment)):
+        tokens.pop()
+
+    if tokens and tokens[-1].ttype in Punctuation and tokens[-1].value == ';':
+        tokens.pop()
+
+    return u''.join(unicode(token) for token in tokens).strip()
+
+
+class PostgreSQL(BaseDBAPIQueryRunner):
     noop_query = "SELECT 1"
     default_doc_url = "https://www.postgresql.org/docs/current/"
     data_source_version_query = "select version()"
     data_source_version_post_process = "split by space take second"
+    # run on connections going back to the pool
+    reset_statements = ("ROLLBACK", "DISCARD ALL")
+    types_map = types_map
 
     @classmethod
     def configuration_schema(cls):
@@ -89,6 +120,31 @@ class PostgreSQL(BaseSQLQueryRunner):
                     "title": "Toggle Table String",
                     "default": "_v",
                     "info": "This string will be used to toggle visibility of tables in the schema browser when editing a query in order to remove non-useful tables from sight."
+                },
+                "freshness_probe": {
+                    "type": "boolean",
+                    "title": "Skip Scheduled Refreshes of Unchanged Tables",
+                    "info": "Uses the modification counters of pg_stat_user_tables to skip scheduled refreshes when none of a query's tables changed since its last result."
+                },
+                "freshness_query": {
+                    "type": "string",
+                    "title": "Freshness Query",
+                    "info": "Query returning the table names and a value that changes whenever their data does (e.g. the last load time), used instead of pg_stat_user_tables."
+                },
+                "connection_pooling": {
+                    "type": "boolean",
+                    "title": "Reuse Connections",
+                    "info": "Keep connections open in each worker between queries instead of connecting for every query."
+                },
+                "server_side_cursors": {
+                    "type": "boolean",
+                    "title": "Stream Results",
+                    "info": "Fetch the results of SELECT queries in batches through a server side cursor, instead of receiving them all at once."
+                },
+                "row_limit": {
+                    "type": "number",
+                    "title": "Maximum Rows",
+                    "info": "Stop fetching results after this many rows, and mark them as truncated."
                 }
             },
             "order": ['host', 'port', 'user', 'password'],
@@ -156,6 +212,25 @@ class PostgreSQL(BaseSQLQueryRunner):
 
         return schema.values()
 
+    def get_table_versions(self):
+        if self.configuration.get('freshness_query') or not self.configuration.get('freshness_probe'):
+            return super(PostgreSQL, self).get_table_versions()
+
+        query = """
+        SELECT schemaname AS table_schema,
+               relname AS table_name,
+               concat_ws(':', n_tup_ins, n_tup_upd, n_tup_del, n_live_tup) AS version
+        FROM pg_stat_user_tables
+        """
+
+        versions = {}
+        for row in self._run_query_internal(query):
+            versions[u'{}.{}'.format(row['table_schema'], row['table_name']).lower()] = row['version']
+            if row['table_schema'] == 'public':
+                versions[row['table_name'].lower()] = row['version']
+
+        return versions
+
     def _get_connection(self):
         connection = psycopg2.connect(user=self.configuration.get('user'),
                                       password=self.configuration.get('password'),
@@ -167,40 +242,117 @@ class PostgreSQL(BaseSQLQueryRunner):
 
         return connection
 
-    def run_query(self, query, user):
+    def _connect(self):
         connection = self._get_connection()
         _wait(connection, timeout=10)
 
-        cursor = connection.cursor()
+        return connection
+
+    def _is_connection_usable(self, connection, idle_time):
+        if connection.closed:
+            return False
+
+        if idle_time < settings.CONNECTION_POOL_PING_AFTER:
+            return True
 
         try:
-            cursor.execute(query)
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            _wait(connection, timeout=10)
+            cursor.close()
+            return True
+        except (psycopg2.Error, select.error, OSError):
+            return False
+
+    def _reset_connection(self, connection):
+        cursor = connection.cursor()
+        # the session can't be reset in a transaction block, which the query may have left open
+        for statement in self.reset_statements:
+            cursor.execute(statement)
+            _wait(connection, timeout=10)
+        cursor.close()
+
+    def is_connection_error(self, e):
+        # statement timeouts, deadlocks and serialization failures are OperationalErrors too
+        if isinstance(e, (psycopg2.extensions.QueryCanceledError, psycopg2.extensions.TransactionRollbackError)):
+            return False
+
+        return isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+
+    def _fetch_with_server_side_cursor(self, connection, cursor, statement, positional_rows):
+        # Named cursors aren't available on async connections, so the cursor is
+        # declared (and fetched from) with plain statements, which keeps
+        # cancellation working.
+        def execute(sql):
+            cursor.execute(sql)
             _wait(connection)
 
-            if cursor.description is not None:
-                columns = self.fetch_columns([(i[0], types_map.get(i[1], None)) for i in cursor.description])
-                rows = [dict(zip((c['name'] for c in columns), row)) for row in cursor]
+        def fetch():
+            execute("FETCH FORWARD {} FROM redash_results".format(settings.QUERY_RESULTS_FETCH_SIZE))
+            return cursor.fetchall()
 
-                data = {'columns': columns, 'rows': rows}
+        execute("BEGIN")
+        try:
+            execute(u"DECLARE redash_results NO SCROLL CURSOR FOR {}".format(statement))
+            # the result's columns are only described once rows were fetched
+            first_batch = [fetch()]
+            result = self._fetch_result(cursor, lambda: first_batch.pop() if first_batch else fetch(),
+                                        positional_rows)
+            execute("CLOSE redash_results")
+            execute("COMMIT")
+        except psycopg2.DatabaseError:
+            if not connection.closed:
+                execute("ROLLBACK")
+            raise
+
+        return result
+
+    def run_query_with_row_count(self, query, user, positional_rows=False):
+        connection = self._acquire_connection()
+        reusable = True
+        row_count = None
+
+        cursor = connection.cursor()
+
+        try:
+            statement = None
+            if self.configuration.get('server_side_cursors'):
+                statement = _get_cursor_statement(query)
+
+            if statement is not None:
+                result = self._fetch_with_server_side_cursor(connection, cursor, statement, positional_rows)
+            else:
+                cursor.execute(query)
+                _wait(connection)
+                result = self._fetch_result(cursor, positional_rows=positional_rows)
+
+            if result is not None:
                 error = None
-                json_data = json.dumps(data, cls=JSONEncoder)
+                json_data = result.to_json()
+                row_count = result.row_count
             else:
                 error = 'Query completed but it returned no data.'
                 json_data = None
         except (select.error, OSError) as e:
+            reusable = False
             error = "Query interrupted. Please retry."
             json_data = None
         except psycopg2.DatabaseError as e:
+            if self.is_connection_error(e):
+                reusable = False
+                raise
+            reusable = not connection.closed
             error = e.message
             json_data = None
         except (KeyboardInterrupt, InterruptException):
             connection.cancel()
+            reusable = False
             error = "Query cancelled by user."
             json_data = None
         finally:
-            connection.close()
+            self._release_connection(connection, reusable)
 
-        return json_data, error
+        return json_data, error, row_count
 
 
 class Redshift(PostgreSQL):
@@ -208,6 +360,8 @@ class Redshift(PostgreSQL):
                        "dg/cm_chap_SQLCommandRef.html")
     data_source_version_query = "select version()"
     data_source_version_post_process = "split by space take last"
+    # Redshift doesn't support DISCARD
+    reset_statements = ("ROLLBACK", "RESET ALL")
 
     @classmethod
     def type(cls):
@@ -258,6 +412,11 @@ class Redshift(PostgreSQL):
                     "type": "string",
                     "title": "Documentation URL",
                     "default": cls.default_doc_url
+                },
+                "connection_pooling": {
+                    "type": "boolean",
+                    "title": "Reuse Connections",
+                    "info": "Keep connections open in each worker between queries instead of connecting for every query."
                 }
             },
             "order": ['host', 'port', 'user', 'password'],
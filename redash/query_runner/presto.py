@@ -1,7 +1,5 @@
 import json
-from markupsafe import Markup, escape
 
-from redash.utils import JSONEncoder
 from redash.query_runner import *
 
 import logging
@@ -9,6 +7,8 @@ logger = logging.getLogger(__name__)
 
 from collections import defaultdict
 
+import requests
+
 try:
     from pyhive import presto
     from pyhive.exc import DatabaseError
@@ -32,9 +32,10 @@ PRESTO_TYPES_MAPPING = {
 }
 
 
-class Presto(BaseQueryRunner):
+class Presto(BaseDBAPIQueryRunner):
     noop_query = 'SHOW TABLES'
     default_doc_url = 'https://prestodb.io/docs/current/'
+    types_map = PRESTO_TYPES_MAPPING
 
     @classmethod
     def configuration_schema(cls):
@@ -66,6 +67,11 @@ class Presto(BaseQueryRunner):
                     "title": "Toggle Table String",
                     "default": "_v",
                     "info": "This string will be used to toggle visibility of tables in the schema browser when editing a query in order to remove non-useful tables from sight."
+                },
+                "row_limit": {
+                    "type": "number",
+                    "title": "Maximum Rows",
+                    "info": "Stop fetching results after this many rows, and mark them as truncated."
                 }
             },
             'required': ['host']
@@ -115,43 +121,31 @@ class Presto(BaseQueryRunner):
 
         return schema.values()
 
-    def run_query(self, query, user):
-        connection = presto.connect(
+    def _connect(self):
+        return presto.connect(
                 host=self.configuration.get('host', ''),
                 port=self.configuration.get('port', 8080),
                 username=self.configuration.get('username', 'redash'),
                 catalog=self.configuration.get('catalog', 'hive'),
                 schema=self.configuration.get('schema', 'default'))
 
-        cursor = connection.cursor()
-
-
-        try:
-            cursor.execute(query)
-            column_tuples = [(i[0], PRESTO_TYPES_MAPPING.get(i[1], None)) for i in cursor.description]
-            columns = self.fetch_columns(column_tuples)
-            rows = [dict(zip(([c['name'] for c in columns]), r)) for i, r in enumerate(cursor.fetchall())]
-            for row in rows:
-                for field in row:
-                    field = escape(field)
-            data = {'columns': columns, 'rows': rows}
-            json_data = json.dumps(data, cls=JSONEncoder)
-            error = None
-        except DatabaseError as db:
-            json_data = None
-            default_message = 'Unspecified DatabaseError: {0}'.format(db.message)
-            message = db.message.get('failureInfo', {'message', None}).get('message')
-            error = default_message if message is None else message
-        except (KeyboardInterrupt, InterruptException) as e:
-            cursor.cancel()
-            error = "Query cancelled by user."
-            json_data = None
-        except Exception as ex:
-            json_data = None
-            error = ex.message
-            if not isinstance(error, basestring):
-                error = unicode(error)
-
-        return json_data, error
+    def _cancel(self, connection, cursor):
+        cursor.cancel()
+
+    def is_connection_error(self, e):
+        # failed queries are DatabaseErrors, while failed requests to the coordinator
+        # are raised as they are (read timeouts are left to the query's timeout)
+        return isinstance(e, requests.exceptions.ConnectionError)
+
+    def _get_error_message(self, error):
+        if isinstance(error, DatabaseError):
+            default_message = 'Unspecified DatabaseError: {0}'.format(error.message)
+            message = error.message.get('failureInfo', {'message', None}).get('message')
+            return default_message if message is None else message
+
+        message = error.message
+        if not isinstance(message, basestring):
+            message = unicode(message)
+        return message
 
 register(Presto)
@@ -4,7 +4,7 @@ import logging
 import sys
 
 from redash.query_runner import *
-from redash.utils import json_dumps
+from redash.utils import convert_rows, json_dumps
 from redash import models
 
 import importlib
@@ -89,9 +89,7 @@ class Python(BaseQueryRunner):
         self.syntax = "python"
 
         self._allowed_modules = {}
-        self._script_locals = {"result": {"rows": [], "columns": [], "log": []}}
         self._enable_print_log = True
-        self._custom_print = CustomPrint()
 
         if self.configuration.get("allowedImportModules", None):
             for item in self.configuration["allowedImportModules"].split(","):
@@ -225,7 +223,7 @@ class Python(BaseQueryRunner):
         if query.latest_query_data.data is None:
             raise Exception("Query does not have results yet.")
 
-        return json.loads(query.latest_query_data.data)
+        return convert_rows(json.loads(query.latest_query_data.data))
 
     def test_connection(self):
         pass
@@ -236,6 +234,10 @@ class Python(BaseQueryRunner):
 
             code = compile_restricted(query, '<string>', 'exec')
 
+            # new for each execution, as the runner is reused by later queries of other users
+            script_locals = {"result": {"rows": [], "columns": [], "log": []}}
+            custom_print = CustomPrint()
+
             builtins = safe_builtins.copy()
             builtins["_write_"] = self.custom_write
             builtins["__import__"] = self.custom_import
@@ -245,7 +247,7 @@ class Python(BaseQueryRunner):
             builtins["setattr"] = setattr
             builtins["_getitem_"] = self.custom_get_item
             builtins["_getiter_"] = self.custom_get_iter
-            builtins["_print_"] = self._custom_print
+            builtins["_print_"] = custom_print
 
             # Layer in our own additional set of builtins that we have
             # considered safe.
@@ -258,8 +260,8 @@ class Python(BaseQueryRunner):
             restricted_globals["execute_query"] = self.execute_query
             restricted_globals["add_result_column"] = self.add_result_column
             restricted_globals["add_result_row"] = self.add_result_row
-            restricted_globals["disable_print_log"] = self._custom_print.disable
-            restricted_globals["enable_print_log"] = self._custom_print.enable
+            restricted_globals["disable_print_log"] = custom_print.disable
+            restricted_globals["enable_print_log"] = custom_print.enable
 
             # Supported data types
             restricted_globals["TYPE_DATETIME"] = TYPE_DATETIME
@@ -274,10 +276,10 @@ class Python(BaseQueryRunner):
             #       One option is to use ETA with Celery + timeouts on workers
             #       And replacement of worker process every X requests handled.
 
-            exec((code), restricted_globals, self._script_locals)
+            exec((code), restricted_globals, script_locals)
 
-            result = self._script_locals['result']
-            result['log'] = self._custom_print.lines
+            result = script_locals['result']
+            result['log'] = custom_print.lines
             json_data = json_dumps(result)
         except KeyboardInterrupt:
             error = "Query cancelled by user."
@@ -11,7 +11,7 @@ from redash.permissions import has_access, not_view_only
 from redash.query_runner import (TYPE_BOOLEAN, TYPE_DATETIME, TYPE_FLOAT,
                                  TYPE_INTEGER, TYPE_STRING, BaseQueryRunner,
                                  register)
-from redash.utils import JSONEncoder
+from redash.utils import iter_row_values, json_dumps
 
 logger = logging.getLogger(__name__)
 
@@ -96,8 +96,7 @@ def create_table(connection, table_name, query_results):
         column_list=column_list,
         place_holders=','.join(['?'] * len(columns)))
 
-    for row in query_results['rows']:
-        values = [row.get(column) for column in columns]
+    for values in iter_row_values(query_results):
         connection.execute(insert_template, values)
 
 
@@ -151,7 +150,7 @@ class Results(BaseQueryRunner):
 
                 data = {'columns': columns, 'rows': rows}
                 error = None
-                json_data = json.dumps(data, cls=JSONEncoder)
+                json_data = json_dumps(data)
             else:
                 error = 'Query completed but it returned no data.'
                 json_data = None
@@ -8,9 +8,8 @@ except ImportError:
     enabled = False
 
 
-from redash.query_runner import BaseQueryRunner, register
+from redash.query_runner import BaseDBAPIQueryRunner, register
 from redash.query_runner import TYPE_STRING, TYPE_DATE, TYPE_DATETIME, TYPE_INTEGER, TYPE_FLOAT, TYPE_BOOLEAN
-from redash.utils import json_dumps
 
 TYPES_MAP = {
     0: TYPE_INTEGER,
@@ -23,9 +22,14 @@ TYPES_MAP = {
     13: TYPE_BOOLEAN
 }
 
+# Errors of failed or lost connections (ER_FAILED_TO_CONNECT_TO_DB,
+# ER_CONNECTION_IS_CLOSED and ER_FAILED_TO_REQUEST).
+CONNECTION_ERRORS = (250001, 250002, 250003)
 
-class Snowflake(BaseQueryRunner):
+
+class Snowflake(BaseDBAPIQueryRunner):
     noop_query = "SELECT 1"
+    types_map = TYPES_MAP
 
     @classmethod
     def configuration_schema(cls):
@@ -52,6 +56,11 @@ class Snowflake(BaseQueryRunner):
                     "title": "Toggle Table String",
                     "default": "_v",
                     "info": "This string will be used to toggle visibility of tables in the schema browser when editing a query in order to remove non-useful tables from sight."
+                },
+                "row_limit": {
+                    "type": "number",
+                    "title": "Maximum Rows",
+                    "info": "Stop fetching results after this many rows, and mark them as truncated."
                 }
             },
             "required": ["user", "password", "account", "database", "warehouse"],
@@ -62,32 +71,23 @@ class Snowflake(BaseQueryRunner):
     def enabled(cls):
         return enabled
 
-    def run_query(self, query, user):
-        connection = snowflake.connector.connect(
+    def _connect(self):
+        return snowflake.connector.connect(
             user=self.configuration['user'],
             password=self.configuration['password'],
             account=self.configuration['account'],
         )
 
-        cursor = connection.cursor()
-
-        try:
-            cursor.execute("USE WAREHOUSE {}".format(self.configuration['warehouse']))
-            cursor.execute("USE {}".format(self.configuration['database']))
-
-            cursor.execute(query)
-
-            columns = self.fetch_columns([(i[0], TYPES_MAP.get(i[1], None)) for i in cursor.description])
-            rows = [dict(zip((c['name'] for c in columns), row)) for row in cursor]
+    def is_connection_error(self, e):
+        # failed queries are (Programming or Operational) Errors too, so these are told
+        # apart by their number
+        return isinstance(e, snowflake.connector.Error) and e.errno in CONNECTION_ERRORS
 
-            data = {'columns': columns, 'rows': rows}
-            error = None
-            json_data = json_dumps(data)
-        finally:
-            cursor.close()
-            connection.close()
+    def _execute(self, cursor, query):
+        cursor.execute("USE WAREHOUSE {}".format(self.configuration['warehouse']))
+        cursor.execute("USE {}".format(self.configuration['database']))
 
-        return json_data, error
+        cursor.execute(query)
 
     def get_schema(self, get_stats=False):
         query = """
@@ -6,7 +6,7 @@ import sys
 from redash.query_runner import BaseSQLQueryRunner
 from redash.query_runner import register
 
-from redash.utils import JSONEncoder
+from redash.utils import json_dumps
 
 logger = logging.getLogger(__name__)
 
@@ -86,7 +86,7 @@ class Sqlite(BaseSQLQueryRunner):
 
                 data = {'columns': columns, 'rows': rows}
                 error = None
-                json_data = json.dumps(data, cls=JSONEncoder)
+                json_data = json_dumps(data)
             else:
                 error = 'Query completed but it returned no data.'
                 json_data = None
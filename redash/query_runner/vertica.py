@@ -1,8 +1,6 @@
-import sys
 import json
 import logging
 
-from redash.utils import JSONEncoder
 from redash.query_runner import *
 
 logger = logging.getLogger(__name__)
@@ -28,8 +26,9 @@ types_map = {
 }
 
 
-class Vertica(BaseSQLQueryRunner):
+class Vertica(BaseDBAPIQueryRunner):
     noop_query = "SELECT 1"
+    types_map = types_map
     default_doc_url = (
         "https://my.vertica.com/docs/8.0.x/HTML/index.htm#Authoring/"
         "ConceptsGuide/Other/SQLOverview.htm%3FTocPath%3DSQL"
@@ -71,6 +70,11 @@ class Vertica(BaseSQLQueryRunner):
                     "title": "Toggle Table String",
                     "default": "_v",
                     "info": "This string will be used to toggle visibility of tables in the schema browser when editing a query in order to remove non-useful tables from sight."
+                },
+                "row_limit": {
+                    "type": "number",
+                    "title": "Maximum Rows",
+                    "info": "Stop fetching results after this many rows, and mark them as truncated."
                 }
             },
             'required': ['database'],
@@ -113,55 +117,31 @@ class Vertica(BaseSQLQueryRunner):
 
         return schema.values()
 
-    def run_query(self, query, user):
+    def _connect(self):
+        import vertica_python
+
+        conn_info = {
+            'host': self.configuration.get('host', ''),
+            'port': self.configuration.get('port', 5433),
+            'user': self.configuration.get('user', ''),
+            'password': self.configuration.get('password', ''),
+            'database': self.configuration.get('database', ''),
+            'read_timeout': self.configuration.get('read_timeout', 600)
+        }
+        return vertica_python.connect(**conn_info)
+
+    def is_connection_error(self, e):
         import vertica_python
 
+        # failed queries are QueryErrors
+        return isinstance(e, vertica_python.errors.ConnectionError)
+
+    def run_query_with_row_count(self, query, user, positional_rows=False):
         if query == "":
             json_data = None
             error = "Query is empty"
-            return json_data, error
-
-        connection = None
-        try:
-            conn_info = {
-                'host': self.configuration.get('host', ''),
-                'port': self.configuration.get('port', 5433),
-                'user': self.configuration.get('user', ''),
-                'password': self.configuration.get('password', ''),
-                'database': self.configuration.get('database', ''),
-                'read_timeout': self.configuration.get('read_timeout', 600)
-            }
-            connection = vertica_python.connect(**conn_info)
-            cursor = connection.cursor()
-            logger.debug("Vetica running query: %s", query)
-            cursor.execute(query)
-
-            # TODO - very similar to pg.py
-            if cursor.description is not None:
-                columns_data = [(i[0], i[1]) for i in cursor.description]
-
-                rows = [dict(zip((c[0] for c in columns_data), row)) for row in cursor.fetchall()]
-                columns = [{'name': col[0],
-                            'friendly_name': col[0],
-                            'type': types_map.get(col[1], None)} for col in columns_data]
-
-                data = {'columns': columns, 'rows': rows}
-                json_data = json.dumps(data, cls=JSONEncoder)
-                error = None
-            else:
-                json_data = None
-                error = "No data was returned."
-
-            cursor.close()
-        except KeyboardInterrupt:
-            error = "Query cancelled by user."
-            json_data = None
-        except Exception as e:
-            raise sys.exc_info()[1], None, sys.exc_info()[2]
-        finally:
-            if connection:
-                connection.close()
+            return json_data, error, None
 
-        return json_data, error
+        return super(Vertica, self).run_query_with_row_count(query, user, positional_rows)
 
 register(Vertica)
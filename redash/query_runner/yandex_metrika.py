@@ -1,8 +1,7 @@
-import json
 import yaml
 import logging
 from redash.query_runner import *
-from redash.utils import JSONEncoder
+from redash.utils import json_dumps
 import requests
 from urlparse import parse_qs, urlparse
 logger = logging.getLogger(__name__)
@@ -139,7 +138,7 @@ class YandexMetrika(BaseSQLQueryRunner):
             return data, error
 
         try:
-            data = json.dumps(parse_ym_response(self._send_query(**params)), cls=JSONEncoder)
+            data = json_dumps(parse_ym_response(self._send_query(**params)))
             error = None
         except Exception as e:
             logging.exception(e)
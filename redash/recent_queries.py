@@ -0,0 +1,158 @@
+"""
+Per user "recent queries", kept in Redis sorted sets scored by decayed activity.
+
+An event weighs 2 ** ((timestamp - EPOCH) / RECENT_QUERIES_HALF_LIFE), so it
+counts twice as much as one that happened a half life earlier, without ever
+having to rescore the existing entries. The sets hold the log2 of the summed
+weights, as the weights themselves soon overflow a float.
+"""
+import calendar
+import logging
+
+from redash import redis_connection, settings
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ('edit', 'execute', 'edit_name', 'edit_description', 'view_source', 'view')
+# Reference time of the scores (2018-01-01 UTC).
+EPOCH = 1514764800
+# Number of queries kept per user.
+MAX_SIZE = 100
+# Users without any activity for this long lose their set.
+EXPIRE = 90 * 24 * 3600
+
+BACKFILL_KEY = 'recent_queries:backfill'
+
+# Adds 2 ** ARGV[2] to the (log2) score of member ARGV[1] of the KEYS[1] set.
+_add_weight = redis_connection.register_script("""
+local score = tonumber(ARGV[2])
+local current = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if current then
+    current = tonumber(current)
+    local high = math.max(current, score)
+    score = high + math.log(1 + 2 ^ (math.min(current, score) - high)) / math.log(2)
+end
+redis.call('ZADD', KEYS[1], score, ARGV[1])
+""")
+
+# Whether the id of the last event recorded before tracking started is set.
+_tracking_started = False
+
+
+def _key(user_id):
+    return 'recent_queries:user:{}'.format(user_id)
+
+
+def _score(created_at):
+    timestamp = calendar.timegm(created_at.utctimetuple())
+    return (timestamp - EPOCH) / float(settings.RECENT_QUERIES_HALF_LIFE)
+
+
+def start_tracking():
+    """
+    Remembers the last event recorded before recent queries were tracked, so
+    backfill() skips the events that are tracked as they come in. Should be
+    called before the new events are flushed. Errors are logged and not raised.
+    """
+    global _tracking_started
+    if _tracking_started:
+        return
+
+    try:
+        if not redis_connection.hexists(BACKFILL_KEY, 'until_id'):
+            from redash.models import Event, db
+            with db.session.no_autoflush:
+                until_id = db.session.query(db.func.max(Event.id)).scalar() or 0
+            redis_connection.hsetnx(BACKFILL_KEY, 'until_id', until_id)
+    except Exception:
+        logger.exception("Failed starting to track recent queries.")
+        return
+
+    _tracking_started = True
+
+
+def _record(events):
+    pipe = redis_connection.pipeline(transaction=False)
+    user_ids = set()
+
+    for event in events:
+        if event['object_type'] != 'query' or event['action'] not in ACTIONS or not event['user_id']:
+            continue
+
+        try:
+            query_id = int(event['object_id'])
+        except (TypeError, ValueError):
+            continue
+
+        _add_weight(keys=[_key(event['user_id'])], args=[query_id, _score(event['created_at'])], client=pipe)
+        user_ids.add(event['user_id'])
+
+    if not user_ids:
+        return
+
+    for user_id in user_ids:
+        pipe.zremrangebyrank(_key(user_id), 0, -(MAX_SIZE + 1))
+        pipe.expire(_key(user_id), EXPIRE)
+
+    pipe.execute()
+
+
+def record_events(events):
+    """
+    Updates the recent queries of the users of `events`, which are dicts with the
+    Event columns. Events that aren't query activity of a user are skipped.
+
+    Should be called once the events are committed, so the events of a batch
+    that fails (and is retried) aren't counted twice. Errors are logged and not
+    raised.
+    """
+    try:
+        start_tracking()
+        _record(events)
+    except Exception:
+        logger.exception("Failed updating recent queries.")
+
+
+def get(user_id, limit=10):
+    """
+    Returns the ids of the user's most active queries, most active first.
+    """
+    return [int(query_id) for query_id in redis_connection.zrevrange(_key(user_id), 0, limit - 1)]
+
+
+def backfill(batch_size=1000):
+    """
+    Adds the events recorded before recent queries were tracked, in batches of
+    `batch_size`. The progress is kept in Redis, so it can be interrupted and
+    resumed. Returns the number of processed events.
+    """
+    from redash.models import Event, db
+
+    if not redis_connection.hexists(BACKFILL_KEY, 'until_id'):
+        # No events were recorded since recent queries are tracked.
+        redis_connection.hsetnx(BACKFILL_KEY, 'until_id', db.session.query(db.func.max(Event.id)).scalar() or 0)
+
+    state = redis_connection.hgetall(BACKFILL_KEY)
+    last_id = int(state.get('last_id', 0))
+    until_id = int(state['until_id'])
+    processed = 0
+
+    while last_id < until_id:
+        events = (Event.query
+                  .filter(Event.id > last_id, Event.id <= until_id,
+                          Event.object_type == 'query', Event.action.in_(ACTIONS))
+                  .order_by(Event.id)
+                  .limit(batch_size)
+                  .all())
+
+        if not events:
+            last_id = until_id
+        else:
+            _record([{'user_id': e.user_id, 'object_type': e.object_type, 'object_id': e.object_id,
+                      'action': e.action, 'created_at': e.created_at} for e in events])
+            last_id = events[-1].id
+            processed += len(events)
+
+        redis_connection.hset(BACKFILL_KEY, 'last_id', last_id)
+
+    return processed
@@ -0,0 +1,202 @@
+"""
+Storage for the data of large query results, outside of the database.
+
+Data larger than RESULT_STORAGE_THRESHOLD bytes is written to the storage set
+with RESULT_STORAGE, under a new key, when its QueryResult is flushed, and the
+QueryResult only keeps the key (see QueryResult.data). Stored data is never
+modified, only deleted once the deletion of its result is committed, or when
+the insert of its result is rolled back.
+"""
+import errno
+import logging
+import os
+import uuid
+
+from redash import settings
+
+try:
+    import boto3
+    enabled_s3 = True
+except ImportError:
+    enabled_s3 = False
+
+logger = logging.getLogger(__name__)
+
+
+class BaseResultStorage(object):
+    def put(self, key, data):
+        raise NotImplementedError()
+
+    def get(self, key):
+        raise NotImplementedError()
+
+    def delete(self, key):
+        raise NotImplementedError()
+
+
+class FileSystemResultStorage(BaseResultStorage):
+    def __init__(self, path):
+        self.path = path
+
+    def _path(self, key):
+        # spread the files over subdirectories, to keep directories small
+        return os.path.join(self.path, key[:2], key)
+
+    def put(self, key, data):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path))
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        # written under a temporary name first, so readers never see partial files
+        temp_path = '{}.{}.tmp'.format(path, uuid.uuid4().hex)
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.rename(temp_path, path)
+
+    def get(self, key):
+        with open(self._path(key), 'rb') as f:
+            return f.read()
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+
+class S3ResultStorage(BaseResultStorage):
+    """
+    Stores data in an S3 bucket, or in any S3 compatible store (like MinIO)
+    with `endpoint_url`.
+    """
+    def __init__(self, bucket, prefix='', endpoint_url=None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client('s3', endpoint_url=endpoint_url)
+
+    def put(self, key, data):
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+
+    def get(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)['Body'].read()
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+
+class CachedResultStorage(BaseResultStorage):
+    """
+    Keeps a copy of the data read from `storage` in a local directory, up to
+    `max_size` bytes. The least recently read data is removed first.
+    """
+    def __init__(self, storage, path, max_size):
+        self.storage = storage
+        self.cache = FileSystemResultStorage(path)
+        self.max_size = max_size
+
+    def put(self, key, data):
+        self.storage.put(key, data)
+
+    def get(self, key):
+        try:
+            data = self.cache.get(key)
+            os.utime(self.cache._path(key), None)
+            return data
+        except (IOError, OSError):
+            pass
+
+        data = self.storage.get(key)
+        try:
+            self.cache.put(key, data)
+            self._evict()
+        except (IOError, OSError):
+            logger.warning("Failed caching result data %s.", key, exc_info=1)
+
+        return data
+
+    def delete(self, key):
+        self.storage.delete(key)
+        self.cache.delete(key)
+
+    def _evict(self):
+        files = []
+        for directory, _, names in os.walk(self.cache.path):
+            for name in names:
+                path = os.path.join(directory, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(f[1] for f in files)
+        for _, file_size, path in sorted(files):
+            if size <= self.max_size:
+                break
+            os.remove(path)
+            size -= file_size
+
+
+def create_storage():
+    if settings.RESULT_STORAGE == 'filesystem':
+        storage = FileSystemResultStorage(settings.RESULT_STORAGE_PATH)
+    elif settings.RESULT_STORAGE == 's3':
+        storage = S3ResultStorage(settings.RESULT_STORAGE_S3_BUCKET,
+                                  settings.RESULT_STORAGE_S3_PREFIX,
+                                  settings.RESULT_STORAGE_S3_ENDPOINT_URL)
+    else:
+        return None
+
+    if settings.RESULT_STORAGE_CACHE_PATH:
+        storage = CachedResultStorage(storage, settings.RESULT_STORAGE_CACHE_PATH,
+                                      settings.RESULT_STORAGE_CACHE_MAX_SIZE)
+
+    return storage
+
+
+_storage = None
+
+
+def get_storage():
+    """
+    Returns the storage set with RESULT_STORAGE, or None when data is kept in
+    the database.
+    """
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+    return _storage
+
+
+def store(data):
+    """
+    Writes `data` to the storage when it's over the size threshold. Returns
+    its key, or None if it should be kept in the database.
+    """
+    storage = get_storage()
+    if storage is None or not isinstance(data, basestring):
+        return None
+
+    if isinstance(data, unicode):
+        data = data.encode('utf-8')
+
+    if len(data) < settings.RESULT_STORAGE_THRESHOLD:
+        return None
+
+    key = uuid.uuid4().hex
+    storage.put(key, data)
+    return key
+
+
+def load(key):
+    return get_storage().get(key).decode('utf-8')
+
+
+def delete(keys):
+    storage = get_storage()
+    for key in keys:
+        try:
+            storage.delete(key)
+        except Exception:
+            logger.warning("Failed deleting result data %s.", key, exc_info=1)
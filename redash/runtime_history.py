@@ -0,0 +1,74 @@
+"""
+Runtimes and row counts of the latest executions of queries.
+
+They're kept in capped Redis lists per query text (hash) and data source, and
+per query id when known, which still matches after parameter changes.
+"""
+from redash import redis_connection
+
+# Number of executions kept per query.
+SIZE = 50
+# Queries that didn't run for this long lose their history.
+EXPIRE = 30 * 24 * 3600
+
+
+def _keys(data_source_id, query_hash, query_id=None):
+    keys = ['runtime_history:{}:{}'.format(data_source_id, query_hash)]
+    if isinstance(query_id, (int, long)):
+        keys.append('runtime_history:query:{}'.format(query_id))
+
+    return keys
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100.0))]
+
+
+def record(data_source_id, query_hash, query_id, run_time, row_count):
+    value = '{:.3f}:{}'.format(run_time, '' if row_count is None else row_count)
+
+    pipe = redis_connection.pipeline(transaction=False)
+    for key in _keys(data_source_id, query_hash, query_id):
+        pipe.lpush(key, value)
+        pipe.ltrim(key, 0, SIZE - 1)
+        pipe.expire(key, EXPIRE)
+    pipe.execute()
+
+
+def get(data_source_id, query_hash, query_id=None):
+    """
+    Returns percentiles of the runtimes and row counts of the query's latest
+    executions, or None if it has no history.
+    """
+    runs = []
+    for key in _keys(data_source_id, query_hash, query_id):
+        runs = redis_connection.lrange(key, 0, -1)
+        if runs:
+            break
+
+    if not runs:
+        return None
+
+    runtimes = []
+    row_counts = []
+    for run in runs:
+        run_time, row_count = run.split(':')
+        runtimes.append(float(run_time))
+        if row_count:
+            row_counts.append(int(row_count))
+
+    stats = {
+        'runs': len(runs),
+        'runtime_p50': _percentile(runtimes, 50),
+        'runtime_p90': _percentile(runtimes, 90),
+        'runtime_max': max(runtimes),
+    }
+
+    if row_counts:
+        stats.update({
+            'rows_p50': _percentile(row_counts, 50),
+            'rows_p90': _percentile(row_counts, 90),
+        })
+
+    return stats
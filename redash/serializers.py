@@ -7,6 +7,7 @@ separation of concerns.
 import json
 from funcy import project
 from flask_login import current_user
+from sqlalchemy.orm import load_only
 from redash import models
 from redash.permissions import has_access, view_only
 from redash.handlers.query_results import run_query_sync
@@ -81,16 +82,67 @@ class QuerySerializer(Serializer):
             if self.options.get('with_favorite_state', True):
                 result['is_favorite'] = models.Favorite.is_favorite(current_user.id, self.object_or_list)
         else:
-            result = [serialize_query(query, **self.options) for query in self.object_or_list]
+            queries = list(self.object_or_list)
+            users = self._load_users(queries)
+            query_results = self._load_query_results(queries)
+            result = [serialize_query(query, users=users, query_results=query_results, **self.options)
+                      for query in queries]
             if self.options.get('with_favorite_state', True):
-                favorite_ids = models.Favorite.are_favorites(current_user.id, self.object_or_list)
+                favorite_ids = models.Favorite.are_favorites(current_user.id, queries)
                 for query in result:
                     query['is_favorite'] = query['id'] in favorite_ids
-  
+
         return result
 
+    def _load_users(self, queries):
+        user_ids = set()
+        if self.options.get('with_user', True):
+            user_ids.update(query.user_id for query in queries)
+        if self.options.get('with_last_modified_by', True):
+            user_ids.update(query.last_modified_by_id for query in queries)
+        user_ids.discard(None)
+
+        if not user_ids:
+            return {}
+
+        return serialize_users(models.User.query.filter(models.User.id.in_(user_ids)))
+
+    def _load_query_results(self, queries):
+        if not self.options.get('with_stats', False):
+            return None
+
+        query_result_ids = set(query.latest_query_data_id for query in queries)
+        query_result_ids.discard(None)
+
+        if not query_result_ids:
+            return {}
+
+        query_results = (models.QueryResult.query
+                         .options(load_only('id', 'retrieved_at', 'runtime'))
+                         .filter(models.QueryResult.id.in_(query_result_ids)))
+
+        return {query_result.id: query_result for query_result in query_results}
 
-def serialize_query(query, with_stats=False, with_visualizations=False, with_user=True, with_last_modified_by=True):
+
+def serialize_users(users):
+    """
+    Serializes the given users into a {user_id: user} map, loading the last
+    activity of all of them with a single query.
+    """
+    users = {user.id: user for user in users if user is not None}
+    last_active_at = models.User.last_active_at_map(users.keys())
+
+    result = {}
+    for user_id, user in users.iteritems():
+        d = user.to_dict(with_last_active_at=False)
+        d['last_active_at'] = last_active_at.get(user_id)
+        result[user_id] = d
+
+    return result
+
+
+def serialize_query(query, with_stats=False, with_visualizations=False, with_user=True, with_last_modified_by=True,
+                    users=None, query_results=None):
     d = {
         'id': query.id,
         'latest_query_data_id': query.latest_query_data_id,
@@ -100,6 +152,7 @@ def serialize_query(query, with_stats=False, with_visualizations=False, with_use
         'query_hash': query.query_hash,
         'schedule': query.schedule,
         'schedule_until': query.schedule_until,
+        'schedule_suspended_at': query.schedule_suspended_at,
         'schedule_resultset_size': query.schedule_resultset_size,
         'api_key': query.api_key,
         'is_archived': query.is_archived,
@@ -112,20 +165,30 @@ def serialize_query(query, with_stats=False, with_visualizations=False, with_use
         'tags': query.tags or [],
     }
 
+    # users is an optional map of already serialized users (see serialize_users)
     if with_user:
-        d['user'] = query.user.to_dict()
+        d['user'] = users[query.user_id] if users is not None else query.user.to_dict()
     else:
         d['user_id'] = query.user_id
 
     if with_last_modified_by:
-        d['last_modified_by'] = query.last_modified_by.to_dict() if query.last_modified_by is not None else None
+        if users is not None:
+            d['last_modified_by'] = users.get(query.last_modified_by_id)
+        else:
+            d['last_modified_by'] = query.last_modified_by.to_dict() if query.last_modified_by is not None else None
     else:
         d['last_modified_by_id'] = query.last_modified_by_id
 
+    # query_results is an optional map of preloaded latest query results' metadata
     if with_stats:
-        if query.latest_query_data is not None:
-            d['retrieved_at'] = query.retrieved_at
-            d['runtime'] = query.runtime
+        if query_results is not None:
+            latest_query_data = query_results.get(query.latest_query_data_id)
+        else:
+            latest_query_data = query.latest_query_data
+
+        if latest_query_data is not None:
+            d['retrieved_at'] = latest_query_data.retrieved_at
+            d['runtime'] = latest_query_data.runtime
         else:
             d['retrieved_at'] = None
             d['runtime'] = None
@@ -137,7 +200,7 @@ def serialize_query(query, with_stats=False, with_visualizations=False, with_use
     return d
 
 
-def serialize_visualization(object, with_query=True):
+def serialize_visualization(object, with_query=True, users=None):
     d = {
         'id': object.id,
         'type': object.type,
@@ -149,12 +212,12 @@ def serialize_visualization(object, with_query=True):
     }
 
     if with_query:
-        d['query'] = serialize_query(object.query_rel)
+        d['query'] = serialize_query(object.query_rel, users=users)
 
     return d
 
 
-def serialize_widget(object):
+def serialize_widget(object, users=None):
     d = {
         'id': object.id,
         'width': object.width,
@@ -166,7 +229,7 @@ def serialize_widget(object):
     }
 
     if object.visualization and object.visualization.id:
-        d['visualization'] = serialize_visualization(object.visualization)
+        d['visualization'] = serialize_visualization(object.visualization, users=users)
 
     return d
 
@@ -198,26 +261,38 @@ def serialize_dashboard(obj, with_widgets=False, user=None, with_favorite_state=
     widgets = []
 
     if with_widgets:
-        for w in obj.widgets:
+        # Widgets, visualizations, queries and users are loaded upfront to avoid
+        # running a few queries for every widget.
+        widget_list = models.Widget.all_for_dashboard(obj).all()
+        queries = [w.visualization.query_rel for w in widget_list if w.visualization_id is not None]
+        users = serialize_users([obj.user] +
+                                [q.user for q in queries] +
+                                [q.last_modified_by for q in queries])
+        groups = models.DataSource.groups_map(set(q.data_source_id for q in queries))
+        # The access check only depends on the data source, so it's done once per data source.
+        accessible_data_sources = set(data_source_id for data_source_id, data_source_groups in groups.iteritems()
+                                      if user and has_access(data_source_groups, user, view_only))
+
+        for w in widget_list:
             if w.visualization_id is None:
-                widgets.append(serialize_widget(w))
-            elif user and has_access(w.visualization.query_rel.groups, user, view_only):
-                widgets.append(serialize_widget(w))
+                widgets.append(serialize_widget(w, users=users))
+            elif w.visualization.query_rel.data_source_id in accessible_data_sources:
+                widgets.append(serialize_widget(w, users=users))
             else:
-                widget = project(serialize_widget(w),
+                widget = project(serialize_widget(w, users=users),
                                 ('id', 'width', 'dashboard_id', 'options', 'created_at', 'updated_at'))
                 widget['restricted'] = True
                 widgets.append(widget)
     else:
         widgets = None
+        users = serialize_users([obj.user])
 
     d = {
         'id': obj.id,
         'slug': obj.slug,
         'name': obj.name,
         'user_id': obj.user_id,
-        # TODO: we should properly load the users
-        'user': obj.user.to_dict(),
+        'user': users[obj.user_id],
         'layout': layout,
         'dashboard_filters_enabled': obj.dashboard_filters_enabled,
         'widgets': widgets,
@@ -47,6 +47,79 @@ QUERY_RESULTS_CLEANUP_MAX_AGE = int(os.environ.get("REDASH_QUERY_RESULTS_CLEANUP
 
 SCHEMAS_REFRESH_SCHEDULE = int(os.environ.get("REDASH_SCHEMAS_REFRESH_SCHEDULE", 30))
 
+# Scheduled runs of each query are shifted by a fixed, per query offset of up to
+# SCHEDULE_JITTER seconds, so queries with the same schedule don't all run at once.
+SCHEDULE_JITTER = int(os.environ.get("REDASH_SCHEDULE_JITTER", 0))
+# When set, due scheduled queries may be delayed by up to SCHEDULE_SPREAD_WINDOW
+# seconds to keep the number of scheduled queries expected to run concurrently
+# on each data source (based on their last runtimes) under SCHEDULE_TARGET_CONCURRENCY.
+SCHEDULE_SPREAD_WINDOW = int(os.environ.get("REDASH_SCHEDULE_SPREAD_WINDOW", 0))
+SCHEDULE_TARGET_CONCURRENCY = int(os.environ.get("REDASH_SCHEDULE_TARGET_CONCURRENCY", 4))
+
+# Queries whose 90th percentile runtime (over their recent executions) is at
+# least SLOW_QUERY_THRESHOLD seconds are sent to a separate queue, named after
+# the data source's queue by SLOW_QUERY_QUEUE. Workers have to consume these
+# queues too. 0 disables it.
+SLOW_QUERY_THRESHOLD = int(os.environ.get("REDASH_SLOW_QUERY_THRESHOLD", 0))
+SLOW_QUERY_QUEUE = os.environ.get("REDASH_SLOW_QUERY_QUEUE", "{queue}_slow")
+
+# Pause data sources after CIRCUIT_BREAKER_THRESHOLD consecutive query executions
+# failed to connect, and resume them once a connection test succeeds. Tests are
+# CIRCUIT_BREAKER_PROBE_INTERVAL seconds apart, doubling after each failure up to
+# CIRCUIT_BREAKER_MAX_PROBE_INTERVAL. 0 disables it.
+CIRCUIT_BREAKER_THRESHOLD = int(os.environ.get("REDASH_CIRCUIT_BREAKER_THRESHOLD", 0))
+CIRCUIT_BREAKER_PROBE_INTERVAL = int(os.environ.get("REDASH_CIRCUIT_BREAKER_PROBE_INTERVAL", 60))
+CIRCUIT_BREAKER_MAX_PROBE_INTERVAL = int(os.environ.get("REDASH_CIRCUIT_BREAKER_MAX_PROBE_INTERVAL", 3600))
+
+# Data sources with the "connection_pooling" option keep up to CONNECTION_POOL_MAX_SIZE
+# idle connections per worker process, for up to CONNECTION_POOL_MAX_IDLE_TIME seconds.
+# Connections idle for more than CONNECTION_POOL_PING_AFTER seconds are checked before reuse.
+CONNECTION_POOL_MAX_SIZE = int(os.environ.get("REDASH_CONNECTION_POOL_MAX_SIZE", 2))
+CONNECTION_POOL_MAX_IDLE_TIME = int(os.environ.get("REDASH_CONNECTION_POOL_MAX_IDLE_TIME", 300))
+CONNECTION_POOL_PING_AFTER = int(os.environ.get("REDASH_CONNECTION_POOL_PING_AFTER", 30))
+
+# Number of rows fetched (and encoded) at a time by query runners that stream their results.
+QUERY_RESULTS_FETCH_SIZE = int(os.environ.get("REDASH_QUERY_RESULTS_FETCH_SIZE", 10000))
+
+# Store the rows of query results as lists of values (in the order of the columns) instead of dicts,
+# for the query runners that support it. The API still returns dicts unless asked for ?row_format=positional.
+QUERY_RESULTS_POSITIONAL_ROWS = parse_boolean(os.environ.get("REDASH_QUERY_RESULTS_POSITIONAL_ROWS", "false"))
+
+# Library used to decode query results (and API responses): "json" or "ujson".
+# Falls back to json when it isn't installed. See bin/benchmark_json_codecs.py to compare them.
+JSON_CODEC = os.environ.get("REDASH_JSON_CODEC", "json")
+
+# When set, query results are stored by a separate task sent to this queue, so workers executing queries
+# can take the next one as soon as the data source returns the data. Workers have to consume this queue too.
+QUERY_RESULTS_QUEUE = os.environ.get("REDASH_QUERY_RESULTS_QUEUE", "")
+# The data is staged in Redis until it's stored. Results larger than this (in characters of JSON) are
+# stored by the workers executing the queries instead, to bound the Redis memory they take.
+QUERY_RESULTS_STAGING_MAX_SIZE = int(os.environ.get("REDASH_QUERY_RESULTS_STAGING_MAX_SIZE", 10 * 1024 * 1024))
+
+# Where to keep the data of query results larger than RESULT_STORAGE_THRESHOLD bytes, instead of the database:
+# "filesystem" (under RESULT_STORAGE_PATH, which has to be shared by all servers and workers) or "s3" (requires boto3).
+# Empty keeps all results in the database.
+RESULT_STORAGE = os.environ.get("REDASH_RESULT_STORAGE", "")
+RESULT_STORAGE_THRESHOLD = int(os.environ.get("REDASH_RESULT_STORAGE_THRESHOLD", 1024 * 1024))
+RESULT_STORAGE_PATH = os.environ.get("REDASH_RESULT_STORAGE_PATH", "/var/lib/redash/results")
+RESULT_STORAGE_S3_BUCKET = os.environ.get("REDASH_RESULT_STORAGE_S3_BUCKET", "")
+RESULT_STORAGE_S3_PREFIX = os.environ.get("REDASH_RESULT_STORAGE_S3_PREFIX", "query_results/")
+# For S3 compatible stores (like MinIO). The credentials are read by boto3 (e.g. from AWS_ACCESS_KEY_ID).
+RESULT_STORAGE_S3_ENDPOINT_URL = os.environ.get("REDASH_RESULT_STORAGE_S3_ENDPOINT_URL", None)
+# Keeps a local copy of the data read from the result storage, up to RESULT_STORAGE_CACHE_MAX_SIZE bytes.
+RESULT_STORAGE_CACHE_PATH = os.environ.get("REDASH_RESULT_STORAGE_CACHE_PATH", "")
+RESULT_STORAGE_CACHE_MAX_SIZE = int(os.environ.get("REDASH_RESULT_STORAGE_CACHE_MAX_SIZE", 1024 * 1024 * 1024))
+
+# Cache the groups of each data source (used for permission checks) in Redis, across requests.
+DATA_SOURCE_GROUPS_CACHE_ENABLED = parse_boolean(os.environ.get("REDASH_DATA_SOURCE_GROUPS_CACHE_ENABLED", "false"))
+DATA_SOURCE_GROUPS_CACHE_TTL = int(os.environ.get("REDASH_DATA_SOURCE_GROUPS_CACHE_TTL", 3600))
+
+# Cache the organization, user and API key lookups done by authentication on every request.
+# Changes are visible to other processes after up to AUTH_CACHE_LOCAL_TTL seconds.
+AUTH_CACHE_ENABLED = parse_boolean(os.environ.get("REDASH_AUTH_CACHE_ENABLED", "false"))
+AUTH_CACHE_TTL = int(os.environ.get("REDASH_AUTH_CACHE_TTL", 60))
+AUTH_CACHE_LOCAL_TTL = int(os.environ.get("REDASH_AUTH_CACHE_LOCAL_TTL", 5))
+
 AUTH_TYPE = os.environ.get("REDASH_AUTH_TYPE", "api_key")
 ENFORCE_HTTPS = parse_boolean(os.environ.get("REDASH_ENFORCE_HTTPS", "false"))
 INVITATION_TOKEN_MAX_AGE = int(os.environ.get("REDASH_INVITATION_TOKEN_MAX_AGE", 60 * 60 * 24 * 7))
@@ -215,6 +288,30 @@ DESTINATIONS = distinct(enabled_destinations + additional_destinations)
 
 EVENT_REPORTING_WEBHOOKS = array_from_string(os.environ.get("REDASH_EVENT_REPORTING_WEBHOOKS", ""))
 
+# Buffer events in Redis and insert them in batches every EVENTS_FLUSH_INTERVAL seconds, instead of
+# running a Celery task per event. Webhooks receive the events of each batch as an array.
+EVENTS_BUFFER_ENABLED = parse_boolean(os.environ.get("REDASH_EVENTS_BUFFER_ENABLED", "false"))
+EVENTS_FLUSH_INTERVAL = int(os.environ.get("REDASH_EVENTS_FLUSH_INTERVAL", 10))
+EVENTS_FLUSH_BATCH_SIZE = int(os.environ.get("REDASH_EVENTS_FLUSH_BATCH_SIZE", 1000))
+
+# The daily rollups recount the last EVENTS_ROLLUP_DAYS days each time, so events that arrive late
+# (buffered or retried) are still counted.
+EVENTS_ROLLUP_DAYS = int(os.environ.get("REDASH_EVENTS_ROLLUP_DAYS", "3"))
+
+# Delete events older than EVENTS_CLEANUP_MAX_AGE days (once they're counted in the daily rollups),
+# at most EVENTS_CLEANUP_COUNT per run.
+EVENTS_CLEANUP_ENABLED = parse_boolean(os.environ.get("REDASH_EVENTS_CLEANUP_ENABLED", "false"))
+EVENTS_CLEANUP_COUNT = int(os.environ.get("REDASH_EVENTS_CLEANUP_COUNT", "10000"))
+EVENTS_CLEANUP_MAX_AGE = int(os.environ.get("REDASH_EVENTS_CLEANUP_MAX_AGE", "365"))
+
+# Search returns at most SEARCH_RESULTS_LIMIT results, and caches each user's results for
+# SEARCH_CACHE_TTL seconds (0 disables the cache).
+SEARCH_RESULTS_LIMIT = int(os.environ.get("REDASH_SEARCH_RESULTS_LIMIT", 1000))
+SEARCH_CACHE_TTL = int(os.environ.get("REDASH_SEARCH_CACHE_TTL", 30))
+
+# Activity on a query counts half as much in the user's recent queries after this many seconds.
+RECENT_QUERIES_HALF_LIFE = int(os.environ.get("REDASH_RECENT_QUERIES_HALF_LIFE", 7 * 24 * 3600))
+
 # Support for Sentry (http://getsentry.com/). Just set your Sentry DSN to enable it:
 SENTRY_DSN = os.environ.get("REDASH_SENTRY_DSN", "")
 
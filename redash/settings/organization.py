@@ -17,11 +17,16 @@ SAML_LOGIN_ENABLED = SAML_METADATA_URL != ""
 
 DATE_FORMAT = os.environ.get("REDASH_DATE_FORMAT", "DD/MM/YY")
 
+# Scheduled queries that weren't viewed (directly or on a dashboard) for this
+# many days stop refreshing until viewed again. 0 disables it.
+SUSPEND_IDLE_QUERIES_AFTER = int(os.environ.get("REDASH_SUSPEND_IDLE_QUERIES_AFTER", 0))
+
 settings = {
     "auth_password_login_enabled": PASSWORD_LOGIN_ENABLED,
     "auth_saml_enabled": SAML_LOGIN_ENABLED,
     "auth_saml_entity_id": SAML_ENTITY_ID,
     "auth_saml_metadata_url": SAML_METADATA_URL,
     "auth_saml_nameid_format": SAML_NAMEID_FORMAT,
-    "date_format": DATE_FORMAT
+    "date_format": DATE_FORMAT,
+    "suspend_idle_queries_after": SUSPEND_IDLE_QUERIES_AFTER
 }
@@ -1,3 +1,5 @@
-from .general import record_event, version_check, send_mail
-from .queries import QueryTask, refresh_queries, refresh_schemas, cleanup_tasks, cleanup_query_results, execute_query
+from .general import (record_event, enqueue_event, flush_events, rollup_events, cleanup_events,
+                      version_check, send_mail)
+from .queries import (QueryTask, refresh_queries, refresh_schemas, cleanup_tasks, cleanup_query_results, execute_query,
+                      sync_last_access, suspend_idle_queries, probe_circuit_breakers)
 from .alerts import check_alerts_for_query
\ No newline at end of file
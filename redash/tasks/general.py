@@ -1,33 +1,137 @@
+import json
+
 import requests
 
 from celery.utils.log import get_task_logger
 from flask_mail import Message
-from redash import mail, models, settings
+from sqlalchemy.exc import OperationalError
+from redash import mail, models, redis_connection, settings
+from redash.utils import json_dumps
 from redash.version_check import run_version_check
 from redash.worker import celery
 
 logger = get_task_logger(__name__)
 
+EVENTS_BUFFER_KEY = 'events:buffer'
+EVENTS_DEAD_LETTER_KEY = 'events:dead_letter'
+EVENTS_FLUSH_LOCK_KEY = 'events:flush_lock'
+EVENTS_FLUSH_LOCK_TIMEOUT = 600
 
-@celery.task(name="redash.tasks.record_event")
-def record_event(raw_event):
-    event = models.Event.record(raw_event)
-    models.db.session.commit()
 
+def forward_to_webhooks(schema, data):
     for hook in settings.EVENT_REPORTING_WEBHOOKS:
         logger.debug("Forwarding event to: %s", hook)
         try:
-            data = {
-                "schema": "iglu:io.redash.webhooks/event/jsonschema/1-0-0",
-                "data": event.to_dict()
+            payload = {
+                "schema": schema,
+                "data": data
             }
-            response = requests.post(hook, json=data)
+            response = requests.post(hook, json=payload)
             if response.status_code != 200:
                 logger.error("Failed posting to %s: %s", hook, response.content)
         except Exception:
             logger.exception("Failed posting to %s", hook)
 
 
+def enqueue_event(raw_event):
+    """
+    Records the event in the background: buffered in Redis when
+    EVENTS_BUFFER_ENABLED is set (see flush_events), otherwise with the
+    record_event task.
+    """
+    if settings.EVENTS_BUFFER_ENABLED:
+        redis_connection.rpush(EVENTS_BUFFER_KEY, json_dumps(raw_event))
+    else:
+        record_event.delay(raw_event)
+
+
+@celery.task(name="redash.tasks.record_event")
+def record_event(raw_event):
+    event = models.Event.record(raw_event)
+    models.db.session.commit()
+
+    forward_to_webhooks("iglu:io.redash.webhooks/event/jsonschema/1-0-0", event.to_dict())
+
+
+def _record_buffered_events(raw_events):
+    """
+    Records the events one by one, so a malformed event doesn't keep the rest of its
+    batch from being recorded. Events that fail are moved to EVENTS_DEAD_LETTER_KEY.
+    """
+    events = []
+    for i, raw_event in enumerate(raw_events):
+        try:
+            events.extend(models.Event.record_batch([json.loads(raw_event)]))
+            models.db.session.commit()
+        except OperationalError:
+            # The database isn't available, the rest of the batch is retried by the next run.
+            models.db.session.rollback()
+            redis_connection.ltrim(EVENTS_BUFFER_KEY, i, -1)
+            raise
+        except Exception:
+            models.db.session.rollback()
+            logger.exception("Failed recording buffered event: %s", raw_event)
+            redis_connection.rpush(EVENTS_DEAD_LETTER_KEY, raw_event)
+
+    return events
+
+
+@celery.task(name="redash.tasks.flush_events")
+def flush_events():
+    # Batches are removed from the buffer only once they're committed, so a worker dying
+    # in between doesn't lose them. This requires that only one flush runs at a time.
+    if not redis_connection.set(EVENTS_FLUSH_LOCK_KEY, 1, nx=True, ex=EVENTS_FLUSH_LOCK_TIMEOUT):
+        logger.info("Buffered events are already being flushed.")
+        return
+
+    try:
+        while True:
+            raw_events = redis_connection.lrange(EVENTS_BUFFER_KEY, 0, settings.EVENTS_FLUSH_BATCH_SIZE - 1)
+            if not raw_events:
+                break
+
+            try:
+                events = models.Event.record_batch([json.loads(raw_event) for raw_event in raw_events])
+                models.db.session.commit()
+            except Exception:
+                models.db.session.rollback()
+                logger.exception("Failed recording %d buffered events, recording them one by one.",
+                                 len(raw_events))
+                events = _record_buffered_events(raw_events)
+
+            redis_connection.ltrim(EVENTS_BUFFER_KEY, len(raw_events), -1)
+
+            logger.info("Recorded %d buffered events.", len(events))
+            forward_to_webhooks("iglu:io.redash.webhooks/events/jsonschema/1-0-0", events)
+
+            if len(raw_events) < settings.EVENTS_FLUSH_BATCH_SIZE:
+                break
+    finally:
+        redis_connection.delete(EVENTS_FLUSH_LOCK_KEY)
+
+
+@celery.task(name="redash.tasks.rollup_events")
+def rollup_events():
+    models.EventDailyCount.rollup()
+    models.db.session.commit()
+
+
+@celery.task(name="redash.tasks.cleanup_events")
+def cleanup_events():
+    """
+    Job to delete events older than settings.EVENTS_CLEANUP_MAX_AGE days. Their counts remain
+    available in EventDailyCount.
+
+    Each time the job deletes only settings.EVENTS_CLEANUP_COUNT events, so it won't choke the database.
+    """
+    logger.info("Running events clean up (removing maximum of %d events, that are %d days old or more)",
+                settings.EVENTS_CLEANUP_COUNT, settings.EVENTS_CLEANUP_MAX_AGE)
+
+    deleted_count = models.Event.cleanup(settings.EVENTS_CLEANUP_MAX_AGE, settings.EVENTS_CLEANUP_COUNT)
+    models.db.session.commit()
+    logger.info("Deleted %d old events.", deleted_count)
+
+
 @celery.task(name="redash.tasks.version_check")
 def version_check():
     run_version_check()
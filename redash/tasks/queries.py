@@ -2,14 +2,16 @@ import json
 import logging
 import signal
 import time
+import uuid
 
-import pystache
 import redis
 
 from celery.exceptions import SoftTimeLimitExceeded, TimeLimitExceeded
 from celery.result import AsyncResult
 from celery.utils.log import get_task_logger
-from redash import models, redis_connection, settings, statsd_client, utils
+from dateutil import parser as date_parser
+from redash import (circuit_breaker, incremental, last_access, models, redis_connection, runtime_history,
+                    settings, statsd_client, utils)
 from redash.query_runner import InterruptException
 from redash.utils import gen_query_hash
 from redash.worker import celery
@@ -76,7 +78,7 @@ class QueryTaskTracker(object):
         return 'query_task_tracker:{}'.format(task_id)
 
     def _get_list(self):
-        if self.state in ('finished', 'failed', 'cancelled'):
+        if self.state in ('finished', 'failed', 'cancelled', 'skipped'):
             return self.DONE_LIST
 
         if self.state in ('created'):
@@ -205,11 +207,20 @@ class QueryTask(object):
         return self._async_result.revoke(terminate=True, signal='SIGINT')
 
 
+def _is_slow(query_hash, data_source, metadata):
+    if not settings.SLOW_QUERY_THRESHOLD:
+        return False
+
+    stats = runtime_history.get(data_source.id, query_hash, metadata.get('Query ID'))
+    return stats is not None and stats['runtime_p90'] >= settings.SLOW_QUERY_THRESHOLD
+
+
 def enqueue_query(query, data_source, user_id, scheduled_query=None, metadata={}):
     query_hash = gen_query_hash(query)
     logging.info("Inserting job for %s with metadata=%s", query_hash, metadata)
     try_count = 0
     job = None
+    slow = _is_slow(query_hash, data_source, metadata)
 
     while try_count < 5:
         try_count += 1
@@ -241,6 +252,9 @@ def enqueue_query(query, data_source, user_id, scheduled_query=None, metadata={}
                     scheduled_query_id = None
                     time_limit = settings.ADHOC_QUERY_TIME_LIMIT
 
+                if slow:
+                    queue_name = settings.SLOW_QUERY_QUEUE.format(queue=queue_name, data_source_id=data_source.id)
+
                 result = execute_query.apply_async(args=(query, data_source.id, metadata, user_id, scheduled_query_id),
                                                    queue=queue_name,
                                                    time_limit=time_limit)
@@ -264,12 +278,165 @@ def enqueue_query(query, data_source, user_id, scheduled_query=None, metadata={}
     return job
 
 
+SOURCE_TABLES_VERSIONS_KEY = 'query:{}:source_tables_versions'
+
+
+def _get_table_versions(data_source, table_versions):
+    if data_source.id not in table_versions:
+        try:
+            table_versions[data_source.id] = data_source.query_runner.get_table_versions()
+        except Exception:
+            logger.exception("Failed getting table versions of data source %s.", data_source.id)
+            table_versions[data_source.id] = None
+
+    return table_versions[data_source.id]
+
+
+def source_tables_unchanged(query, query_text, table_versions):
+    """
+    Whether none of the tables the query reads from changed since its latest
+    result. `table_versions` caches the table versions of each data source
+    (see BaseQueryRunner.get_table_versions) for the current refresh run.
+    """
+    if query.latest_query_data_id is None:
+        return False
+
+    all_versions = _get_table_versions(query.data_source, table_versions)
+    if all_versions is None:
+        return False
+
+    tables = query.data_source.query_runner.get_source_tables(query_text)
+    if not tables:
+        return False
+
+    versions = {table: all_versions.get(table) for table in tables}
+    if None in versions.values():
+        return False
+
+    key = SOURCE_TABLES_VERSIONS_KEY.format(query.id)
+    previous = redis_connection.get(key)
+    if previous is not None:
+        previous = json.loads(previous)
+        # The latest result has to be newer than the versions it's compared
+        # against, otherwise the refresh that followed them may have failed.
+        if (previous['versions'] == versions and
+                query.latest_query_data.retrieved_at >= date_parser.parse(previous['checked_at'])):
+            return True
+
+    redis_connection.setex(key, 7 * 24 * 3600, utils.json_dumps({
+        'versions': versions,
+        'checked_at': utils.utcnow(),
+    }))
+
+    return False
+
+
+class RefreshThrottle(object):
+    """
+    Spreads the refreshes of scheduled queries over settings.SCHEDULE_SPREAD_WINDOW
+    seconds: a due query is only refreshed if the number of scheduled queries
+    expected to still be running on its data source (going by the 90th
+    percentile of their recent runtimes) is below settings.SCHEDULE_TARGET_CONCURRENCY, or if it has been
+    waiting for the whole window.
+    """
+    RUNNING_KEY = 'refresh_throttle:running:{}'
+    WAITING_KEY = 'refresh_throttle:waiting'
+    # expected runtime of queries that never ran
+    DEFAULT_RUNTIME = 60
+
+    def __init__(self):
+        self.now = time.time()
+        self.running = {}
+        self.waiting = redis_connection.hgetall(self.WAITING_KEY)
+        self.offered = set()
+
+    def expected_runtime(self, query):
+        stats = runtime_history.get(query.data_source_id, query.query_hash, query.id)
+        if stats is None:
+            return self.DEFAULT_RUNTIME
+
+        return stats['runtime_p90']
+
+    def _running_count(self, data_source_id):
+        if data_source_id not in self.running:
+            key = self.RUNNING_KEY.format(data_source_id)
+            redis_connection.zremrangebyscore(key, '-inf', self.now)
+            self.running[data_source_id] = redis_connection.zcard(key)
+
+        return self.running[data_source_id]
+
+    def admit(self, query):
+        """
+        Whether to refresh the (due) query now. Queries that aren't admitted are
+        expected to be offered again on the next refresh.
+        """
+        self.offered.add(str(query.id))
+        waiting_since = float(self.waiting.get(str(query.id), self.now))
+        if (self._running_count(query.data_source_id) >= settings.SCHEDULE_TARGET_CONCURRENCY and
+                self.now - waiting_since < settings.SCHEDULE_SPREAD_WINDOW):
+            if str(query.id) not in self.waiting:
+                redis_connection.hset(self.WAITING_KEY, query.id, self.now)
+            return False
+
+        self.running[query.data_source_id] += 1
+        # members only need to be unique, the score is the expected end time
+        redis_connection.zadd(self.RUNNING_KEY.format(query.data_source_id),
+                              self.now + self.expected_runtime(query), '{}:{}'.format(query.id, self.now))
+        redis_connection.hdel(self.WAITING_KEY, query.id)
+        return True
+
+    def finish(self):
+        # forget queries that were waiting but aren't due anymore
+        stale = set(self.waiting.keys()) - self.offered
+        if stale:
+            redis_connection.hdel(self.WAITING_KEY, *stale)
+
+
+def _record_skipped_refresh(query, query_text):
+    # counts as an execution, so the query isn't outdated again until its next interval
+    models.scheduled_queries_executions.update(query.id)
+    tracker = QueryTaskTracker.create('skipped:{}'.format(uuid.uuid4().hex), 'skipped',
+                                      gen_query_hash(query_text), query.data_source_id, True,
+                                      {'Query ID': query.id, 'Username': 'Scheduled'})
+    tracker.save()
+
+
+def _scheduled_execution(query):
+    """
+    Returns the query text and metadata of a scheduled execution of `query`.
+    """
+    if query.options and len(query.options.get('parameters', [])) > 0:
+        query_params = {p['name']: p['value']
+                        for p in query.options['parameters']}
+    else:
+        query_params = None
+
+    metadata = {'Query ID': query.id, 'Username': 'Scheduled'}
+    if incremental.get_options(query):
+        # a watermark that isn't a number or a timestamp is left out, so the query is fully refreshed
+        last_watermark = incremental.to_sql_literal(query.last_watermark)
+        query_params = dict(query_params or {}, last_watermark=last_watermark)
+        if last_watermark is not None:
+            metadata['Last Watermark'] = query.last_watermark
+
+    if query_params is not None:
+        query_text = incremental.render(query.query_text, query_params)
+    else:
+        query_text = query.query_text
+
+    return query_text, metadata
+
+
 @celery.task(name="redash.tasks.refresh_queries")
 def refresh_queries():
     logger.info("Refreshing queries...")
 
     outdated_queries_count = 0
     query_ids = []
+    skipped_query_ids = []
+    deferred_query_ids = []
+    table_versions = {}
+    throttle = RefreshThrottle() if settings.SCHEDULE_SPREAD_WINDOW else None
 
     with statsd_client.timer('manager.outdated_queries_lookup'):
         for query in models.Query.outdated_queries():
@@ -282,23 +449,37 @@ def refresh_queries():
             elif query.data_source.paused:
                 logging.info("Skipping refresh of %s because datasource - %s is paused (%s).", query.id, query.data_source.name, query.data_source.pause_reason)
             else:
-                if query.options and len(query.options.get('parameters', [])) > 0:
-                    query_params = {p['name']: p['value']
-                                    for p in query.options['parameters']}
-                    query_text = pystache.render(query.query_text, query_params)
-                else:
-                    query_text = query.query_text
+                query_text, metadata = _scheduled_execution(query)
+
+                if source_tables_unchanged(query, query_text, table_versions):
+                    logging.info("Skipping refresh of %s because its source tables didn't change.", query.id)
+                    _record_skipped_refresh(query, query_text)
+                    skipped_query_ids.append(query.id)
+                    continue
+
+                if throttle is not None and not throttle.admit(query):
+                    deferred_query_ids.append(query.id)
+                    continue
 
                 enqueue_query(query_text, query.data_source, query.user_id,
                               scheduled_query=query,
-                              metadata={'Query ID': query.id, 'Username': 'Scheduled'})
+                              metadata=metadata)
 
                 query_ids.append(query.id)
                 outdated_queries_count += 1
 
+    if throttle is not None:
+        throttle.finish()
+
     statsd_client.gauge('manager.outdated_queries', outdated_queries_count)
+    statsd_client.gauge('manager.unchanged_queries', len(skipped_query_ids))
+    statsd_client.gauge('manager.deferred_queries', len(deferred_query_ids))
 
     logger.info("Done refreshing queries. Found %d outdated queries: %s" % (outdated_queries_count, query_ids))
+    if skipped_query_ids:
+        logger.info("Skipped %d queries with unchanged source tables: %s", len(skipped_query_ids), skipped_query_ids)
+    if deferred_query_ids:
+        logger.info("Deferred %d queries to spread the load: %s", len(deferred_query_ids), deferred_query_ids)
 
     status = redis_connection.hgetall('redash:status')
     now = time.time()
@@ -312,6 +493,56 @@ def refresh_queries():
     statsd_client.gauge('manager.seconds_since_refresh', now - float(status.get('last_refresh_at', now)))
 
 
+@celery.task(name="redash.tasks.sync_last_access")
+def sync_last_access():
+    accessed = last_access.pop()
+    models.Query.record_access(accessed['query'])
+    models.Dashboard.record_access(accessed['dashboard'])
+    models.db.session.commit()
+
+
+@celery.task(name="redash.tasks.suspend_idle_queries")
+def suspend_idle_queries():
+    for org in models.Organization.query:
+        idle_days = org.get_setting('suspend_idle_queries_after')
+        if not idle_days:
+            continue
+
+        suspended_count = models.Query.suspend_idle(org, int(idle_days))
+        if suspended_count:
+            logger.info("Suspended the schedules of %d queries of %s not viewed in %s days.",
+                        suspended_count, org.slug, idle_days)
+
+    models.db.session.commit()
+
+
+@celery.task(name="redash.tasks.probe_circuit_breakers")
+def probe_circuit_breakers():
+    circuits = circuit_breaker.open_circuits()
+
+    for data_source_id, state in circuits.iteritems():
+        data_source = models.DataSource.query.get(data_source_id)
+        if data_source is None or data_source.pause_reason != circuit_breaker.PAUSE_REASON:
+            # deleted, or resumed (or paused again) by hand
+            circuit_breaker.close(data_source_id)
+            continue
+
+        if state['next_probe_at'] > time.time():
+            continue
+
+        try:
+            data_source.query_runner.test_connection()
+        except Exception:
+            logger.info("Data source %s still fails to connect (attempt %d).", data_source_id, state['attempts'] + 1)
+            circuit_breaker.probe_failed(data_source_id, state)
+        else:
+            logger.info("Closing the circuit of data source %s.", data_source_id)
+            circuit_breaker.close(data_source_id)
+            data_source.resume()
+
+    statsd_client.gauge('circuit_breaker.open_circuits', len(circuit_breaker.open_circuits()))
+
+
 @celery.task(name="redash.tasks.cleanup_tasks")
 def cleanup_tasks():
     in_progress = QueryTaskTracker.all(QueryTaskTracker.IN_PROGRESS_LIST)
@@ -352,9 +583,12 @@ def cleanup_query_results():
                  settings.QUERY_RESULTS_CLEANUP_COUNT, settings.QUERY_RESULTS_CLEANUP_MAX_AGE)
 
     unused_query_results = models.QueryResult.unused(settings.QUERY_RESULTS_CLEANUP_MAX_AGE).limit(settings.QUERY_RESULTS_CLEANUP_COUNT)
-    deleted_count = models.QueryResult.query.filter(
-        models.QueryResult.id.in_(unused_query_results.subquery())
-    ).delete(synchronize_session=False)
+    # The ids are selected once, so the data deleted from the result storage is the data of the deleted results.
+    unused_ids = [result_id for result_id, in unused_query_results]
+    deleted_count = 0
+    if unused_ids:
+        deleted_count = models.QueryResult.delete_results(
+            models.QueryResult.query.filter(models.QueryResult.id.in_(unused_ids)))
     deleted_count += models.Query.delete_stale_resultsets()
     models.db.session.commit()
     logger.info("Deleted %d unused query results.", deleted_count)
@@ -409,6 +643,11 @@ class QueryExecutionError(Exception):
     pass
 
 
+# Data of executed queries until store_query_result stores it (see QueryExecutor.run).
+STAGED_DATA_KEY = 'query_result:{}:staged_data'
+STAGED_DATA_EXPIRE = 24 * 3600
+
+
 # We could have created this as a celery.Task derived class, and act as the task itself. But this might result in weird
 # issues as the task class created once per process, so decided to have a plain object instead.
 class QueryExecutor(object):
@@ -433,11 +672,11 @@ class QueryExecutor(object):
                                                                                                    self.query_hash,
                                                                                                    self.data_source_id,
                                                                                                    False, metadata)
-        if self.tracker.scheduled:
-            models.scheduled_queries_executions.update(self.tracker.query_id)
 
     def run(self):
         signal.signal(signal.SIGINT, signal_handler)
+        if self.tracker.scheduled:
+            models.scheduled_queries_executions.update(self.tracker.query_id)
         self.tracker.update(started_at=time.time(), state='started')
 
         logger.debug("Executing query:\n%s", self.query)
@@ -446,13 +685,22 @@ class QueryExecutor(object):
         query_runner = self.data_source.query_runner
         annotated_query = self._annotate_query(query_runner)
 
+        connection_error = False
         try:
-            data, error = query_runner.run_query(annotated_query, self.user)
+            data, error, row_count = query_runner.run_query_with_row_count(
+                annotated_query, self.user, positional_rows=settings.QUERY_RESULTS_POSITIONAL_ROWS)
         except Exception as e:
             error = unicode(e)
             data = None
+            row_count = None
+            connection_error = query_runner.is_connection_error(e)
             logging.warning('Unexpected error while running query:', exc_info=1)
 
+        if connection_error:
+            circuit_breaker.record_failure(self.data_source)
+        else:
+            circuit_breaker.record_success(self.data_source)
+
         run_time = time.time() - self.tracker.started_at
         self.tracker.update(error=error, run_time=run_time, state='saving_results')
 
@@ -469,24 +717,56 @@ class QueryExecutor(object):
                 models.db.session.add(self.scheduled_query)
             models.db.session.commit()
             raise result
+        elif settings.QUERY_RESULTS_QUEUE and len(data) <= settings.QUERY_RESULTS_STAGING_MAX_SIZE:
+            # Frees this worker for the next query. The replacing task keeps the id of this one, so
+            # the job finishes (with the query result id) once the result is stored. The data is
+            # staged in Redis, to keep it out of the task's message, unless it's too large to keep
+            # in Redis memory: then this worker stores it.
+            staged_data_key = STAGED_DATA_KEY.format(self.task.request.id)
+            redis_connection.setex(staged_data_key, STAGED_DATA_EXPIRE, data)
+            scheduled_query_id = self.scheduled_query.id if self.scheduled_query else None
+            return self.task.replace(
+                store_query_result.s(self.query, self.data_source.id, self.metadata, staged_data_key, run_time,
+                                     scheduled_query_id, row_count).set(queue=settings.QUERY_RESULTS_QUEUE))
         else:
-            if (self.scheduled_query and self.scheduled_query.schedule_failures > 0):
-                self.scheduled_query = models.db.session.merge(self.scheduled_query, load=False)
-                self.scheduled_query.schedule_failures = 0
-                models.db.session.add(self.scheduled_query)
-            query_result, updated_query_ids = models.QueryResult.store_result(
-                self.data_source.org_id, self.data_source,
-                self.query_hash, self.query, data,
-                run_time, utils.utcnow())
-            models.db.session.commit()  # make sure that alert sees the latest query result
-            self._log_progress('checking_alerts')
-            for query_id in updated_query_ids:
-                check_alerts_for_query.delay(query_id)
-            self._log_progress('finished')
-
-            result = query_result.id
-            models.db.session.commit()
-            return result
+            return self.store_result(data, run_time, row_count)
+
+    def store_result(self, data, run_time, row_count=None):
+        if (self.scheduled_query and self.scheduled_query.schedule_failures > 0):
+            self.scheduled_query = models.db.session.merge(self.scheduled_query, load=False)
+            self.scheduled_query.schedule_failures = 0
+            models.db.session.add(self.scheduled_query)
+        runtime_history.record(self.data_source.id, self.query_hash, self.metadata.get('Query ID'),
+                               run_time, row_count)
+
+        query_hash, query_text = self.query_hash, self.query
+        if self.scheduled_query and incremental.get_options(self.scheduled_query):
+            # stored as the result of the query text, rather than of this execution's (with the watermark)
+            scheduled_query = models.Query.query.get(self.scheduled_query.id)
+            data = incremental.refresh_result(scheduled_query, data, self.metadata.get('Last Watermark'))
+            if data is None:
+                # the new rows can't be added to the previous result, so the query is run again in full
+                models.db.session.commit()
+                query_text, metadata = _scheduled_execution(scheduled_query)
+                enqueue_query(query_text, scheduled_query.data_source, scheduled_query.user_id,
+                              scheduled_query=scheduled_query, metadata=metadata)
+                self._log_progress('finished')
+                return None
+            query_hash, query_text = scheduled_query.query_hash, scheduled_query.query_text
+
+        query_result, updated_query_ids = models.QueryResult.store_result(
+            self.data_source.org_id, self.data_source,
+            query_hash, query_text, data,
+            run_time, utils.utcnow())
+        models.db.session.commit()  # make sure that alert sees the latest query result
+        self._log_progress('checking_alerts')
+        for query_id in updated_query_ids:
+            check_alerts_for_query.delay(query_id)
+        self._log_progress('finished')
+
+        result = query_result.id
+        models.db.session.commit()
+        return result
 
     def _annotate_query(self, query_runner):
         if query_runner.annotate_query():
@@ -527,3 +807,22 @@ def execute_query(self, query, data_source_id, metadata, user_id=None,
         scheduled_query = None
     return QueryExecutor(self, query, data_source_id, user_id, metadata,
                          scheduled_query).run()
+
+
+@celery.task(name="redash.tasks.store_query_result", bind=True)
+def store_query_result(self, query, data_source_id, metadata, staged_data_key, run_time,
+                       scheduled_query_id=None, row_count=None):
+    try:
+        data = redis_connection.get(staged_data_key)
+        if data is None:
+            raise QueryExecutionError("The query's result expired before it was stored.")
+
+        if scheduled_query_id is not None:
+            scheduled_query = models.Query.query.get(scheduled_query_id)
+        else:
+            scheduled_query = None
+        return QueryExecutor(self, query, data_source_id, None, metadata,
+                             scheduled_query).store_result(data.decode('utf-8'), run_time, row_count)
+    finally:
+        # the task isn't retried, so the data isn't needed anymore if storing it failed either
+        redis_connection.delete(staged_data_key)
@@ -16,6 +16,7 @@ from sqlalchemy.orm.query import Query
 
 from .human_time import parse_human_time
 from redash import settings
+from redash.utils import json_codec
 
 COMMENTS_REGEX = re.compile("/\*.*?\*/")
 WRITER_ENCODING = os.environ.get('REDASH_CSV_WRITER_ENCODING', 'utf-8')
@@ -85,8 +86,63 @@ class JSONEncoder(json.JSONEncoder):
         super(JSONEncoder, self).default(o)
 
 
-def json_dumps(data):
-    return json.dumps(data, cls=JSONEncoder)
+def json_dumps(data, cls=JSONEncoder):
+    return json_codec.dumps(data, cls)
+
+
+def json_loads(data):
+    return json_codec.loads(data)
+
+
+# Value of the "row_format" of query result data which rows are lists of values,
+# in the order of its columns, instead of dicts by column name.
+POSITIONAL_ROWS = 'positional'
+
+
+def iter_row_dicts(data):
+    """
+    Yields the rows of query result `data` as dicts by column name.
+    """
+    if data.get('row_format') != POSITIONAL_ROWS:
+        for row in data['rows']:
+            yield row
+    else:
+        column_names = [column['name'] for column in data['columns']]
+        for row in data['rows']:
+            yield dict(zip(column_names, row))
+
+
+def iter_row_values(data):
+    """
+    Yields the rows of query result `data` as lists of values, in the order of
+    its columns.
+    """
+    if data.get('row_format') == POSITIONAL_ROWS:
+        for row in data['rows']:
+            yield row
+    else:
+        column_names = [column['name'] for column in data['columns']]
+        for row in data['rows']:
+            yield [row.get(name) for name in column_names]
+
+
+def convert_rows(data, row_format=None):
+    """
+    Returns query result `data` with its rows in `row_format` (POSITIONAL_ROWS,
+    or dicts by column name when None).
+    """
+    if data.get('row_format') == row_format:
+        return data
+
+    data = dict(data)
+    if row_format == POSITIONAL_ROWS:
+        data['rows'] = list(iter_row_values(data))
+        data['row_format'] = POSITIONAL_ROWS
+    else:
+        data['rows'] = list(iter_row_dicts(data))
+        data.pop('row_format', None)
+
+    return data
 
 
 def build_url(request, host, path):
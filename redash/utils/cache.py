@@ -0,0 +1,94 @@
+import json
+import time
+
+from flask import g, has_request_context
+
+from redash import redis_connection
+from redash.utils import json_dumps
+
+
+def request_cache(name):
+    """
+    Returns a dict for memoizing values for the duration of the current request,
+    or None when called outside of a request.
+    """
+    if not has_request_context():
+        return None
+
+    caches = g.setdefault('request_caches', {})
+    return caches.setdefault(name, {})
+
+
+def reset_request_caches():
+    g.pop('request_caches', None)
+
+
+class LocalCache(object):
+    """
+    A per-process cache of values which expire after `ttl` seconds.
+    """
+    def __init__(self, ttl, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._values = {}
+
+    def get(self, key):
+        value, expires_at = self._values.get(key, (None, 0))
+        if expires_at < time.time():
+            self._values.pop(key, None)
+            return None
+
+        return value
+
+    def set(self, key, value):
+        if len(self._values) >= self.max_size:
+            self._values.clear()
+
+        self._values[key] = (value, time.time() + self.ttl)
+
+    def delete(self, key):
+        self._values.pop(key, None)
+
+    def clear(self):
+        self._values.clear()
+
+
+class TieredCache(object):
+    """
+    Caches JSON serializable values in Redis, with a short lived LocalCache in
+    front of it.
+
+    Deleting a key only removes it from the local cache of the current process,
+    so other processes might return the previous value for up to `local_ttl`
+    seconds.
+    """
+    def __init__(self, prefix, local_ttl, ttl):
+        self.prefix = prefix
+        self.local = LocalCache(local_ttl)
+        self.ttl = ttl
+
+    def _redis_key(self, key):
+        return u'{}:{}'.format(self.prefix, key)
+
+    def get(self, key):
+        value = self.local.get(key)
+
+        if value is None:
+            value = redis_connection.get(self._redis_key(key))
+            if value is None:
+                return None
+            self.local.set(key, value)
+
+        return json.loads(value)
+
+    def set(self, key, value):
+        value = json_dumps(value)
+        self.local.set(key, value)
+        redis_connection.setex(self._redis_key(key), self.ttl, value)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.local.delete(key)
+
+        if keys:
+            redis_connection.delete(*[self._redis_key(key) for key in keys])
@@ -0,0 +1,114 @@
+"""
+JSON encoding and decoding of query results, through the backend selected
+with REDASH_JSON_CODEC ("json" or "ujson", when installed).
+
+Encoders only fall back to their `default` hook for values the backend can't
+encode, so convert_rows() converts the values of date, datetime and number
+columns beforehand, column by column, to leave as few of them as possible.
+"""
+import datetime
+import decimal
+import json
+import logging
+
+from redash import settings
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('json', 'ujson')
+
+
+def _json_backend():
+    def dumps(obj, cls):
+        return json.dumps(obj, cls=cls)
+
+    return dumps, json.loads
+
+
+def _ujson_backend():
+    import ujson
+
+    def loads(s):
+        return ujson.loads(s, precise_float=True)
+
+    # ujson can't call an encoder's `default` (and encodes dates as timestamps),
+    # so it's only used for decoding
+    return _json_backend()[0], loads
+
+
+_backends = {
+    'json': _json_backend,
+    'ujson': _ujson_backend,
+}
+
+
+def get_backend(name):
+    """
+    Returns the (dumps, loads) functions of the backend, or the stdlib ones if
+    it isn't installed.
+    """
+    try:
+        return _backends[name]()
+    except (KeyError, ImportError):
+        logger.warning("JSON codec %s isn't available, using json.", name)
+        return _json_backend()
+
+
+_dumps, _loads = get_backend(settings.JSON_CODEC)
+
+
+def dumps(obj, cls):
+    """
+    Encodes `obj`, using the `cls` JSONEncoder for values the backend can't encode.
+    """
+    return _dumps(obj, cls)
+
+
+def loads(s):
+    return _loads(s)
+
+
+def _convert_date(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+
+    return value
+
+
+def _convert_number(value):
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+
+    return value
+
+
+# By column type (see redash.query_runner), converts values the way
+# utils.JSONEncoder does.
+_converters = {
+    'date': _convert_date,
+    'datetime': _convert_date,
+    'float': _convert_number,
+    'integer': _convert_number,
+}
+
+
+def convert_rows(columns, rows):
+    """
+    Returns `rows` (sequences of values in the order of `columns`) as lists,
+    with the values of date, datetime and number columns converted to their
+    JSON representation.
+    """
+    converters = [(i, _converters[column['type']]) for i, column in enumerate(columns)
+                  if column.get('type') in _converters]
+
+    if not converters:
+        return [list(row) for row in rows]
+
+    converted = []
+    for row in rows:
+        row = list(row)
+        for i, converter in converters:
+            row[i] = converter(row[i])
+        converted.append(row)
+
+    return converted
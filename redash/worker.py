@@ -27,6 +27,18 @@ celery_schedule = {
     'refresh_schemas': {
         'task': 'redash.tasks.refresh_schemas',
         'schedule': timedelta(minutes=settings.SCHEMAS_REFRESH_SCHEDULE)
+    },
+    'rollup_events': {
+        'task': 'redash.tasks.rollup_events',
+        'schedule': timedelta(minutes=5)
+    },
+    'sync_last_access': {
+        'task': 'redash.tasks.sync_last_access',
+        'schedule': timedelta(minutes=1)
+    },
+    'suspend_idle_queries': {
+        'task': 'redash.tasks.suspend_idle_queries',
+        'schedule': timedelta(hours=1)
     }
 }
 
@@ -38,6 +50,24 @@ if settings.VERSION_CHECK:
         'schedule': crontab(minute=randint(0, 59), hour=randint(0, 23))
     }
 
+if settings.EVENTS_BUFFER_ENABLED:
+    celery_schedule['flush_events'] = {
+        'task': 'redash.tasks.flush_events',
+        'schedule': timedelta(seconds=settings.EVENTS_FLUSH_INTERVAL)
+    }
+
+if settings.EVENTS_CLEANUP_ENABLED:
+    celery_schedule['cleanup_events'] = {
+        'task': 'redash.tasks.cleanup_events',
+        'schedule': timedelta(minutes=5)
+    }
+
+if settings.CIRCUIT_BREAKER_THRESHOLD:
+    celery_schedule['probe_circuit_breakers'] = {
+        'task': 'redash.tasks.probe_circuit_breakers',
+        'schedule': timedelta(seconds=30)
+    }
+
 if settings.QUERY_RESULTS_CLEANUP_ENABLED:
     celery_schedule['cleanup_query_results'] = {
         'task': 'redash.tasks.cleanup_query_results',
@@ -1,4 +1,5 @@
 import json
+from flask import g
 from tests import BaseTestCase
 from redash.models import ApiKey, Dashboard, AccessPermission, db
 from redash.permissions import ACCESS_TYPE_MODIFY
@@ -72,6 +73,20 @@ class TestDashboardResourceGet(BaseTestCase):
         self.assertTrue(rv.json['widgets'][0]['restricted'])
         self.assertNotIn('restricted', rv.json['widgets'][1])
 
+    def test_get_dashboard_runs_fixed_number_of_queries(self):
+        dashboard = self.factory.create_dashboard()
+        for _ in range(40):
+            query = self.factory.create_query(user=self.factory.create_user())
+            vis = self.factory.create_visualization(query_rel=query)
+            self.factory.create_widget(visualization=vis, dashboard=dashboard)
+        db.session.commit()
+
+        queries_count = g.get('queries_count', 0)
+        rv = self.make_request('get', '/api/dashboards/{0}'.format(dashboard.slug))
+        self.assertEquals(rv.status_code, 200)
+        self.assertEquals(len(rv.json['widgets']), 40)
+        self.assertLessEqual(g.queries_count - queries_count, 20)
+
     def test_get_non_existing_dashboard(self):
         rv = self.make_request('get', '/api/dashboards/not_existing')
         self.assertEquals(rv.status_code, 404)
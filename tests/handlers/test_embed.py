@@ -106,7 +106,7 @@ class TestAPIPublicDashboard(BaseTestCase):
         w2 = self.factory.create_widget(dashboard=dashboard, visualization=None, text="a text box")
         api_key = self.factory.create_api_key(object=dashboard)
         with mock.patch.object(PostgreSQL, "run_query") as qr:
-            qr.return_value = ("[1, 2]", None)
+            qr.return_value = ('{"columns": [], "rows": []}', None)
             res = self.make_request('get', '/api/dashboards/public/{}'.format(api_key.api_key), user=False, is_json=False)
         self.assertEqual(res.status_code, 200)
     # Not relevant for now, as tokens in api_keys table are only created for dashboards. Once this changes, we should
@@ -1,8 +1,8 @@
 from werkzeug.exceptions import BadRequest
 
-from redash.handlers.base import paginate
+from redash.handlers.base import paginate, COUNT_ESTIMATED
 from unittest import TestCase
-from mock import MagicMock
+from mock import MagicMock, patch
 
 class DummyResults(object):
     items = [i for i in range(25)]
@@ -26,6 +26,16 @@ class TestPaginate(TestCase):
         self.assertRaises(BadRequest, lambda: paginate(self.query_set, -1, 25, lambda x: x))
         self.assertRaises(BadRequest, lambda: paginate(self.query_set, 6, 25, lambda x: x))
 
+    @patch('redash.handlers.base.estimated_count', return_value=40)
+    def test_uses_estimated_count(self, estimated_count):
+        page = paginate(self.query_set, 6, 25, lambda x: x, COUNT_ESTIMATED)
+        self.assertEqual(page['count'], 40)
+        self.assertEqual(page['page'], 6)
+        self.query_set.count.assert_not_called()
+
+    def test_raises_error_for_bad_count_mode(self):
+        self.assertRaises(BadRequest, lambda: paginate(self.query_set, 1, 25, lambda x: x, 'approximate'))
+
     def test_raises_error_for_bad_page_size(self):
         self.assertRaises(BadRequest, lambda: paginate(self.query_set, 1, 251, lambda x: x))
         self.assertRaises(BadRequest, lambda: paginate(self.query_set, 1, -1, lambda x: x))
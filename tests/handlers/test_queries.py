@@ -1,8 +1,10 @@
 import json
 
+from flask import g
 from tests import BaseTestCase
-from redash import models
+from redash import models, recent_queries
 from redash.models import db
+from redash.utils import utcnow
 
 from redash.serializers import serialize_query
 from redash.permissions import ACCESS_TYPE_MODIFY
@@ -147,6 +149,45 @@ class TestQueryListResourceGet(BaseTestCase):
         assert len(rv.json['results']) == 3
         assert set(map(lambda d: d['id'], rv.json['results'])) == set([q1.id, q2.id, q3.id])
 
+    def test_runs_fixed_number_of_queries(self):
+        for _ in range(50):
+            query = self.factory.create_query(user=self.factory.create_user())
+            query.latest_query_data = self.factory.create_query_result()
+        db.session.commit()
+
+        queries_count = g.get('queries_count', 0)
+        rv = self.make_request('get', '/api/queries?page_size=50')
+        self.assertEquals(rv.status_code, 200)
+        self.assertEquals(len(rv.json['results']), 50)
+        self.assertTrue(all(q['retrieved_at'] is not None for q in rv.json['results']))
+        self.assertLessEqual(g.queries_count - queries_count, 15)
+
+    def test_cursor_pagination(self):
+        queries = [self.factory.create_query() for _ in range(5)]
+
+        ids = []
+        cursor = ''
+        while cursor is not None:
+            rv = self.make_request('get', '/api/queries?page_size=2&count=exact&cursor={}'.format(cursor))
+            self.assertEquals(rv.status_code, 200)
+            self.assertEquals(rv.json['count'], 5)
+            ids.extend(q['id'] for q in rv.json['results'])
+            cursor = rv.json['next_cursor']
+
+        self.assertEquals(ids, [q.id for q in reversed(queries)])
+
+    def test_cursor_pagination_with_estimated_count(self):
+        self.factory.create_query()
+
+        rv = self.make_request('get', '/api/queries?cursor=')
+        self.assertEquals(rv.status_code, 200)
+        self.assertIsInstance(rv.json['count'], int)
+        self.assertIsNone(rv.json['next_cursor'])
+
+    def test_invalid_cursor(self):
+        rv = self.make_request('get', '/api/queries?cursor=invalid')
+        self.assertEquals(rv.status_code, 400)
+
     def test_filters_with_tags(self):
         q1 = self.factory.create_query(tags=[u'test'])
         q2 = self.factory.create_query()
@@ -165,6 +206,46 @@ class TestQueryListResourceGet(BaseTestCase):
         assert len(rv.json['results']) == 2
         assert set(map(lambda d: d['id'], rv.json['results'])) == set([q1.id, q2.id])
 
+class TestQueryRecentResourceGet(BaseTestCase):
+    def test_returns_queries_by_activity(self):
+        q1 = self.factory.create_query()
+        q2 = self.factory.create_query()
+        db.session.commit()
+        recent_queries.record_events([
+            {'user_id': self.factory.user.id, 'object_type': 'query', 'object_id': q.id,
+             'action': 'view', 'created_at': utcnow()} for q in (q1, q2, q2)])
+
+        rv = self.make_request('get', '/api/queries/recent')
+        self.assertEqual([q2.id, q1.id], [q['id'] for q in rv.json])
+
+    def test_skips_queries_without_access(self):
+        query = self.factory.create_query(data_source=self.factory.create_data_source(group=self.factory.create_group()))
+        db.session.commit()
+        recent_queries.record_events([{'user_id': self.factory.user.id, 'object_type': 'query',
+                                       'object_id': query.id, 'action': 'view', 'created_at': utcnow()}])
+
+        rv = self.make_request('get', '/api/queries/recent')
+        self.assertEqual([], rv.json)
+
+    def test_falls_back_to_daily_event_counts(self):
+        q1 = self.factory.create_query()
+        q2 = self.factory.create_query()
+        db.session.add_all([models.Event(org=self.factory.org, user=self.factory.user, action='execute',
+                                         object_type='query', object_id=str(q.id)) for q in (q1, q2, q2)])
+        models.EventDailyCount.rollup()
+        db.session.commit()
+
+        rv = self.make_request('get', '/api/queries/recent')
+        self.assertEqual([q2.id, q1.id], [q['id'] for q in rv.json])
+
+    def test_falls_back_to_modified_queries(self):
+        query = self.factory.create_query()
+        db.session.commit()
+
+        rv = self.make_request('get', '/api/queries/recent')
+        self.assertEqual([query.id], [q['id'] for q in rv.json])
+
+
 class TestQueryListResourcePost(BaseTestCase):
     def test_create_query(self):
         query_data = {
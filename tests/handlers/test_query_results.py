@@ -167,3 +167,33 @@ class TestQueryResultExcelResponse(BaseTestCase):
         rv = self.make_request('get', '/api/queries/{}/results/{}.xlsx'.format(query.id, query_result.id), is_json=False)
         self.assertEquals(rv.status_code, 200)
 
+
+
+class TestQueryResultRowFormat(BaseTestCase):
+    def create_positional_result(self):
+        data = {'columns': [{'name': 'a'}, {'name': 'b'}], 'rows': [[1, 2], [3, None]], 'row_format': 'positional'}
+        return self.factory.create_query_result(data=json.dumps(data))
+
+    def test_returns_rows_as_dicts_by_default(self):
+        query_result = self.create_positional_result()
+
+        rv = self.make_request('get', '/api/query_results/{}'.format(query_result.id))
+        data = rv.json['query_result']['data']
+        self.assertEqual([{'a': 1, 'b': 2}, {'a': 3, 'b': None}], data['rows'])
+        self.assertNotIn('row_format', data)
+
+    def test_returns_positional_rows_when_asked(self):
+        query_result = self.factory.create_query_result(data=json.dumps({'columns': [{'name': 'a'}], 'rows': [{'a': 1}]}))
+
+        rv = self.make_request('get', '/api/query_results/{}?row_format=positional'.format(query_result.id))
+        data = rv.json['query_result']['data']
+        self.assertEqual([[1]], data['rows'])
+        self.assertEqual('positional', data['row_format'])
+
+    def test_renders_csv_of_positional_rows(self):
+        query = self.factory.create_query()
+        query_result = self.create_positional_result()
+
+        rv = self.make_request('get', '/api/queries/{}/results/{}.csv'.format(query.id, query_result.id), is_json=False)
+        self.assertEquals(rv.status_code, 200)
+        self.assertEqual("a,b\r\n1,2\r\n3,\r\n", rv.data)
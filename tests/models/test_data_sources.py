@@ -1,6 +1,9 @@
+import json
+
 import mock
 from tests import BaseTestCase
 
+from redash import redis_connection
 from redash.models import DataSource, Query, QueryResult
 from redash.utils.configuration import ConfigurationContainer
 
@@ -47,6 +50,56 @@ class TestDataSourceCreate(BaseTestCase):
         self.assertIn(self.factory.org.default_group.id, data_source.groups)
 
 
+class TestDataSourceGroups(BaseTestCase):
+    def test_memoizes_groups_during_request(self):
+        data_source = self.factory.create_data_source()
+
+        with self.app.test_request_context():
+            groups = data_source.groups
+            with mock.patch('redash.models.db.session.query') as query:
+                self.assertEqual(groups, data_source.groups)
+                query.assert_not_called()
+
+    def test_invalidates_memoized_groups_on_add_group(self):
+        data_source = self.factory.create_data_source()
+        group = self.factory.create_group()
+
+        with self.app.test_request_context():
+            self.assertNotIn(group.id, data_source.groups)
+            data_source.add_group(group, view_only=True)
+            self.assertEqual(data_source.groups[group.id], True)
+
+    @mock.patch('redash.models.settings.DATA_SOURCE_GROUPS_CACHE_ENABLED', True)
+    def test_invalidates_cached_groups_on_change(self):
+        data_source = self.factory.create_data_source()
+        group = self.factory.create_group()
+        self.assertNotIn(group.id, data_source.groups)
+
+        data_source.add_group(group)
+        self.db.session.commit()
+        self.assertEqual(data_source.groups[group.id], False)
+
+        data_source.update_group_permission(group, True)
+        self.db.session.commit()
+        self.assertEqual(data_source.groups[group.id], True)
+
+        data_source.remove_group(group)
+        self.assertNotIn(group.id, data_source.groups)
+
+    @mock.patch('redash.models.settings.DATA_SOURCE_GROUPS_CACHE_ENABLED', True)
+    def test_drops_groups_cached_before_commit(self):
+        data_source = self.factory.create_data_source()
+        group = self.factory.create_group()
+        self.db.session.commit()
+
+        data_source.add_group(group)
+        # Another request caches the groups before the change is committed.
+        redis_connection.set(DataSource._groups_cache_key(data_source.id), json.dumps({}))
+        self.db.session.commit()
+
+        self.assertEqual(data_source.groups[group.id], False)
+
+
 class TestDataSourceIsPaused(BaseTestCase):
     def test_returns_false_by_default(self):
         self.assertFalse(self.factory.data_source.paused)
@@ -73,6 +126,31 @@ class TestDataSourceIsPaused(BaseTestCase):
         self.assertEqual(self.factory.data_source.pause_reason, None)
 
 
+class TestDataSourceQueryRunner(BaseTestCase):
+    def test_reuses_query_runner(self):
+        data_source = self.factory.create_data_source()
+        query_runner = data_source.query_runner
+
+        self.assertIs(query_runner, data_source.query_runner)
+        self.assertEqual(data_source.id, query_runner.data_source_id)
+
+    def test_creates_new_query_runner_when_options_change(self):
+        data_source = self.factory.create_data_source()
+        query_runner = data_source.query_runner
+
+        data_source.options['dbname'] = 'other'
+
+        self.assertIsNot(query_runner, data_source.query_runner)
+        self.assertEqual('test', query_runner.configuration['dbname'])
+        self.assertEqual('other', data_source.query_runner.configuration['dbname'])
+
+    def test_does_not_share_query_runners_between_data_sources(self):
+        data_source = self.factory.create_data_source()
+        other_data_source = self.factory.create_data_source()
+
+        self.assertIsNot(data_source.query_runner, other_data_source.query_runner)
+
+
 class TestDataSourceDelete(BaseTestCase):
     def test_deletes_the_data_source(self):
         data_source = self.factory.create_data_source()
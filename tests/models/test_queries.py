@@ -2,7 +2,7 @@
 
 from tests import BaseTestCase
 import datetime
-from redash.models import Query, Group, Event, db
+from redash.models import Query, Group, Event, EventDailyCount, db
 from redash.utils import utcnow
 
 
@@ -155,6 +155,32 @@ class QueryTest(BaseTestCase):
         self.assertNotIn(q1, queries)
         self.assertIn(q2, queries)
 
+    def test_search_finds_substrings(self):
+        q1 = self.factory.create_query(name="Quarterly revenue")
+        q2 = self.factory.create_query(name="Churn")
+
+        queries = list(Query.search('venu', [self.factory.default_group.id]))
+        self.assertIn(q1, queries)
+        self.assertNotIn(q2, queries)
+
+    def test_search_ranks_name_matches_first(self):
+        q1 = self.factory.create_query(name="Orders", description="Revenue per order")
+        q2 = self.factory.create_query(name="Revenue")
+        db.session.flush()
+
+        queries = list(Query.search('revenue', [self.factory.default_group.id]))
+        self.assertEqual([q2, q1], queries)
+
+    def test_search_caches_results_per_user(self):
+        q1 = self.factory.create_query(name="Revenue")
+        db.session.flush()
+        self.assertEqual([q1], list(Query.search('revenue', [self.factory.default_group.id], user_id=1)))
+
+        self.factory.create_query(name="More revenue")
+        db.session.flush()
+        self.assertEqual([q1], list(Query.search('revenue', [self.factory.default_group.id], user_id=1)))
+        self.assertEqual(2, len(list(Query.search('revenue', [self.factory.default_group.id], user_id=2))))
+
 
 class QueryRecentTest(BaseTestCase):
     def test_global_recent(self):
@@ -164,6 +190,7 @@ class QueryRecentTest(BaseTestCase):
         e = Event(org=self.factory.org, user=self.factory.user, action="edit",
                   object_type="query", object_id=q1.id)
         db.session.add(e)
+        EventDailyCount.rollup()
         recent = Query.recent([self.factory.default_group.id])
         self.assertIn(q1, recent)
         self.assertNotIn(q2, recent)
@@ -180,6 +207,7 @@ class QueryRecentTest(BaseTestCase):
                   action="edit", object_type="query",
                   object_id=q2.id)
         ])
+        EventDailyCount.rollup()
         recent = Query.recent([self.factory.default_group.id])
 
         self.assertIn(q1, recent)
@@ -192,6 +220,7 @@ class QueryRecentTest(BaseTestCase):
         e = Event(org=self.factory.org, user=self.factory.user, action="edit",
                   object_type="query", object_id=q1.id)
         db.session.add(e)
+        EventDailyCount.rollup()
         recent = Query.recent([self.factory.default_group.id], user_id=self.factory.user.id)
 
         self.assertIn(q1, recent)
@@ -211,6 +240,7 @@ class QueryRecentTest(BaseTestCase):
         Event(org=self.factory.org, user=self.factory.user, action="edit",
               object_type="query", object_id=q2.id)
 
+        EventDailyCount.rollup()
         recent = Query.recent([self.factory.default_group.id])
 
         self.assertIn(q1, recent)
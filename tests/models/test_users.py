@@ -57,3 +57,9 @@ class TestUserSearch(BaseTestCase):
         user = self.factory.create_user(name=u'אריק')
 
         assert user in User.search(User.all(user.org), term=u'א')
+
+    def test_search_ranks_name_matches_first(self):
+        user1 = self.factory.create_user(name=u'Jane', email=u'arik@example.com')
+        user2 = self.factory.create_user(name=u'Arik', email=u'arik2@example.com')
+
+        self.assertEqual([user2, user1], list(User.search(User.all(user1.org), term=u'arik')))
@@ -0,0 +1,110 @@
+from unittest import TestCase
+
+import mock
+
+from redash import query_runner
+from redash.query_runner import BaseQueryRunner, ConnectionPool
+
+
+class FakeConnection(object):
+    def __init__(self):
+        self.closed = False
+        self.resets = 0
+
+    def close(self):
+        self.closed = True
+
+
+class FakeQueryRunner(BaseQueryRunner):
+    def _connect(self):
+        return FakeConnection()
+
+    def _is_connection_usable(self, connection, idle_time):
+        return not connection.closed
+
+    def _reset_connection(self, connection):
+        if self.configuration.get('fail_reset'):
+            raise IOError("reset failed")
+        connection.resets += 1
+
+
+class TestConnectionPool(TestCase):
+    def test_reuses_released_connections(self):
+        pool = ConnectionPool(None, max_size=1, max_idle_time=60)
+        connection = FakeConnection()
+        pool.checkin(connection)
+
+        self.assertEqual(connection, pool.checkout()[0])
+        self.assertEqual((None, None), pool.checkout())
+
+    def test_closes_connections_over_max_size(self):
+        pool = ConnectionPool(None, max_size=1, max_idle_time=60)
+        first, second = FakeConnection(), FakeConnection()
+        pool.checkin(first)
+        pool.checkin(second)
+
+        self.assertTrue(second.closed)
+        self.assertEqual(first, pool.checkout()[0])
+
+    def test_closes_expired_connections(self):
+        pool = ConnectionPool(None, max_size=1, max_idle_time=60)
+        connection = FakeConnection()
+
+        with mock.patch('time.time', return_value=1000):
+            pool.checkin(connection)
+
+        with mock.patch('time.time', return_value=1061):
+            self.assertEqual((None, None), pool.checkout())
+
+        self.assertTrue(connection.closed)
+
+
+class TestQueryRunnerConnectionPooling(TestCase):
+    def setUp(self):
+        query_runner._connection_pools.clear()
+
+    def get_runner(self, **configuration):
+        runner = FakeQueryRunner(configuration)
+        runner.data_source_id = 1
+        return runner
+
+    def test_reuses_connections_when_enabled(self):
+        runner = self.get_runner(connection_pooling=True)
+        connection = runner._acquire_connection()
+        runner._release_connection(connection)
+
+        self.assertFalse(connection.closed)
+        self.assertEqual(1, connection.resets)
+        self.assertEqual(connection, runner._acquire_connection())
+
+    def test_closes_connections_failing_to_reset(self):
+        runner = self.get_runner(connection_pooling=True, fail_reset=True)
+        connection = runner._acquire_connection()
+        runner._release_connection(connection)
+
+        self.assertTrue(connection.closed)
+        self.assertNotEqual(connection, runner._acquire_connection())
+
+    def test_closes_connections_when_disabled(self):
+        runner = self.get_runner()
+        connection = runner._acquire_connection()
+        runner._release_connection(connection)
+
+        self.assertTrue(connection.closed)
+        self.assertNotEqual(connection, runner._acquire_connection())
+
+    def test_closes_connections_that_are_not_reusable(self):
+        runner = self.get_runner(connection_pooling=True)
+        connection = runner._acquire_connection()
+        runner._release_connection(connection, reusable=False)
+
+        self.assertTrue(connection.closed)
+
+    def test_resets_pool_when_configuration_changes(self):
+        runner = self.get_runner(connection_pooling=True, host='a')
+        connection = runner._acquire_connection()
+        runner._release_connection(connection)
+
+        changed = self.get_runner(connection_pooling=True, host='b')
+        self.assertNotEqual(connection, changed._acquire_connection())
+        self.assertTrue(connection.closed)
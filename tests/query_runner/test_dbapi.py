@@ -0,0 +1,137 @@
+import json
+from unittest import TestCase
+
+import mock
+
+from redash.query_runner import BaseDBAPIQueryRunner, TYPE_INTEGER, TYPE_STRING
+
+
+class FakeError(Exception):
+    pass
+
+
+class OperationalError(FakeError):
+    pass
+
+
+class FakeCursor(object):
+    def __init__(self, description, rows):
+        self.description = description
+        self.rows = list(rows)
+        self.closed = False
+        self.fetch_sizes = []
+
+    def execute(self, query):
+        if query == 'fail':
+            raise FakeError('Syntax error')
+        if query == 'crash':
+            raise ValueError('crash')
+        if query == 'disconnect':
+            raise OperationalError('Lost connection')
+        if query == 'timeout':
+            raise OperationalError('Statement timeout')
+
+    def fetchmany(self, size):
+        self.fetch_sizes.append(size)
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection(object):
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.closed = False
+
+    def cursor(self):
+        return self._cursor
+
+    def close(self):
+        self.closed = True
+
+
+class FakeQueryRunner(BaseDBAPIQueryRunner):
+    types_map = {1: TYPE_INTEGER, 2: TYPE_STRING}
+
+    def __init__(self, configuration, cursor):
+        super(FakeQueryRunner, self).__init__(configuration)
+        self.cursor = cursor
+
+    def _connect(self):
+        return FakeConnection(self.cursor)
+
+    def is_connection_error(self, e):
+        return isinstance(e, OperationalError) and e.message == 'Lost connection'
+
+    def _get_error_message(self, error):
+        if isinstance(error, FakeError):
+            return error.message
+
+        return None
+
+
+class TestBaseDBAPIQueryRunner(TestCase):
+    description = [('id', 1), ('name', 2)]
+
+    def test_fetches_rows_in_batches(self):
+        cursor = FakeCursor(self.description, [(1, 'a'), (2, 'b'), (3, 'c')])
+
+        with mock.patch('redash.settings.QUERY_RESULTS_FETCH_SIZE', 2):
+            json_data, error = FakeQueryRunner({}, cursor).run_query('SELECT', None)
+
+        data = json.loads(json_data)
+        self.assertIsNone(error)
+        self.assertEqual([TYPE_INTEGER, TYPE_STRING], [c['type'] for c in data['columns']])
+        self.assertEqual([1, 2, 3], [row['id'] for row in data['rows']])
+        self.assertEqual([2, 2, 2], cursor.fetch_sizes)
+        self.assertTrue(cursor.closed)
+
+    def test_stops_fetching_at_row_limit(self):
+        cursor = FakeCursor(self.description, [(i, 'a') for i in range(10)])
+
+        with mock.patch('redash.settings.QUERY_RESULTS_FETCH_SIZE', 3):
+            json_data, error = FakeQueryRunner({'row_limit': 4}, cursor).run_query('SELECT', None)
+
+        data = json.loads(json_data)
+        self.assertEqual(4, len(data['rows']))
+        self.assertTrue(data['metadata']['truncated'])
+        self.assertEqual(2, len(cursor.fetch_sizes))
+
+    def test_returns_row_count(self):
+        cursor = FakeCursor(self.description, [(1, 'a'), (2, 'b'), (3, 'c')])
+
+        json_data, error, row_count = FakeQueryRunner({}, cursor).run_query_with_row_count('SELECT', None)
+
+        self.assertIsNone(error)
+        self.assertEqual(3, row_count)
+
+    def test_returns_positional_rows_when_asked(self):
+        cursor = FakeCursor(self.description, [(1, 'a')])
+        query_runner = FakeQueryRunner({}, cursor)
+
+        json_data, _, _ = query_runner.run_query_with_row_count('SELECT', None, positional_rows=True)
+
+        self.assertEqual([[1, 'a']], json.loads(json_data)['rows'])
+
+    def test_returns_error_without_rows(self):
+        cursor = FakeCursor(None, [])
+        self.assertEqual((None, "No data was returned."), FakeQueryRunner({}, cursor).run_query('UPDATE', None))
+
+    def test_returns_driver_error_messages(self):
+        cursor = FakeCursor(self.description, [])
+        self.assertEqual((None, 'Syntax error'), FakeQueryRunner({}, cursor).run_query('fail', None))
+
+    def test_raises_connection_errors(self):
+        cursor = FakeCursor(self.description, [])
+        self.assertRaises(OperationalError, FakeQueryRunner({}, cursor).run_query, 'disconnect', None)
+
+    def test_returns_operational_errors_of_queries(self):
+        cursor = FakeCursor(self.description, [])
+        self.assertEqual((None, 'Statement timeout'), FakeQueryRunner({}, cursor).run_query('timeout', None))
+
+    def test_raises_other_errors(self):
+        cursor = FakeCursor(self.description, [])
+        self.assertRaises(ValueError, FakeQueryRunner({}, cursor).run_query, 'crash', None)
+        self.assertTrue(cursor.closed)
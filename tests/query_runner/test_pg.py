@@ -0,0 +1,51 @@
+from unittest import TestCase
+
+import mock
+import psycopg2
+from psycopg2.extensions import QueryCanceledError
+
+from redash.query_runner.pg import PostgreSQL, Redshift, _get_cursor_statement
+
+
+class TestGetCursorStatement(TestCase):
+    def test_strips_trailing_semicolon_and_comments(self):
+        self.assertEqual(u"/* Query ID: 1 */ SELECT * FROM a",
+                         _get_cursor_statement(u"/* Query ID: 1 */ SELECT * FROM a; -- done"))
+
+    def test_allows_ctes(self):
+        query = u"WITH x AS (SELECT 1) SELECT * FROM x"
+        self.assertEqual(query, _get_cursor_statement(query))
+
+    def test_ignores_multiple_statements(self):
+        self.assertIsNone(_get_cursor_statement(u"SET search_path TO x; SELECT 1"))
+
+    def test_ignores_other_statements(self):
+        self.assertIsNone(_get_cursor_statement(u"INSERT INTO a VALUES (1)"))
+        self.assertIsNone(_get_cursor_statement(u"SELECT * INTO b FROM a"))
+
+
+class TestIsConnectionError(TestCase):
+    def test_connection_failures(self):
+        query_runner = PostgreSQL({})
+        self.assertTrue(query_runner.is_connection_error(psycopg2.OperationalError("could not connect to server")))
+        self.assertTrue(query_runner.is_connection_error(psycopg2.InterfaceError("connection already closed")))
+
+    def test_ignores_query_errors(self):
+        query_runner = PostgreSQL({})
+        self.assertFalse(query_runner.is_connection_error(QueryCanceledError("canceling statement due to statement timeout")))
+        self.assertFalse(query_runner.is_connection_error(psycopg2.ProgrammingError("syntax error")))
+
+
+class TestResetConnection(TestCase):
+    def reset(self, query_runner):
+        connection = mock.Mock()
+        connection.poll.return_value = psycopg2.extensions.POLL_OK
+        query_runner._reset_connection(connection)
+        return [c[0][0] for c in connection.cursor.return_value.execute.call_args_list]
+
+    def test_discards_session(self):
+        self.assertEqual(["ROLLBACK", "DISCARD ALL"], self.reset(PostgreSQL({})))
+
+    def test_resets_redshift_settings(self):
+        # Redshift doesn't support DISCARD
+        self.assertEqual(["ROLLBACK", "RESET ALL"], self.reset(Redshift({})))
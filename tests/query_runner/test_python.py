@@ -0,0 +1,21 @@
+import json
+
+from tests import BaseTestCase
+from redash.query_runner.python import Python  # noqa: F401, registers the runner
+from redash.utils.configuration import ConfigurationContainer
+
+
+class TestPython(BaseTestCase):
+    def test_executions_dont_share_output(self):
+        data_source = self.factory.create_data_source(type='python', options=ConfigurationContainer({}))
+        query_runner = data_source.query_runner
+
+        query_runner.run_query('print "secret of user A"\nadd_result_row(result, {"a": 1})', None)
+        # the next query of the data source runs on the same instance
+        self.assertIs(query_runner, data_source.query_runner)
+        json_data, error = data_source.query_runner.run_query('add_result_row(result, {"b": 2})', None)
+
+        self.assertIsNone(error)
+        data = json.loads(json_data)
+        self.assertEqual([{'b': 2}], data['rows'])
+        self.assertEqual([], data['log'])
@@ -0,0 +1,26 @@
+from unittest import TestCase
+
+from redash.query_runner import BaseSQLQueryRunner
+
+
+class TestGetSourceTables(TestCase):
+    def get_source_tables(self, query):
+        return BaseSQLQueryRunner({}).get_source_tables(query)
+
+    def test_finds_joined_tables(self):
+        query = "SELECT a.x FROM public.a a JOIN analytics.b AS b ON a.id = b.id LEFT JOIN c USING (id)"
+        self.assertEqual(set(['public.a', 'analytics.b', 'c']), self.get_source_tables(query))
+
+    def test_finds_tables_in_sub_queries(self):
+        query = "SELECT * FROM (SELECT * FROM a) x WHERE id IN (SELECT id FROM b)"
+        self.assertEqual(set(['a', 'b']), self.get_source_tables(query))
+
+    def test_ignores_ctes(self):
+        query = "WITH x AS (SELECT * FROM a) SELECT * FROM x, b"
+        self.assertEqual(set(['a', 'b']), self.get_source_tables(query))
+
+    def test_finds_tables_named_like_keywords(self):
+        self.assertEqual(set(['events']), self.get_source_tables("SELECT * FROM events"))
+
+    def test_no_tables(self):
+        self.assertEqual(set(), self.get_source_tables("SELECT 1"))
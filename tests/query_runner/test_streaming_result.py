@@ -0,0 +1,39 @@
+import json
+from unittest import TestCase
+
+from redash.query_runner import StreamingResult, TYPE_INTEGER
+
+
+class TestStreamingResult(TestCase):
+    columns = [{'name': 'id', 'friendly_name': 'id', 'type': TYPE_INTEGER}]
+
+    def test_encodes_all_batches(self):
+        result = StreamingResult(self.columns)
+        self.assertTrue(result.add_rows([(1,), (2,)]))
+        self.assertTrue(result.add_rows([(3,)]))
+
+        data = json.loads(result.to_json())
+        self.assertEqual(self.columns, data['columns'])
+        self.assertEqual([{'id': 1}, {'id': 2}, {'id': 3}], data['rows'])
+        self.assertNotIn('metadata', data)
+
+    def test_encodes_empty_result(self):
+        data = json.loads(StreamingResult(self.columns).to_json())
+        self.assertEqual([], data['rows'])
+
+    def test_truncates_rows_over_limit(self):
+        result = StreamingResult(self.columns, row_limit=2)
+        self.assertTrue(result.add_rows([(1,), (2,)]))
+        self.assertFalse(result.add_rows([(3,)]))
+
+        data = json.loads(result.to_json())
+        self.assertEqual([{'id': 1}, {'id': 2}], data['rows'])
+        self.assertEqual({'truncated': True, 'row_limit': 2}, data['metadata'])
+
+    def test_encodes_positional_rows(self):
+        result = StreamingResult(self.columns, positional=True)
+        result.add_rows([(1,), (2,)])
+
+        data = json.loads(result.to_json())
+        self.assertEqual([[1], [2]], data['rows'])
+        self.assertEqual('positional', data['row_format'])
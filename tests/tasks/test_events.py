@@ -0,0 +1,97 @@
+import time
+
+from mock import patch
+from sqlalchemy.exc import OperationalError
+from tests import BaseTestCase
+
+from redash import models, recent_queries, redis_connection
+from redash.tasks import enqueue_event, flush_events
+from redash.tasks.general import EVENTS_BUFFER_KEY, EVENTS_DEAD_LETTER_KEY, EVENTS_FLUSH_LOCK_KEY
+
+
+def raw_event(org, object_id):
+    return {
+        'org_id': org.id,
+        'action': 'view',
+        'object_type': 'dashboard',
+        'object_id': object_id,
+        'timestamp': int(time.time()),
+        'ip': '127.0.0.1'
+    }
+
+
+@patch('redash.tasks.general.settings.EVENTS_BUFFER_ENABLED', True)
+class TestFlushEvents(BaseTestCase):
+    def test_enqueue_event_buffers_in_redis(self):
+        with patch('redash.tasks.general.record_event.delay') as record_event:
+            enqueue_event(raw_event(self.factory.org, '1'))
+            record_event.assert_not_called()
+
+        self.assertEqual(1, redis_connection.llen(EVENTS_BUFFER_KEY))
+
+    def test_records_buffered_events(self):
+        for i in range(5):
+            enqueue_event(raw_event(self.factory.org, str(i)))
+
+        with patch('redash.tasks.general.settings.EVENTS_FLUSH_BATCH_SIZE', 2):
+            flush_events()
+
+        events = models.Event.query.order_by(models.Event.id).all()
+        self.assertEqual(['0', '1', '2', '3', '4'], [e.object_id for e in events])
+        self.assertEqual({'ip': '127.0.0.1'}, events[0].additional_properties)
+        self.assertEqual(0, redis_connection.llen(EVENTS_BUFFER_KEY))
+
+    def test_forwards_batches_to_webhooks(self):
+        for i in range(3):
+            enqueue_event(raw_event(self.factory.org, str(i)))
+
+        with patch('redash.tasks.general.settings.EVENT_REPORTING_WEBHOOKS', ['http://example.com/hook']), \
+                patch('redash.tasks.general.requests.post') as post:
+            post.return_value.status_code = 200
+            flush_events()
+
+        self.assertEqual(1, post.call_count)
+        data = post.call_args[1]['json']['data']
+        self.assertEqual(3, len(data))
+        self.assertEqual('0', data[0]['object_id'])
+
+    def test_moves_malformed_events_to_dead_letter(self):
+        enqueue_event(raw_event(self.factory.org, '0'))
+        redis_connection.rpush(EVENTS_BUFFER_KEY, 'not json')
+        enqueue_event(raw_event(self.factory.org, '2'))
+
+        flush_events()
+
+        events = models.Event.query.order_by(models.Event.id).all()
+        self.assertEqual(['0', '2'], [e.object_id for e in events])
+        self.assertEqual(0, redis_connection.llen(EVENTS_BUFFER_KEY))
+        self.assertEqual(['not json'], redis_connection.lrange(EVENTS_DEAD_LETTER_KEY, 0, -1))
+
+    def test_keeps_events_buffered_when_the_database_fails(self):
+        for i in range(3):
+            enqueue_event(raw_event(self.factory.org, str(i)))
+
+        with patch.object(models.Event, 'record_batch', side_effect=OperationalError('', {}, None)):
+            self.assertRaises(OperationalError, flush_events)
+
+        self.assertEqual(3, redis_connection.llen(EVENTS_BUFFER_KEY))
+        self.assertFalse(redis_connection.exists(EVENTS_FLUSH_LOCK_KEY))
+
+    def test_skips_flush_while_another_one_runs(self):
+        enqueue_event(raw_event(self.factory.org, '0'))
+        redis_connection.set(EVENTS_FLUSH_LOCK_KEY, 1)
+
+        flush_events()
+
+        self.assertEqual(1, redis_connection.llen(EVENTS_BUFFER_KEY))
+
+    def test_counts_recent_queries_of_committed_events_only(self):
+        event = dict(raw_event(self.factory.org, '1'), object_type='query', user_id=self.factory.user.id)
+
+        models.Event.record_batch([dict(event)])
+        models.db.session.rollback()
+        self.assertEqual([], recent_queries.get(self.factory.user.id))
+
+        models.Event.record_batch([dict(event)])
+        models.db.session.commit()
+        self.assertEqual([1], recent_queries.get(self.factory.user.id))
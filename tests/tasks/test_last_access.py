@@ -0,0 +1,74 @@
+import datetime
+
+from tests import BaseTestCase
+
+from redash import last_access, models
+from redash.tasks import suspend_idle_queries, sync_last_access
+from redash.utils import utcnow
+
+
+class TestLastAccess(BaseTestCase):
+    def test_sync_updates_queries(self):
+        query = self.factory.create_query(last_accessed_at=utcnow() - datetime.timedelta(days=10))
+        models.db.session.commit()
+
+        updated_at = query.updated_at
+        last_access.record('query', query.id)
+        sync_last_access()
+
+        query = models.Query.query.get(query.id)
+        self.assertGreater(query.last_accessed_at, utcnow() - datetime.timedelta(minutes=1))
+        self.assertEqual(updated_at, query.updated_at)
+        self.assertEqual({}, last_access.pop()['query'])
+
+    def test_sync_updates_dashboard_queries(self):
+        query = self.factory.create_query(last_accessed_at=utcnow() - datetime.timedelta(days=10),
+                                          schedule_suspended_at=utcnow())
+        visualization = self.factory.create_visualization(query_rel=query)
+        widget = self.factory.create_widget(visualization=visualization)
+        models.db.session.commit()
+
+        dashboard_updated_at = widget.dashboard.updated_at
+        last_access.record('dashboard', widget.dashboard_id)
+        sync_last_access()
+
+        query = models.Query.query.get(query.id)
+        self.assertGreater(query.last_accessed_at, utcnow() - datetime.timedelta(minutes=1))
+        self.assertIsNone(query.schedule_suspended_at)
+        self.assertEqual(dashboard_updated_at, models.Dashboard.query.get(widget.dashboard_id).updated_at)
+
+    def test_suspends_idle_queries(self):
+        idle = self.factory.create_query(schedule="3600", last_accessed_at=utcnow() - datetime.timedelta(days=10))
+        active = self.factory.create_query(schedule="3600", last_accessed_at=utcnow() - datetime.timedelta(days=1))
+        self.factory.org.set_setting('suspend_idle_queries_after', 7)
+        models.db.session.commit()
+
+        suspend_idle_queries()
+
+        self.assertIsNotNone(models.Query.query.get(idle.id).schedule_suspended_at)
+        self.assertIsNone(models.Query.query.get(active.id).schedule_suspended_at)
+        self.assertNotIn(idle, models.Query.outdated_queries())
+
+    def test_doesnt_suspend_queries_with_alerts(self):
+        query = self.factory.create_query(schedule="3600", last_accessed_at=utcnow() - datetime.timedelta(days=10))
+        self.factory.create_alert(query_rel=query)
+        self.factory.org.set_setting('suspend_idle_queries_after', 7)
+        models.db.session.commit()
+
+        suspend_idle_queries()
+
+        self.assertIsNone(models.Query.query.get(query.id).schedule_suspended_at)
+
+    def test_resumes_suspended_queries_when_viewed(self):
+        query = self.factory.create_query(schedule="3600", schedule_suspended_at=utcnow())
+        models.db.session.commit()
+
+        admin = self.factory.create_admin()
+        models.db.session.commit()
+        rv = self.make_request('get', '/api/admin/queries/suspended', org=False, user=admin)
+        self.assertEqual([query.id], [q['id'] for q in rv.json['queries']])
+
+        last_access.record('query', query.id)
+        sync_last_access()
+
+        self.assertIsNone(models.Query.query.get(query.id).schedule_suspended_at)
@@ -3,12 +3,15 @@ from collections import namedtuple
 import uuid
 
 import mock
+import psycopg2
+from psycopg2.extensions import QueryCanceledError
 
 from tests import BaseTestCase
-from redash import redis_connection, models
+from redash import circuit_breaker, redis_connection, models, runtime_history
 from redash.query_runner.pg import PostgreSQL
+from redash.utils import gen_query_hash
 from redash.tasks.queries import (QueryExecutionError, QueryTaskTracker,
-                                  enqueue_query, execute_query)
+                                  enqueue_query, execute_query, store_query_result)
 
 
 class TestPrune(TestCase):
@@ -73,6 +76,18 @@ class TestEnqueueTask(BaseTestCase):
         self.assertEqual(0, redis_connection.zcard(QueryTaskTracker.IN_PROGRESS_LIST))
         self.assertEqual(0, redis_connection.zcard(QueryTaskTracker.DONE_LIST))
 
+    def test_routes_slow_queries_to_slow_queue(self):
+        query = self.factory.create_query()
+        execute_query.apply_async = mock.MagicMock(side_effect=gen_hash)
+        runtime_history.record(query.data_source.id, query.query_hash, query.id, 1200, 10)
+
+        with mock.patch('redash.tasks.queries.settings.SLOW_QUERY_THRESHOLD', 600):
+            enqueue_query(query.query_text, query.data_source, query.user_id, None, {'Query ID': query.id})
+            enqueue_query(query.query_text + '2', query.data_source, query.user_id, None, {'Query ID': 'adhoc'})
+
+        queues = [c[1]['queue'] for c in execute_query.apply_async.call_args_list]
+        self.assertEqual(['queries_slow', 'queries'], queues)
+
 
 class QueryExecutorTests(BaseTestCase):
 
@@ -81,13 +96,67 @@ class QueryExecutorTests(BaseTestCase):
         ``execute_query`` invokes the query runner and stores a query result.
         """
         cm = mock.patch("celery.app.task.Context.delivery_info", {'routing_key': 'test'})
-        with cm, mock.patch.object(PostgreSQL, "run_query") as qr:
-            qr.return_value = ([1, 2], None)
+        with cm, mock.patch.object(PostgreSQL, "run_query_with_row_count") as qr:
+            qr.return_value = ([1, 2], None, None)
             result_id = execute_query("SELECT 1, 2", self.factory.data_source.id, {})
             self.assertEqual(1, qr.call_count)
             result = models.QueryResult.query.get(result_id)
             self.assertEqual(result.data, '{1,2}')
 
+    @mock.patch('redash.tasks.queries.settings.QUERY_RESULTS_QUEUE', 'results')
+    def test_success_stores_result_in_separate_task(self):
+        cm = mock.patch("celery.app.task.Context.delivery_info", {'routing_key': 'test'})
+        with cm, mock.patch.object(PostgreSQL, "run_query_with_row_count") as qr, \
+                mock.patch.object(execute_query, 'replace') as replace:
+            qr.return_value = ('{"columns": [], "rows": []}', None, 0)
+            execute_query("SELECT 1, 2", self.factory.data_source.id, {})
+
+            self.assertEqual(0, models.QueryResult.query.count())
+            signature = replace.call_args[0][0]
+            self.assertEqual(store_query_result.name, signature.task)
+            self.assertEqual('results', signature.options['queue'])
+            # the data is staged rather than sent along
+            staged_data_key = signature.args[3]
+            self.assertEqual('{"columns": [], "rows": []}', redis_connection.get(staged_data_key))
+
+            result_id = store_query_result(*signature.args)
+
+        result = models.QueryResult.query.get(result_id)
+        self.assertEqual('{"columns": [], "rows": []}', result.data)
+        self.assertFalse(redis_connection.exists(staged_data_key))
+
+    @mock.patch('redash.tasks.queries.settings.QUERY_RESULTS_QUEUE', 'results')
+    @mock.patch('redash.tasks.queries.settings.QUERY_RESULTS_STAGING_MAX_SIZE', 10)
+    def test_success_stores_large_result_in_same_task(self):
+        cm = mock.patch("celery.app.task.Context.delivery_info", {'routing_key': 'test'})
+        with cm, mock.patch.object(PostgreSQL, "run_query_with_row_count") as qr, \
+                mock.patch.object(execute_query, 'replace') as replace:
+            qr.return_value = ('{"columns": [], "rows": []}', None, 0)
+            result_id = execute_query("SELECT 1, 2", self.factory.data_source.id, {})
+
+        replace.assert_not_called()
+        self.assertEqual('{"columns": [], "rows": []}', models.QueryResult.query.get(result_id).data)
+
+    def test_failed_store_deletes_staged_data(self):
+        staged_data_key = 'query_result:test:staged_data'
+        redis_connection.set(staged_data_key, '{"columns": [], "rows": []}')
+
+        with mock.patch.object(models.QueryResult, 'store_result', side_effect=ValueError("broken")):
+            with self.assertRaises(ValueError):
+                store_query_result("SELECT 1, 2", self.factory.data_source.id, {}, staged_data_key, 1)
+
+        self.assertFalse(redis_connection.exists(staged_data_key))
+
+    def test_success_records_runtime(self):
+        cm = mock.patch("celery.app.task.Context.delivery_info", {'routing_key': 'test'})
+        with cm, mock.patch.object(PostgreSQL, "run_query_with_row_count") as qr:
+            qr.return_value = ('{"columns": [], "rows": [{}, {}]}', None, 2)
+            execute_query("SELECT 1, 2", self.factory.data_source.id, {})
+
+        stats = runtime_history.get(self.factory.data_source.id, gen_query_hash("SELECT 1, 2"))
+        self.assertEqual(1, stats['runs'])
+        self.assertEqual(2, stats['rows_p50'])
+
     def test_success_scheduled(self):
         """
         Scheduled queries remember their latest results.
@@ -95,8 +164,8 @@ class QueryExecutorTests(BaseTestCase):
         cm = mock.patch("celery.app.task.Context.delivery_info",
                         {'routing_key': 'test'})
         q = self.factory.create_query(query_text="SELECT 1, 2", schedule=300)
-        with cm, mock.patch.object(PostgreSQL, "run_query") as qr:
-            qr.return_value = ([1, 2], None)
+        with cm, mock.patch.object(PostgreSQL, "run_query_with_row_count") as qr:
+            qr.return_value = ([1, 2], None, None)
             result_id = execute_query(
                 "SELECT 1, 2",
                 self.factory.data_source.id, {},
@@ -106,6 +175,24 @@ class QueryExecutorTests(BaseTestCase):
             result = models.QueryResult.query.get(result_id)
             self.assertEqual(q.latest_query_data, result)
 
+    def test_incremental_without_previous_result_refreshes_in_full(self):
+        cm = mock.patch("celery.app.task.Context.delivery_info", {'routing_key': 'test'})
+        query_text = "SELECT * FROM events {{#last_watermark}}WHERE id > {{last_watermark}}{{/last_watermark}}"
+        q = self.factory.create_query(query_text=query_text, schedule=300, last_watermark='2',
+                                      options={'incremental': {'column': 'id'}})
+        with cm, mock.patch.object(PostgreSQL, "run_query_with_row_count") as qr, \
+                mock.patch('redash.tasks.queries.enqueue_query') as enqueue:
+            qr.return_value = ('{"columns": [{"name": "id"}], "rows": [{"id": 3}]}', None, 1)
+            result_id = execute_query("SELECT * FROM events WHERE id > 2", self.factory.data_source.id,
+                                      {'Last Watermark': '2'}, scheduled_query_id=q.id)
+
+        self.assertIsNone(result_id)
+        self.assertEqual(0, models.QueryResult.query.count())
+        q = models.Query.get_by_id(q.id)
+        self.assertIsNone(q.last_watermark)
+        self.assertEqual("SELECT * FROM events ", enqueue.call_args[0][0])
+        self.assertNotIn('Last Watermark', enqueue.call_args[1]['metadata'])
+
     def test_failure_scheduled(self):
         """
         Scheduled queries that fail have their failure recorded.
@@ -113,7 +200,7 @@ class QueryExecutorTests(BaseTestCase):
         cm = mock.patch("celery.app.task.Context.delivery_info",
                         {'routing_key': 'test'})
         q = self.factory.create_query(query_text="SELECT 1, 2", schedule=300)
-        with cm, mock.patch.object(PostgreSQL, "run_query") as qr:
+        with cm, mock.patch.object(PostgreSQL, "run_query_with_row_count") as qr:
             qr.side_effect = ValueError("broken")
             with self.assertRaises(QueryExecutionError):
                 execute_query("SELECT 1, 2", self.factory.data_source.id, {},
@@ -126,6 +213,27 @@ class QueryExecutorTests(BaseTestCase):
             q = models.Query.get_by_id(q.id)
             self.assertEqual(q.schedule_failures, 2)
 
+    @mock.patch('redash.circuit_breaker.settings.CIRCUIT_BREAKER_THRESHOLD', 1)
+    def test_connection_failure_opens_circuit(self):
+        cm = mock.patch("celery.app.task.Context.delivery_info", {'routing_key': 'test'})
+        with cm, mock.patch.object(PostgreSQL, "run_query_with_row_count") as qr:
+            qr.side_effect = psycopg2.OperationalError("could not connect to server")
+            with self.assertRaises(QueryExecutionError):
+                execute_query("SELECT 1, 2", self.factory.data_source.id, {})
+
+        self.assertIn(self.factory.data_source.id, circuit_breaker.open_circuits())
+
+    @mock.patch('redash.circuit_breaker.settings.CIRCUIT_BREAKER_THRESHOLD', 1)
+    def test_query_failure_keeps_circuit_closed(self):
+        cm = mock.patch("celery.app.task.Context.delivery_info", {'routing_key': 'test'})
+        with cm, mock.patch.object(PostgreSQL, "run_query_with_row_count") as qr:
+            # an OperationalError, though the data source is fine
+            qr.side_effect = QueryCanceledError("canceling statement due to statement timeout")
+            with self.assertRaises(QueryExecutionError):
+                execute_query("SELECT 1, 2", self.factory.data_source.id, {})
+
+        self.assertNotIn(self.factory.data_source.id, circuit_breaker.open_circuits())
+
     def test_success_after_failure(self):
         """
         Query execution success resets the failure counter.
@@ -133,7 +241,7 @@ class QueryExecutorTests(BaseTestCase):
         cm = mock.patch("celery.app.task.Context.delivery_info",
                         {'routing_key': 'test'})
         q = self.factory.create_query(query_text="SELECT 1, 2", schedule=300)
-        with cm, mock.patch.object(PostgreSQL, "run_query") as qr:
+        with cm, mock.patch.object(PostgreSQL, "run_query_with_row_count") as qr:
             qr.side_effect = ValueError("broken")
             with self.assertRaises(QueryExecutionError):
                 execute_query("SELECT 1, 2",
@@ -142,8 +250,8 @@ class QueryExecutorTests(BaseTestCase):
             q = models.Query.get_by_id(q.id)
             self.assertEqual(q.schedule_failures, 1)
 
-        with cm, mock.patch.object(PostgreSQL, "run_query") as qr:
-            qr.return_value = ([1, 2], None)
+        with cm, mock.patch.object(PostgreSQL, "run_query_with_row_count") as qr:
+            qr.return_value = ([1, 2], None, None)
             execute_query("SELECT 1, 2",
                           self.factory.data_source.id, {},
                           scheduled_query_id=q.id)
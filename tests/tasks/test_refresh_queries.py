@@ -1,7 +1,12 @@
+import time
+
 from mock import patch, call, ANY
 from tests import BaseTestCase
+from redash import runtime_history
+from redash.query_runner.pg import PostgreSQL
 from redash.tasks import refresh_queries
-from redash.models import Query
+from redash.tasks.queries import QueryTaskTracker
+from redash.models import Query, db, scheduled_queries_executions
 
 
 class TestRefreshQuery(BaseTestCase):
@@ -65,3 +70,115 @@ class TestRefreshQuery(BaseTestCase):
             add_job_mock.assert_called_with(
                 "select 42", query.data_source, query.user_id,
                 scheduled_query=query, metadata=ANY)
+
+    def test_enqueues_incremental_queries_with_watermark(self):
+        query = self.factory.create_query(
+            query_text="select * from events{{#last_watermark}} where id > {{last_watermark}}{{/last_watermark}}",
+            options={"incremental": {"column": "id"}})
+        oq = staticmethod(lambda: [query])
+        with patch('redash.tasks.queries.enqueue_query') as add_job_mock, \
+                patch.object(Query, 'outdated_queries', oq):
+            refresh_queries()
+            add_job_mock.assert_called_with(
+                "select * from events", query.data_source, query.user_id,
+                scheduled_query=query, metadata={'Query ID': query.id, 'Username': 'Scheduled'})
+
+            query.last_watermark = "42"
+            refresh_queries()
+            add_job_mock.assert_called_with(
+                "select * from events where id > 42", query.data_source, query.user_id,
+                scheduled_query=query,
+                metadata={'Query ID': query.id, 'Username': 'Scheduled', 'Last Watermark': "42"})
+
+    def test_enqueues_incremental_queries_with_invalid_watermark_in_full(self):
+        query = self.factory.create_query(
+            query_text="select * from events{{#last_watermark}} where id > {{last_watermark}}{{/last_watermark}}",
+            options={"incremental": {"column": "id"}}, last_watermark="0; drop table events")
+        oq = staticmethod(lambda: [query])
+        with patch('redash.tasks.queries.enqueue_query') as add_job_mock, \
+                patch.object(Query, 'outdated_queries', oq):
+            refresh_queries()
+            add_job_mock.assert_called_with(
+                "select * from events", query.data_source, query.user_id,
+                scheduled_query=query, metadata={'Query ID': query.id, 'Username': 'Scheduled'})
+
+    def test_skips_queries_with_unchanged_source_tables(self):
+        query = self.factory.create_query(query_text="SELECT * FROM events")
+        oq = staticmethod(lambda: [query])
+        versions = {'events': '1'}
+
+        with patch('redash.tasks.queries.enqueue_query') as add_job_mock, \
+                patch.object(Query, 'outdated_queries', oq), \
+                patch.object(PostgreSQL, 'get_table_versions', side_effect=lambda: versions):
+            # no result yet
+            refresh_queries()
+            self.assertEqual(1, add_job_mock.call_count)
+
+            # the task's app context removed the session
+            db.session.add(query)
+            query.latest_query_data = self.factory.create_query_result(query_text=query.query_text)
+            db.session.flush()
+            # the versions were only seen now
+            refresh_queries()
+            self.assertEqual(2, add_job_mock.call_count)
+
+            db.session.add(query)
+            query.latest_query_data = self.factory.create_query_result(query_text=query.query_text)
+            db.session.flush()
+            refresh_queries()
+            self.assertEqual(2, add_job_mock.call_count)
+            skipped = QueryTaskTracker.all(QueryTaskTracker.DONE_LIST)
+            self.assertEqual(['skipped'], [t.state for t in skipped])
+            scheduled_queries_executions.refresh()
+            self.assertIsNotNone(scheduled_queries_executions.get(query.id))
+
+            versions['events'] = '2'
+            refresh_queries()
+            self.assertEqual(3, add_job_mock.call_count)
+
+    def test_spreads_refreshes_over_window(self):
+        queries = [self.factory.create_query(query_text="SELECT {}".format(i)) for i in range(3)]
+        data_source = queries[0].data_source
+        for query in queries:
+            query.data_source = data_source
+        db.session.flush()
+        for query in queries:
+            # long running, so they're still expected to run on the next refresh
+            runtime_history.record(data_source.id, query.query_hash, query.id, 1000, None)
+        oq = staticmethod(lambda: queries)
+
+        with patch('redash.tasks.queries.enqueue_query') as add_job_mock, \
+                patch.object(Query, 'outdated_queries', oq), \
+                patch('redash.tasks.queries.settings.SCHEDULE_SPREAD_WINDOW', 300), \
+                patch('redash.tasks.queries.settings.SCHEDULE_TARGET_CONCURRENCY', 2):
+            refresh_queries()
+            self.assertEqual(2, add_job_mock.call_count)
+
+            with patch('redash.tasks.queries.time.time', return_value=time.time() + 301):
+                refresh_queries()
+            # the remaining query waited for the whole window
+            self.assertEqual(3, add_job_mock.call_count)
+
+    def test_expects_runtimes_from_history(self):
+        queries = [self.factory.create_query(query_text="SELECT {}".format(i)) for i in range(3)]
+        data_source = queries[0].data_source
+        for query in queries:
+            query.data_source = data_source
+        db.session.flush()
+        for query in queries:
+            # a single slow run doesn't make the query long running
+            for run_time in [1000] + [1] * 19:
+                runtime_history.record(data_source.id, query.query_hash, query.id, run_time, None)
+        oq = staticmethod(lambda: queries)
+
+        with patch('redash.tasks.queries.enqueue_query') as add_job_mock, \
+                patch.object(Query, 'outdated_queries', oq), \
+                patch('redash.tasks.queries.settings.SCHEDULE_SPREAD_WINDOW', 300), \
+                patch('redash.tasks.queries.settings.SCHEDULE_TARGET_CONCURRENCY', 2):
+            refresh_queries()
+            self.assertEqual(2, add_job_mock.call_count)
+
+            with patch('redash.tasks.queries.time.time', return_value=time.time() + 10):
+                refresh_queries()
+            # the queries that were refreshed are expected to be done, so two more are
+            self.assertEqual(4, add_job_mock.call_count)
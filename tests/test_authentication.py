@@ -9,7 +9,7 @@ from tests import BaseTestCase
 from redash import models, settings
 from redash.authentication import (api_key_load_user_from_request,
                                    get_login_url, hmac_load_user_from_request,
-                                   sign)
+                                   load_user, sign)
 from redash.authentication.google_oauth import (create_and_login_user,
                                                 verify_profile)
 
@@ -117,6 +117,85 @@ class TestHMACAuthentication(BaseTestCase):
             self.assertEqual(user.id, hmac_load_user_from_request(request).id)
 
 
+@patch('redash.models.settings.AUTH_CACHE_ENABLED', True)
+class TestAuthenticationCache(BaseTestCase):
+    def setUp(self):
+        super(TestAuthenticationCache, self).setUp()
+        self.queries_url = '/{}/api/queries'.format(self.factory.org.slug)
+
+    def tearDown(self):
+        models.auth_cache.local.clear()
+        super(TestAuthenticationCache, self).tearDown()
+
+    def test_caches_user_api_key_lookup(self):
+        user = self.factory.create_user(api_key="user_key")
+        models.db.session.commit()
+
+        with self.app.test_client() as c:
+            c.get(self.queries_url, query_string={'api_key': user.api_key})
+            self.assertEqual(user.id, api_key_load_user_from_request(request).id)
+
+            with patch('redash.models.User.get_by_api_key_and_org') as get_by_api_key_and_org:
+                self.assertEqual(user.id, api_key_load_user_from_request(request).id)
+                get_by_api_key_and_org.assert_not_called()
+
+    def test_caches_api_key_lookup(self):
+        dashboard = self.factory.create_dashboard()
+        api_key = models.ApiKey.create_for_object(dashboard, self.factory.user)
+        models.db.session.commit()
+
+        with self.app.test_client() as c:
+            c.get(self.queries_url, query_string={'api_key': api_key.api_key})
+            self.assertEqual(api_key.api_key, api_key_load_user_from_request(request).id)
+
+            with patch('redash.models.User.get_by_api_key_and_org') as get_by_api_key_and_org, \
+                    patch('redash.models.ApiKey.get_by_api_key') as get_by_api_key:
+                self.assertEqual(api_key.api_key, api_key_load_user_from_request(request).id)
+                get_by_api_key_and_org.assert_not_called()
+                get_by_api_key.assert_not_called()
+
+    def test_deactivated_api_key_is_rejected(self):
+        dashboard = self.factory.create_dashboard()
+        api_key = models.ApiKey.create_for_object(dashboard, self.factory.user)
+        models.db.session.commit()
+
+        with self.app.test_client() as c:
+            c.get(self.queries_url, query_string={'api_key': api_key.api_key})
+            self.assertIsNotNone(api_key_load_user_from_request(request))
+
+            api_key.active = False
+            models.db.session.commit()
+            self.assertIsNone(api_key_load_user_from_request(request))
+
+    def test_disabled_user_is_rejected(self):
+        user = self.factory.create_user()
+        models.db.session.commit()
+
+        with self.app.test_client() as c:
+            c.get(self.queries_url)
+            self.assertEqual(user.id, load_user(user.id).id)
+
+            user.disable()
+            models.db.session.commit()
+            self.assertIsNone(load_user(user.id))
+
+    def test_drops_rows_cached_before_commit(self):
+        user = self.factory.create_user()
+        models.db.session.commit()
+
+        with self.app.test_client() as c:
+            c.get(self.queries_url)
+            cached_row = user._cached_row()
+
+            user.disable()
+            models.db.session.flush()
+            # Another request caches the user before the change is committed.
+            models.auth_cache.set(models.User._row_cache_key(user.id), cached_row)
+            models.db.session.commit()
+
+            self.assertIsNone(load_user(user.id))
+
+
 class TestCreateAndLoginUser(BaseTestCase):
     def test_logins_valid_user(self):
         user = self.factory.create_user(email=u'test@example.com')
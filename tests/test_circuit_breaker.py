@@ -0,0 +1,61 @@
+from mock import patch
+from tests import BaseTestCase
+
+from redash import circuit_breaker
+from redash.query_runner.pg import PostgreSQL
+from redash.tasks import probe_circuit_breakers
+
+
+@patch('redash.circuit_breaker.settings.CIRCUIT_BREAKER_THRESHOLD', 3)
+class TestCircuitBreaker(BaseTestCase):
+    def test_opens_after_consecutive_failures(self):
+        data_source = self.factory.data_source
+
+        circuit_breaker.record_failure(data_source)
+        circuit_breaker.record_failure(data_source)
+        circuit_breaker.record_success(data_source)
+        circuit_breaker.record_failure(data_source)
+        circuit_breaker.record_failure(data_source)
+        self.assertFalse(data_source.paused)
+
+        circuit_breaker.record_failure(data_source)
+        self.assertTrue(data_source.paused)
+        self.assertEqual(circuit_breaker.PAUSE_REASON, data_source.pause_reason)
+        self.assertIn(data_source.id, circuit_breaker.open_circuits())
+
+    def open_circuit(self, data_source):
+        for _ in range(3):
+            circuit_breaker.record_failure(data_source)
+
+    def test_probe_closes_circuit_on_success(self):
+        data_source = self.factory.data_source
+
+        with patch('redash.circuit_breaker.settings.CIRCUIT_BREAKER_PROBE_INTERVAL', 0), \
+                patch.object(PostgreSQL, 'test_connection') as test_connection:
+            self.open_circuit(data_source)
+            probe_circuit_breakers()
+
+        test_connection.assert_called_once_with()
+        self.assertFalse(data_source.paused)
+        self.assertEqual({}, circuit_breaker.open_circuits())
+
+    def test_probe_backs_off_on_failure(self):
+        data_source = self.factory.data_source
+        with patch('redash.circuit_breaker.settings.CIRCUIT_BREAKER_PROBE_INTERVAL', 0):
+            self.open_circuit(data_source)
+
+        with patch.object(PostgreSQL, 'test_connection', side_effect=Exception("down")):
+            probe_circuit_breakers()
+
+        state = circuit_breaker.open_circuits()[data_source.id]
+        self.assertEqual(1, state['attempts'])
+        self.assertTrue(data_source.paused)
+
+    def test_closes_circuit_when_resumed_by_hand(self):
+        data_source = self.factory.data_source
+        self.open_circuit(data_source)
+        data_source.resume()
+
+        probe_circuit_breakers()
+
+        self.assertEqual({}, circuit_breaker.open_circuits())
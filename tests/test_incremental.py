@@ -0,0 +1,119 @@
+import json
+from unittest import TestCase
+
+from tests import BaseTestCase
+from redash import incremental
+from redash.utils import POSITIONAL_ROWS, gen_query_hash
+
+
+def result(*ids):
+    return {'columns': [{'name': 'id', 'type': 'integer'}], 'rows': [{'id': i} for i in ids]}
+
+
+class TestMerge(TestCase):
+    def test_appends_new_rows(self):
+        self.assertEqual(result(1, 2, 3), incremental.merge(result(1, 2), result(3), 'id'))
+
+    def test_keeps_latest_rows_up_to_max_rows(self):
+        self.assertEqual(result(2, 3), incremental.merge(result(1, 2), result(3), 'id', max_rows=2))
+
+    def test_keeps_rows_within_window(self):
+        self.assertEqual(result(8, 10), incremental.merge(result(1, 8), result(10), 'id', window=5))
+
+    def test_keeps_dates_within_window(self):
+        previous = {'columns': [{'name': 'day', 'type': 'date'}],
+                    'rows': [{'day': '2018-01-01T00:00:00'}, {'day': '2018-01-20T00:00:00'}]}
+        data = {'columns': previous['columns'], 'rows': [{'day': '2018-01-31T00:00:00'}]}
+
+        merged = incremental.merge(previous, data, 'day', window=20 * 24 * 3600)
+        self.assertEqual([{'day': '2018-01-20T00:00:00'}, {'day': '2018-01-31T00:00:00'}], merged['rows'])
+
+    def test_uses_row_format_of_new_rows(self):
+        data = dict(result(), rows=[[3]], row_format=POSITIONAL_ROWS)
+
+        merged = incremental.merge(result(1, 2), data, 'id')
+        self.assertEqual([[1], [2], [3]], merged['rows'])
+        self.assertEqual(POSITIONAL_ROWS, merged['row_format'])
+
+    def test_returns_none_when_columns_differ(self):
+        data = {'columns': [{'name': 'other', 'type': 'integer'}], 'rows': []}
+        self.assertIsNone(incremental.merge(result(1), data, 'id'))
+
+
+class TestGetWatermark(TestCase):
+    def test_compares_numbers(self):
+        data = {'columns': [{'name': 'id', 'type': 'string'}], 'rows': [{'id': '9'}, {'id': '10'}]}
+        self.assertEqual('10', incremental.get_watermark(data, 'id'))
+
+    def test_compares_timestamps_in_utc(self):
+        data = {'columns': [{'name': 'at', 'type': 'datetime'}],
+                'rows': [{'at': '2018-01-01T12:00:00+00:00'}, {'at': '2018-01-01 13:00:00+02:00'},
+                         {'at': 'Jan 1 2018 11:30'}]}
+        self.assertEqual('2018-01-01T12:00:00+00:00', incremental.get_watermark(data, 'at'))
+
+    def test_skips_other_values(self):
+        data = {'columns': [{'name': 'id', 'type': 'string'}], 'rows': [{'id': 'x'}, {'id': None}, {'id': 3}]}
+        self.assertEqual(3, incremental.get_watermark(data, 'id'))
+
+
+class TestToSQLLiteral(TestCase):
+    def test_numbers(self):
+        self.assertEqual(u'42', incremental.to_sql_literal('42'))
+        self.assertEqual(u'0.1', incremental.to_sql_literal(0.1))
+
+    def test_quotes_timestamps(self):
+        self.assertEqual(u"'2018-01-01 10:00:00.500000+02:00'",
+                         incremental.to_sql_literal('2018-01-01T10:00:00.5+02:00'))
+
+    def test_rejects_other_values(self):
+        for value in ("x' OR 1=1 --", 'nan', True, None, [1]):
+            self.assertIsNone(incremental.to_sql_literal(value))
+
+    def test_isnt_escaped_when_rendered(self):
+        params = {'last_watermark': incremental.to_sql_literal('2018-01-01'), 'name': "'a'"}
+        self.assertEqual("at > '2018-01-01 00:00:00' and name = &#x27;a&#x27;",
+                         incremental.render("at > {{last_watermark}} and name = {{name}}", params))
+
+
+class TestRefreshResult(BaseTestCase):
+    def setUp(self):
+        super(TestRefreshResult, self).setUp()
+        self.query = self.factory.create_query(query_text="select * from events",
+                                               options={'incremental': {'column': 'id'}})
+
+    def test_replaces_result_without_watermark(self):
+        data = incremental.refresh_result(self.query, json.dumps(result(1, 2)), None)
+
+        self.assertEqual(result(1, 2), json.loads(data))
+        self.assertEqual('2', self.query.last_watermark)
+
+    def test_merges_with_previous_result(self):
+        self.query.latest_query_data = self.factory.create_query_result(
+            query_text=self.query.query_text, query_hash=gen_query_hash(self.query.query_text),
+            data=json.dumps(result(1, 2)))
+
+        data = incremental.refresh_result(self.query, json.dumps(result(3)), '2')
+
+        self.assertEqual(result(1, 2, 3), json.loads(data))
+        self.assertEqual('3', self.query.last_watermark)
+
+    def test_requires_full_refresh_without_previous_result(self):
+        self.query.last_watermark = '2'
+
+        self.assertIsNone(incremental.refresh_result(self.query, json.dumps(result(3)), '2'))
+        self.assertIsNone(self.query.last_watermark)
+
+    def test_requires_full_refresh_when_previous_result_is_of_other_text(self):
+        self.query.latest_query_data = self.factory.create_query_result(
+            query_text="select * from other_events", query_hash=gen_query_hash("select * from other_events"),
+            data=json.dumps(result(1, 2)))
+        self.query.last_watermark = '2'
+
+        self.assertIsNone(incremental.refresh_result(self.query, json.dumps(result(3)), '2'))
+        self.assertIsNone(self.query.last_watermark)
+
+    def test_resets_watermark_when_query_text_changes(self):
+        self.query.last_watermark = '2'
+        self.query.query_text = "select * from other_events"
+
+        self.assertIsNone(self.query.last_watermark)
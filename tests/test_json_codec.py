@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import datetime
+import decimal
+import json
+from unittest import TestCase
+
+import mock
+
+from redash.utils import JSONEncoder, json_codec
+from redash.query_runner import TYPE_DATETIME, TYPE_FLOAT, TYPE_STRING
+
+
+class TestConvertRows(TestCase):
+    def test_converts_values_by_column_type(self):
+        columns = [{'name': 'created_at', 'type': TYPE_DATETIME},
+                   {'name': 'amount', 'type': TYPE_FLOAT},
+                   {'name': 'name', 'type': TYPE_STRING}]
+        rows = [(datetime.datetime(2018, 1, 2, 3, 4, 5), decimal.Decimal('1.5'), 'a'),
+                (None, None, None)]
+
+        self.assertEqual([['2018-01-02T03:04:05', 1.5, 'a'], [None, None, None]],
+                         json_codec.convert_rows(columns, rows))
+
+    def test_leaves_values_of_other_columns(self):
+        columns = [{'name': 'value', 'type': None}]
+        rows = [(decimal.Decimal('1.5'),)]
+
+        self.assertEqual([[decimal.Decimal('1.5')]], json_codec.convert_rows(columns, rows))
+
+
+class TestBackends(TestCase):
+    data = {'rows': [{'d': datetime.date(2018, 1, 2), 'n': decimal.Decimal('1.5'), 's': u'א'}]}
+
+    def test_backends_encode_like_json(self):
+        expected = json.loads(json.dumps(self.data, cls=JSONEncoder))
+
+        for name in json_codec.BACKENDS:
+            dumps, loads = json_codec.get_backend(name)
+            self.assertEqual(expected, loads(dumps(self.data, JSONEncoder)), name)
+
+    def test_falls_back_to_json_for_unknown_backend(self):
+        with mock.patch.object(json_codec.logger, 'warning') as warning:
+            dumps, loads = json_codec.get_backend('unknown')
+
+        self.assertTrue(warning.called)
+        self.assertEqual({'a': 1}, loads(dumps({'a': 1}, JSONEncoder)))
@@ -1,6 +1,7 @@
 #encoding: utf8
 import datetime
 import json
+import time
 from unittest import TestCase
 
 import mock
@@ -72,6 +73,28 @@ class ShouldScheduleNextTest(TestCase):
         self.assertFalse(models.should_schedule_next(two_hours_ago, now,
                                                      "3600", 10))
 
+    def test_interval_schedule_with_offset(self):
+        previous = date_parse("2018-01-01 10:00:10+00:00")
+        # runs are aligned to 600 seconds past the hour, regardless of when the previous one ended
+        self.assertFalse(models.should_schedule_next(previous, date_parse("2018-01-01 10:09:59+00:00"), "3600", 0,
+                                                     offset=600))
+        self.assertTrue(models.should_schedule_next(previous, date_parse("2018-01-01 10:10:01+00:00"), "3600", 0,
+                                                    offset=600))
+
+    def test_exact_time_with_offset(self):
+        previous = date_parse("2015-10-15 23:07")
+        self.assertFalse(models.should_schedule_next(previous, date_parse("2015-10-16 23:04"), "23:00", 0,
+                                                     offset=300))
+        self.assertTrue(models.should_schedule_next(previous, date_parse("2015-10-16 23:06"), "23:00", 0,
+                                                    offset=300))
+
+    def test_schedule_offset_is_deterministic(self):
+        with mock.patch('redash.models.settings.SCHEDULE_JITTER', 600):
+            self.assertEqual(models.schedule_offset(1), models.schedule_offset(1))
+            self.assertTrue(0 <= models.schedule_offset(1) < 600)
+
+        self.assertEqual(0, models.schedule_offset(1))
+
 
 class QueryOutdatedQueriesTest(BaseTestCase):
     # TODO: this test can be refactored to use mock version of should_schedule_next to simplify it.
@@ -452,6 +475,74 @@ class TestQueryAll(BaseTestCase):
         self.assertEqual(['bob', 'alice'], [q.user.name for q in qs2])
 
 
+class TestAllTags(BaseTestCase):
+    def test_counts_query_tags_by_data_source_group(self):
+        restricted_ds = self.factory.create_data_source(group=self.factory.create_group())
+        self.factory.create_query(tags=[u'a', u'b'])
+        self.factory.create_query(tags=[u'a'])
+        self.factory.create_query(tags=[u'a', u'c'], data_source=restricted_ds)
+        db.session.flush()
+
+        self.assertEqual({u'a': 2, u'b': 1}, dict(models.Query.all_tags(self.factory.user)))
+
+    def test_updates_query_tag_counts(self):
+        query = self.factory.create_query(tags=[u'a', u'b'])
+        db.session.flush()
+
+        query.tags = [u'b', u'c']
+        db.session.flush()
+        self.assertEqual({u'b': 1, u'c': 1}, dict(models.Query.all_tags(self.factory.user)))
+
+        query.archive()
+        db.session.flush()
+        self.assertEqual({}, dict(models.Query.all_tags(self.factory.user)))
+
+    def test_excludes_query_drafts_unless_requested(self):
+        self.factory.create_query(tags=[u'a'], is_draft=True)
+        db.session.flush()
+
+        self.assertEqual({}, dict(models.Query.all_tags(self.factory.user)))
+        self.assertEqual({u'a': 1}, dict(models.Query.all_tags(self.factory.user, include_drafts=True)))
+
+    def test_counts_dashboard_tags(self):
+        other_user = self.factory.create_user()
+        self.factory.create_dashboard(tags=[u'a'], is_draft=False)
+        self.factory.create_dashboard(tags=[u'a', u'b'], is_draft=True, user=self.factory.user)
+        self.factory.create_dashboard(tags=[u'c'], is_draft=True, user=other_user)
+        self.factory.create_dashboard(tags=[u'd'], is_archived=True)
+        db.session.flush()
+
+        tags = models.Dashboard.all_tags(self.factory.org, self.factory.user)
+        self.assertEqual({u'a': 2, u'b': 1}, dict(tags))
+
+    def test_counts_dashboard_tags_by_data_source_group(self):
+        other_user = self.factory.create_user()
+        restricted_ds = self.factory.create_data_source(group=self.factory.create_group())
+        restricted_query = self.factory.create_query(data_source=restricted_ds)
+
+        query = self.factory.create_query()
+        for tags, query in (([u'a'], query), ([u'a', u'b'], restricted_query)):
+            dashboard = self.factory.create_dashboard(tags=tags, user=other_user)
+            self.factory.create_widget(dashboard=dashboard,
+                                       visualization=self.factory.create_visualization(query_rel=query))
+        text_dashboard = self.factory.create_dashboard(tags=[u'c'], user=other_user)
+        self.factory.create_widget(dashboard=text_dashboard, visualization=None)
+        db.session.flush()
+
+        tags = models.Dashboard.all_tags(self.factory.org, self.factory.user)
+        self.assertEqual({u'a': 1, u'c': 1}, dict(tags))
+
+        restricted_query.data_source = self.factory.data_source
+        db.session.flush()
+        tags = models.Dashboard.all_tags(self.factory.org, self.factory.user)
+        self.assertEqual({u'a': 2, u'b': 1, u'c': 1}, dict(tags))
+
+        db.session.delete(text_dashboard.widgets.one())
+        db.session.flush()
+        tags = models.Dashboard.all_tags(self.factory.org, self.factory.user)
+        self.assertEqual({u'a': 2, u'b': 1}, dict(tags))
+
+
 class TestGroup(BaseTestCase):
     def test_returns_groups_with_specified_names(self):
         org1 = self.factory.create_org()
@@ -534,6 +625,35 @@ class TestQueryResultStoreResult(BaseTestCase):
         self.assertEqual(query2.latest_query_data, query_result)
         self.assertNotEqual(query3.latest_query_data, query_result)
 
+    def test_reuses_latest_result_with_same_data(self):
+        query = self.factory.create_query(query_text=self.query, schedule_resultset_size=3)
+        query_result, _ = models.QueryResult.store_result(
+            self.data_source.org_id, self.data_source, self.query_hash,
+            self.query, self.data, self.runtime, self.utcnow)
+        later = self.utcnow + datetime.timedelta(minutes=5)
+
+        same_result, _ = models.QueryResult.store_result(
+            self.data_source.org_id, self.data_source, self.query_hash,
+            self.query, self.data, 456, later)
+
+        self.assertEqual(query_result.id, same_result.id)
+        self.assertEqual(later, same_result.retrieved_at)
+        self.assertEqual(456, same_result.runtime)
+        self.assertEqual(1, models.QueryResult.query.count())
+        self.assertEqual([query_result], query.query_results)
+
+    def test_stores_result_with_different_data(self):
+        query_result, _ = models.QueryResult.store_result(
+            self.data_source.org_id, self.data_source, self.query_hash,
+            self.query, self.data, self.runtime, self.utcnow)
+
+        new_result, _ = models.QueryResult.store_result(
+            self.data_source.org_id, self.data_source, self.query_hash,
+            self.query, "other data", self.runtime, self.utcnow)
+
+        self.assertNotEqual(query_result.id, new_result.id)
+        self.assertEqual("other data", new_result.data)
+
 
 class TestEvents(BaseTestCase):
     def raw_event(self):
@@ -571,6 +691,69 @@ class TestEvents(BaseTestCase):
         self.assertDictEqual(event.additional_properties, additional_properties)
 
 
+class TestEventDailyCount(BaseTestCase):
+    def record_event(self, object_type, object_id, action, days_ago=0):
+        timestamp = time.time() - days_ago * 24 * 3600
+        models.Event.record({"action": action,
+                             "timestamp": timestamp,
+                             "object_type": object_type,
+                             "user_id": self.factory.user.id,
+                             "object_id": object_id,
+                             "org_id": self.factory.org.id})
+        db.session.flush()
+
+    def test_rollup_counts_events_per_day(self):
+        self.record_event('query', '1', 'execute')
+        self.record_event('query', '1', 'execute')
+        self.record_event('query', '1', 'execute', days_ago=2)
+        self.record_event('dashboard', '2', 'view')
+
+        models.EventDailyCount.rollup()
+        counts = models.EventDailyCount.query.filter_by(object_type='query').order_by(models.EventDailyCount.day).all()
+        self.assertEqual([1, 2], [c.count for c in counts])
+
+    def test_rollup_recounts_late_events(self):
+        self.record_event('query', '1', 'execute')
+        models.EventDailyCount.rollup()
+        self.record_event('query', '1', 'execute', days_ago=1)
+        models.EventDailyCount.rollup()
+
+        self.assertEqual(2, sum(c.count for c in models.EventDailyCount.query))
+
+    def test_rollup_recounts_last_day(self):
+        self.record_event('query', '1', 'execute')
+        models.EventDailyCount.rollup()
+        self.record_event('query', '1', 'execute')
+        models.EventDailyCount.rollup()
+
+        self.assertEqual([2], [c.count for c in models.EventDailyCount.query])
+
+    def test_recent_queries_reads_rollups(self):
+        q1 = self.factory.create_query()
+        q2 = self.factory.create_query()
+        db.session.flush()
+        self.record_event('query', str(q1.id), 'execute')
+        self.record_event('query', str(q2.id), 'execute')
+        self.record_event('query', str(q2.id), 'edit')
+
+        self.assertEqual([], list(models.Query.recent([self.factory.default_group.id])))
+
+        models.EventDailyCount.rollup()
+        recent = models.Query.recent([self.factory.default_group.id])
+        self.assertEqual([q2, q1], list(recent))
+
+    def test_cleanup_deletes_only_old_rolled_up_events(self):
+        self.record_event('query', '1', 'execute', days_ago=10)
+        self.record_event('query', '1', 'execute')
+
+        self.assertEqual(0, models.Event.cleanup(5, 100))
+
+        models.EventDailyCount.rollup()
+        self.assertEqual(1, models.Event.cleanup(5, 100))
+        self.assertEqual(1, models.Event.query.count())
+        self.assertEqual(2, sum(c.count for c in models.EventDailyCount.query))
+
+
 def _set_up_dashboard_test(d):
     d.g1 = d.factory.create_group(name='First', permissions=['create', 'view'])
     d.g2 = d.factory.create_group(name='Second',  permissions=['create', 'view'])
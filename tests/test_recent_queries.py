@@ -0,0 +1,86 @@
+import datetime
+
+from mock import patch
+from redis import ConnectionError
+from tests import BaseTestCase
+
+from redash import models, recent_queries
+from redash.utils import utcnow
+
+
+def query_event(user_id, query_id, action='execute', created_at=None):
+    return {'user_id': user_id,
+            'object_type': 'query',
+            'object_id': str(query_id),
+            'action': action,
+            'created_at': created_at or utcnow()}
+
+
+class TestRecordEvents(BaseTestCase):
+    def test_orders_by_activity(self):
+        recent_queries.record_events([query_event(1, 10), query_event(1, 20), query_event(1, 20)])
+        self.assertEqual([20, 10], recent_queries.get(1))
+
+    def test_recent_activity_outweighs_older_activity(self):
+        month_ago = utcnow() - datetime.timedelta(days=30)
+        recent_queries.record_events([query_event(1, 10, created_at=month_ago) for _ in range(5)])
+        recent_queries.record_events([query_event(1, 20)])
+
+        self.assertEqual([20, 10], recent_queries.get(1))
+
+    def test_ignores_other_events(self):
+        recent_queries.record_events([query_event(None, 10),
+                                      query_event(1, 20, action='create'),
+                                      dict(query_event(1, 30), object_type='dashboard')])
+        self.assertEqual([], recent_queries.get(1))
+
+    def test_keeps_separate_sets_per_user(self):
+        recent_queries.record_events([query_event(1, 10), query_event(2, 20)])
+        self.assertEqual([10], recent_queries.get(1))
+        self.assertEqual([20], recent_queries.get(2))
+
+    def test_scores_far_future_activity(self):
+        in_ten_years = utcnow() + datetime.timedelta(days=3650)
+        with patch('redash.recent_queries.settings.RECENT_QUERIES_HALF_LIFE', 3600):
+            recent_queries.record_events([query_event(1, 10, created_at=in_ten_years) for _ in range(2)])
+            recent_queries.record_events([query_event(1, 20, created_at=in_ten_years)])
+
+        self.assertEqual([10, 20], recent_queries.get(1))
+
+    def test_doesnt_raise_errors(self):
+        with patch('redash.recent_queries.redis_connection.pipeline', side_effect=ConnectionError()):
+            recent_queries.record_events([query_event(1, 10)])
+
+
+class TestBackfill(BaseTestCase):
+    def record_event(self, query_id):
+        models.Event.record({'org_id': self.factory.org.id,
+                             'user_id': self.factory.user.id,
+                             'action': 'execute',
+                             'object_type': 'query',
+                             'object_id': str(query_id),
+                             'timestamp': 1411778709})
+        models.db.session.commit()
+
+    def test_adds_existing_events_once(self):
+        with patch('redash.models.recent_queries.record_events'):
+            for query_id in (1, 2, 2):
+                self.record_event(query_id)
+
+        self.assertEqual(3, recent_queries.backfill(batch_size=2))
+        self.assertEqual([2, 1], recent_queries.get(self.factory.user.id))
+
+        # Events recorded after the backfill started are already tracked.
+        self.record_event(1)
+        self.assertEqual(0, recent_queries.backfill(batch_size=2))
+        self.assertEqual(set([1, 2]), set(recent_queries.get(self.factory.user.id)))
+
+    def test_skips_events_tracked_before_it_started(self):
+        with patch('redash.models.recent_queries.record_events'):
+            self.record_event(1)
+
+        with patch('redash.recent_queries._tracking_started', False):
+            self.record_event(2)
+
+        self.assertEqual(1, recent_queries.backfill())
+        self.assertEqual(set([1, 2]), set(recent_queries.get(self.factory.user.id)))
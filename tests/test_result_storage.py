@@ -0,0 +1,160 @@
+import os
+import shutil
+import tempfile
+from cStringIO import StringIO
+from unittest import TestCase
+
+import mock
+
+from tests import BaseTestCase
+from redash import models, result_storage
+from redash.result_storage import CachedResultStorage, FileSystemResultStorage, S3ResultStorage
+from redash.utils import utcnow
+
+
+class FakeS3Client(object):
+    """Stands in for boto3's S3 client, keeping objects in memory."""
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[(Bucket, Key)] = Body
+
+    def get_object(self, Bucket, Key):
+        return {'Body': StringIO(self.objects[(Bucket, Key)])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+
+class TempDirTestCase(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+
+class TestFileSystemResultStorage(TempDirTestCase):
+    def test_stores_data(self):
+        storage = FileSystemResultStorage(self.path)
+        storage.put('abcd', 'data')
+
+        self.assertEqual('data', storage.get('abcd'))
+
+        storage.delete('abcd')
+        self.assertRaises(IOError, storage.get, 'abcd')
+
+    def test_ignores_deleting_missing_data(self):
+        FileSystemResultStorage(self.path).delete('abcd')
+
+
+class TestS3ResultStorage(TestCase):
+    @mock.patch('redash.result_storage.boto3', create=True)
+    def test_stores_data(self, boto3):
+        client = boto3.client.return_value = FakeS3Client()
+        storage = S3ResultStorage('bucket', 'results/', 'http://localhost:9000')
+        storage.put('abcd', 'data')
+
+        boto3.client.assert_called_once_with('s3', endpoint_url='http://localhost:9000')
+        self.assertEqual({('bucket', 'results/abcd'): 'data'}, client.objects)
+        self.assertEqual('data', storage.get('abcd'))
+
+        storage.delete('abcd')
+        self.assertEqual({}, client.objects)
+
+
+class TestCachedResultStorage(TempDirTestCase):
+    def test_reads_data_once(self):
+        storage = mock.Mock(get=mock.Mock(return_value='data'))
+        cached = CachedResultStorage(storage, self.path, max_size=100)
+
+        self.assertEqual('data', cached.get('abcd'))
+        self.assertEqual('data', cached.get('abcd'))
+        self.assertEqual(1, storage.get.call_count)
+
+    def test_removes_least_recently_read_data(self):
+        storage = mock.Mock(get=mock.Mock(return_value='data'))
+        cached = CachedResultStorage(storage, self.path, max_size=8)
+        cached.get('aaaa')
+        os.utime(cached.cache._path('aaaa'), (0, 0))
+        cached.get('bbbb')
+        cached.get('cccc')
+
+        self.assertFalse(os.path.exists(cached.cache._path('aaaa')))
+        self.assertTrue(os.path.exists(cached.cache._path('cccc')))
+
+
+class TestQueryResultStorage(BaseTestCase):
+    def setUp(self):
+        super(TestQueryResultStorage, self).setUp()
+        self.path = tempfile.mkdtemp()
+        self.patchers = [
+            mock.patch('redash.result_storage.get_storage', return_value=FileSystemResultStorage(self.path)),
+            mock.patch('redash.result_storage.settings.RESULT_STORAGE_THRESHOLD', 10),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(self.path)
+        super(TestQueryResultStorage, self).tearDown()
+
+    def test_keeps_small_data_in_database(self):
+        query_result = self.factory.create_query_result(data='{}')
+
+        self.assertIsNone(query_result.data_key)
+        self.assertEqual('{}', query_result.data)
+
+    def test_stores_large_data(self):
+        data = u'{"columns": [], "rows": []}'
+        query_result = self.factory.create_query_result(data=data)
+
+        self.assertIsNotNone(query_result.data_key)
+        self.assertIsNone(query_result._data)
+        self.assertEqual(data, query_result.data)
+
+    def test_stores_data_when_flushed(self):
+        data = u'{"columns": [], "rows": []}'
+        query_result = models.QueryResult(data=data)
+
+        self.assertIsNone(query_result.data_key)
+        self.assertEqual(data, query_result.data)
+        self.assertEqual([], os.listdir(self.path))
+
+    def test_deletes_stored_data_of_rolled_back_results(self):
+        query_result = models.QueryResult(org=self.factory.org, data_source=self.factory.data_source,
+                                          query_hash='abcd', query_text='SELECT 1', runtime=1,
+                                          retrieved_at=utcnow(), data=u'{"columns": [], "rows": []}')
+        models.db.session.add(query_result)
+        models.db.session.flush()
+        key = query_result.data_key
+        self.assertEqual(u'{"columns": [], "rows": []}', result_storage.load(key))
+
+        models.db.session.rollback()
+
+        self.assertRaises(IOError, result_storage.get_storage().get, key)
+
+    def test_deletes_stored_data_with_result(self):
+        query_result = self.factory.create_query_result(data=u'{"columns": [], "rows": []}')
+        models.db.session.commit()
+        key = query_result.data_key
+
+        models.QueryResult.delete_results(models.QueryResult.query.filter(models.QueryResult.id == query_result.id))
+        self.assertEqual(u'{"columns": [], "rows": []}', result_storage.load(key))
+        models.db.session.commit()
+
+        self.assertRaises(IOError, result_storage.get_storage().get, key)
+
+    def test_keeps_stored_data_when_deletion_is_rolled_back(self):
+        query_result = self.factory.create_query_result(data=u'{"columns": [], "rows": []}')
+        models.db.session.commit()
+        key = query_result.data_key
+
+        models.QueryResult.delete_results(models.QueryResult.query.filter(models.QueryResult.id == query_result.id))
+        models.db.session.rollback()
+
+        self.assertEqual(u'{"columns": [], "rows": []}', models.QueryResult.query.get(query_result.id).data)
+        self.assertEqual(u'{"columns": [], "rows": []}', result_storage.load(key))
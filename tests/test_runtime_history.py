@@ -0,0 +1,30 @@
+from tests import BaseTestCase
+
+from redash import runtime_history
+
+
+class TestRuntimeHistory(BaseTestCase):
+    def test_returns_percentiles(self):
+        for i in range(1, 11):
+            runtime_history.record(1, 'hash', 7, i, i * 100)
+
+        stats = runtime_history.get(1, 'hash')
+        self.assertEqual(10, stats['runs'])
+        self.assertEqual(6, stats['runtime_p50'])
+        self.assertEqual(10, stats['runtime_p90'])
+        self.assertEqual(10, stats['runtime_max'])
+        self.assertEqual(1000, stats['rows_p90'])
+
+    def test_keeps_latest_executions(self):
+        for i in range(runtime_history.SIZE + 10):
+            runtime_history.record(1, 'hash', None, i, None)
+
+        stats = runtime_history.get(1, 'hash')
+        self.assertEqual(runtime_history.SIZE, stats['runs'])
+        self.assertNotIn('rows_p50', stats)
+
+    def test_falls_back_to_query_id(self):
+        runtime_history.record(1, 'hash', 7, 30, 1)
+
+        self.assertIsNone(runtime_history.get(1, 'other_hash'))
+        self.assertEqual(30, runtime_history.get(1, 'other_hash', 7)['runtime_p90'])
@@ -1,8 +1,8 @@
 from collections import namedtuple
 from unittest import TestCase
 
-from redash.utils import (build_url, collect_parameters_from_request,
-                          collect_query_parameters, filter_none)
+from redash.utils import (POSITIONAL_ROWS, build_url, collect_parameters_from_request,
+                          collect_query_parameters, convert_rows, filter_none)
 
 DummyRequest = namedtuple('DummyRequest', ['host', 'scheme'])
 
@@ -61,3 +61,25 @@ class TestSkipNones(TestCase):
         }
 
         self.assertDictEqual(filter_none(d), {'a': 1})
+
+
+class TestConvertRows(TestCase):
+    columns = [{'name': 'a'}, {'name': 'b'}]
+
+    def test_converts_dicts_to_positional_rows(self):
+        data = {'columns': self.columns, 'rows': [{'a': 1, 'b': 2}, {'b': 3}]}
+        converted = convert_rows(data, POSITIONAL_ROWS)
+
+        self.assertEqual([[1, 2], [None, 3]], converted['rows'])
+        self.assertEqual(POSITIONAL_ROWS, converted['row_format'])
+
+    def test_converts_positional_rows_to_dicts(self):
+        data = {'columns': self.columns, 'rows': [[1, 2]], 'row_format': POSITIONAL_ROWS}
+        converted = convert_rows(data)
+
+        self.assertEqual([{'a': 1, 'b': 2}], converted['rows'])
+        self.assertNotIn('row_format', converted)
+
+    def test_keeps_rows_in_requested_format(self):
+        data = {'columns': self.columns, 'rows': [{'a': 1, 'b': 2}]}
+        self.assertIs(data, convert_rows(data))